@@ -0,0 +1,433 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Generación de las fachadas (subclases de typedef) a partir de las declaraciones
+de los encabezados C del programa del dispositivo, ejem. :
+
+    types = load_header('ctrl.h')
+    ctrl = types['ctrl_t'](memory = RAM_Memory(0x120, facade_port))
+
+Se interpretan las declaraciones 'typedef struct {...} name ;' (y 'struct tag
+{...} ;'), los vectores, punteros, los tipos de stdint.h (uintN_t/intN_t),
+float24_t, los tipos básicos de XC8 y las macros '#define NAME valor' utilizadas
+como dimensiones de los vectores. Los campos de bits consecutivos se agrupan en
+palabras (ver BitField) denominadas bits0, bits1, ...
+
+La distribución (layout) interpretada se guarda en un archivo (JSON) junto al
+encabezado (o en cache_dir) identificado por el resumen (hash) del encabezado,
+de manera que las ejecuciones posteriores solo construyen las clases a partir
+de la distribución guardada sin volver a interpretar el encabezado.
+"""
+
+import ast
+import operator
+import re
+import warnings
+from collections import OrderedDict
+
+from CStruct import *
+from filecache import load_cached
+
+LAYOUT_VERSION = 2
+
+# Tipos básicos del compilador (XC8) y sus equivalentes :
+BASIC_TYPES = {
+    'char'               : 'char',
+    'signed char'        : 'int8_t',
+    'unsigned char'      : 'uint8_t',
+    'bool'               : 'uint8_t',
+    '_Bool'              : 'uint8_t',
+    'short'              : 'int16_t',
+    'unsigned short'     : 'uint16_t',
+    'int'                : 'int16_t',
+    'signed int'         : 'int16_t',
+    'unsigned int'       : 'uint16_t',
+    'unsigned'           : 'uint16_t',
+    'short long'         : 'int24_t',
+    'unsigned short long': 'uint24_t',
+    'long'               : 'int32_t',
+    'signed long'        : 'int32_t',
+    'unsigned long'      : 'uint32_t',
+    'float'              : 'float24_t',
+    'double'             : 'float24_t',
+}
+
+PRIMITIVE_TYPES = {
+    'uint8_t' : uint8_t,  'uint16_t' : uint16_t, 'uint24_t' : uint24_t,
+    'uint32_t': uint32_t, 'uint40_t' : uint40_t,
+    'int8_t'  : int8_t,   'int16_t'  : int16_t,  'int24_t'  : int24_t,
+    'int32_t' : int32_t,  'int40_t'  : int40_t,
+    'float24_t' : float24_t, 'char' : uint8_t,
+}
+
+MEMORY_CLASSES = {
+    'RAM_Memory' : RAM_Memory, 'FLASH_Memory' : FLASH_Memory,
+    'EEPROM_Memory' : EEPROM_Memory,
+}
+
+# Calificadores que no afectan la distribución :
+IGNORED = {'volatile', 'static', 'extern', 'near', 'far', '__near', '__far',
+           'persistent', '__persistent', 'register'}
+
+TOKEN = re.compile(r'\s*(?:(?P<id>[A-Za-z_]\w*)|(?P<num>0[xX][0-9A-Fa-f]+|\d+)[uUlL]*|(?P<op>.))')
+
+
+class CHeaderError(ValueError):
+    pass
+
+
+class UndefinedMacroError(CHeaderError):
+    def __init__(self, macro) :
+        super().__init__('La macro "%s" no está definida.' % macro)
+        self.macro = macro
+
+
+
+def _tokens(text) :
+    return [m.group('id') or m.group('num') or m.group('op')
+                         for m in TOKEN.finditer(text) if m.group().strip()]
+
+
+def _c_div(a, b) :
+    # La división entera de C trunca hacia cero :
+    q = abs(a) // abs(b)
+    return q if (a < 0) == (b < 0) else -q
+
+def _c_mod(a, b) :
+    return a - b*_c_div(a, b)
+
+# Operadores admitidos en las expresiones constantes (dimensiones, anchos) :
+OPERATORS = {
+    ast.Add : operator.add, ast.Sub : operator.sub, ast.Mult : operator.mul,
+    ast.Div : _c_div, ast.FloorDiv : _c_div, ast.Mod : _c_mod,
+    ast.LShift : operator.lshift, ast.RShift : operator.rshift,
+    ast.BitOr : operator.or_, ast.BitAnd : operator.and_, ast.BitXor : operator.xor,
+    ast.USub : operator.neg, ast.UAdd : operator.pos, ast.Invert : operator.invert,
+}
+
+def _arithmetic(node) :
+    if isinstance(node, ast.Expression) :
+        return _arithmetic(node.body)
+    if isinstance(node, ast.Constant) and type(node.value) is int :
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in OPERATORS :
+        return OPERATORS[type(node.op)](_arithmetic(node.left), _arithmetic(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in OPERATORS :
+        return OPERATORS[type(node.op)](_arithmetic(node.operand))
+    raise CHeaderError('Expresión no admitida.')
+
+
+
+def _strip(text) :
+    """
+    Elimina los comentarios y las directivas del preprocesador, devuelve el
+    texto y las macros (con valor numérico) definidas.
+    """
+    text = re.sub(r'/\*.*?\*/', ' ', text, flags = re.S)
+    text = re.sub(r'//[^\n]*', ' ', text)
+
+    macros, lines = {}, []
+    for line in text.split('\n') :
+        define = re.match(r'\s*#\s*define\s+(\w+)\s+(.+?)\s*$', line)
+        if define :
+            macros[define.group(1)] = define.group(2)
+        if not line.lstrip().startswith('#') :
+            lines.append(line)
+
+    return '\n'.join(lines), macros
+
+
+
+class _Parser :
+    def __init__(self, text, macros) :
+        self.tokens = _tokens(text)
+        self.pos = 0
+        self.macros = macros
+        self.types = {}      # nombre -> descriptor
+        self.order = []      # orden de definición
+
+    def peek(self, k = 0) :
+        p = self.pos + k
+        return self.tokens[p] if p < len(self.tokens) else None
+
+    def next(self) :
+        tok = self.peek()
+        self.pos += 1
+        return tok
+
+    def expect(self, tok) :
+        if self.next() != tok :
+            raise CHeaderError('Se esperaba "%s" cerca de "%s".' % (tok,
+                                        ' '.join(self.tokens[self.pos-3:self.pos+3])))
+
+    def skip_statement(self) :
+        depth = 0
+        while self.peek() is not None :
+            tok = self.next()
+            if tok in '{(' :
+                depth += 1
+            elif tok in '})' :
+                depth -= 1
+            elif tok == ';' and depth <= 0 :
+                return
+
+    def define(self, name, desc) :
+        if name not in self.types :
+            self.order.append(name)
+        self.types[name] = desc
+
+    def parse(self) :
+        while self.peek() is not None :
+            if self.peek() == 'typedef' :
+                # Las definiciones que no corresponden a datos (ejem. punteros
+                # a funciones) se ignoran :
+                start = self.pos
+                try :
+                    self.next()
+                    self.typedef()
+                except CHeaderError as e :
+                    self.pos = start
+                    self.skip_statement()
+                    name = self.tokens[self.pos - 2]
+                    if isinstance(e, UndefinedMacroError) :
+                        raise CHeaderError('La macro "%s" de la definición "%s" no está definida.'
+                                                                 % (e.macro, name)) from None
+                    warnings.warn('Se omite la definición "%s" : %s' % (name, e))
+            elif self.peek() == 'struct' and (self.peek(2) == '{') :
+                self.next()
+                self.struct()
+                self.skip_statement()
+            else :
+                self.skip_statement()
+
+        return {'order' : self.order, 'types' : self.types}
+
+    # Especificador de tipo : devuelve (descriptor, memoria de los punteros)
+    def specifier(self) :
+        words, memory = [], 'RAM_Memory'
+        while True :
+            tok = self.peek()
+            if tok == 'const' :
+                memory = 'FLASH_Memory'
+            elif tok in ('__eeprom', 'eeprom') :
+                memory = 'EEPROM_Memory'
+            elif tok in IGNORED :
+                pass
+            elif tok in ('struct', 'union') :
+                if tok == 'union' :
+                    raise CHeaderError('Las uniones no están soportadas.')
+                self.next()
+                return self.struct(), memory
+            elif tok in ('signed', 'unsigned', 'short', 'long', 'char', 'int') \
+                                         or (not words and tok in BASIC_TYPES) :
+                words.append(tok)
+            elif not words and tok is not None and re.match(r'[A-Za-z_]\w*$', tok) :
+                self.next()
+                return self.named(tok), memory
+            else :
+                break
+            self.next()
+
+        name = ' '.join(words)
+        if name not in BASIC_TYPES :
+            raise CHeaderError('Tipo desconocido "%s".' % name)
+        return ['prim', BASIC_TYPES[name]], memory
+
+    def named(self, name) :
+        if name in PRIMITIVE_TYPES :
+            return ['prim', name]
+        if name in self.types :
+            return ['type', name]
+        raise CHeaderError('Tipo desconocido "%s".' % name)
+
+    def struct(self) :
+        tag = None
+        if self.peek() != '{' :
+            tag = 'struct ' + self.next()
+            if self.peek() != '{' :
+                # Referencia a una estructura (posiblemente aún no definida) :
+                return ['type', tag]
+
+        # Se registra la etiqueta antes de interpretar los campos, de manera
+        # que la estructura pueda referirse a si misma (por medio de punteros) :
+        if tag is not None :
+            self.define(tag, None)
+
+        self.expect('{')
+        fields, unit = [], None
+        while self.peek() != '}' :
+            base, memory = self.specifier()
+            while True :
+                name, desc, width = self.declarator(base, memory)
+                if width is None :
+                    fields.append([name, desc])
+                    unit = None
+                else :
+                    unit = self.bitfield(fields, unit, name, desc, width)
+                if self.next() == ';' :
+                    break
+
+        self.expect('}')
+        desc = ['struct', fields]
+        if tag is not None :
+            self.types[tag] = desc
+            return ['type', tag]
+        return desc
+
+    def declarator(self, base, memory) :
+        pointers = 0
+        while self.peek() in ('*', 'const', 'volatile') :
+            if self.next() == '*' :
+                pointers += 1
+
+        name = self.next() if self.peek() != ':' else None
+        desc = base
+        for _ in range(pointers) :
+            desc = ['ptr', desc, memory]
+
+        dims = []
+        while self.peek() == '[' :
+            self.next()
+            expr = []
+            while self.peek() != ']' :
+                expr.append(self.next())
+            self.next()
+            dims.append(self.evaluate(expr))
+
+        for length in reversed(dims) :
+            if desc == ['prim', 'char'] :
+                desc = ['string', length]
+            else :
+                desc = ['array', desc, length]
+
+        width = None
+        if self.peek() == ':' :
+            self.next()
+            width = self.evaluate([self.next()])
+
+        return name, desc, width
+
+    def bitfield(self, fields, unit, name, desc, width) :
+        """
+        Agrega el campo de bits a la palabra (unit) en curso, los campos
+        consecutivos del mismo tipo comparten la palabra mientras quepan en
+        ella, las palabras se denominan bits0, bits1, ... Devuelve la palabra
+        en curso.
+        """
+        if desc[0] != 'prim' :
+            raise CHeaderError('Tipo inválido para el campo de bits "%s".' % name)
+
+        bit_len = PRIMITIVE_TYPES[desc[1]].__BIT_LEN__
+        if unit is None or unit[1][1] != desc[1] or width == 0 \
+                  or sum(w for _, w in unit[1][2]) + width > bit_len :
+            unit = ['bits%d' % sum(f[1][0] == 'bits' for f in fields),
+                                                    ['bits', desc[1], []]]
+            fields.append(unit)
+
+        if width :
+            if name is None :
+                name = '_pad%d' % len(unit[1][2])
+            unit[1][2].append([name, width])
+        return unit
+
+    def evaluate(self, expr, depth = 0) :
+        """
+        Evalúa la expresión constante (entera) expr, una lista de tokens, las
+        macros (que pueden referirse a otras macros) se evalúan por separado.
+        """
+        text = ''
+        for tok in expr :
+            if re.match(r'[A-Za-z_]\w*$', tok) :
+                if tok not in self.macros :
+                    raise UndefinedMacroError(tok)
+                if depth >= 8 :
+                    raise CHeaderError('La macro "%s" es recursiva.' % tok)
+                text += '(%d)' % self.evaluate(_tokens(self.macros[tok]), depth + 1)
+            else :
+                text += tok
+        try :
+            return _arithmetic(ast.parse(text, mode = 'eval'))
+        except (SyntaxError, CHeaderError, ZeroDivisionError) :
+            raise CHeaderError('Expresión no evaluable : %s' % ' '.join(expr)) from None
+
+    def typedef(self) :
+        base, memory = self.specifier()
+        while True :
+            name, desc, _ = self.declarator(base, memory)
+            self.define(name, desc)
+            if self.next() == ';' :
+                break
+
+
+
+def parse_header(text) :
+    """
+    Interpreta el texto de un encabezado C y devuelve la distribución (layout)
+    de sus tipos : un diccionario con el orden de definición ('order') y los
+    descriptores de cada tipo ('types').
+    """
+    text, macros = _strip(text)
+    return _Parser(text, macros).parse()
+
+
+
+def build(layout) :
+    """
+    Construye las clases (subclases de typedef o los tipos primitivos) descritas
+    en layout y las devuelve en un diccionario nombre -> clase.
+    """
+    classes, pointers = {}, []
+
+    def make(desc, name = None) :
+        kind = desc[0]
+        if kind == 'prim' :
+            return PRIMITIVE_TYPES[desc[1]]
+        if kind == 'type' :
+            return resolve(desc[1])
+        if kind == 'string' :
+            return CharArray_t(desc[1])
+        if kind == 'bits' :
+            return BitField(PRIMITIVE_TYPES[desc[1]], **OrderedDict(desc[2]))
+        if kind == 'array' :
+            return ArrayOf(make(desc[1]), desc[2])
+        if kind == 'ptr' :
+            # El destino se asigna al final, pues puede ser la misma estructura :
+            cls = PointerTo(typedef, MEMORY_CLASSES[desc[2]])
+            pointers.append((cls, desc[1]))
+            return cls
+        if kind == 'struct' :
+            return CStruct(OrderedDict((f, make(d)) for f, d in desc[1]),
+                                              name or '_anon_structure')
+        raise CHeaderError('Descriptor desconocido : %r' % (desc,))
+
+    def resolve(name) :
+        if name not in classes :
+            desc = layout['types'][name]
+            if desc is None :
+                raise CHeaderError('La estructura "%s" no está definida.' % name)
+            classes[name] = make(desc, name.replace('struct ', ''))
+        return classes[name]
+
+    for name in layout['order'] :
+        resolve(name)
+
+    for cls, desc in pointers :
+        target = make(desc)
+        cls.__target__ = target
+        cls.__name__ = 'PointerTo<{:s}>'.format(target.__name__)
+
+    return {name : cls for name, cls in classes.items()}
+
+
+
+def load_header(filename, cache_dir = None) :
+    """
+    Devuelve las clases definidas en el encabezado filename, la distribución se
+    toma del archivo <filename>.layout.json (en el mismo directorio o en
+    cache_dir) si corresponde al contenido actual del encabezado, de lo
+    contrario se interpreta el encabezado y se actualiza el archivo.
+    """
+    layout = load_cached([filename], '.layout.json', LAYOUT_VERSION,
+                         lambda texts : parse_header(texts[0][1]), cache_dir)
+    return build(layout)
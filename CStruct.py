@@ -283,68 +283,169 @@ class FacadeConfig:
 # In[2]:
 
 
+from bisect import bisect_right
+
+class MemoryMap:
+    """ Mapa de memoria de un dispositivo : asigna a cada clase de memoria su
+        espacio en el protocolo (MemoryConfig) y las ventanas del valor de los
+        punteros que apuntan a ella, de manera que la traducción y validación
+        de direcciones se reduce a la búsqueda (bisect) en un índice de
+        intervalos pre-calculado.
+
+        spaces  : diccionario clase de memoria -> MemoryConfig.
+        windows : secuencia de (clase de memoria, inicio, fin, base), el valor
+                  de un puntero en [inicio, fin) apunta a la dirección valor - base.
+
+        Cada puerto puede tener su propio mapa (atributo memory_map del puerto),
+        de manera que pueden operarse dispositivos de familias diferentes en el
+        mismo proceso, por defecto se utiliza el del compilador (C_compiler) y
+        la configuración (FacadeConfig) vigentes.
+    """
+    def __init__(self, spaces, windows):
+        self.__spaces = dict(spaces)
+        self.__index = {}
+        for memory_class, start, end, base in sorted(windows, key=lambda w: w[1]):
+            starts, entries = self.__index.setdefault(memory_class, ([], []))
+            starts.append(start)
+            entries.append((end, base))
+
+    def space(self, memory_class):
+        # Las subclases de las clases de memoria comparten su espacio :
+        for cls in memory_class.__mro__:
+            if cls in self.__spaces:
+                return self.__spaces[cls]
+        return None
+
+    def protocol(self, memory_class):
+        return self.space(memory_class).offset
+
+    def check(self, memory_class, adr, length=1):
+        """ Verifica que el rango [adr, adr + length) pertenezca al espacio. """
+        space = self.space(memory_class)
+        if adr < space.start or adr + length - 1 > space.final:
+            raise ValueError('Rango (0x{:04X} - 0x{:04X}) fuera del espacio de {:s} ([0x{:04X} - 0x{:04X}]).'.format(adr, adr + length - 1, memory_class.__name__, space.start, space.final))
+
+    def to_adr(self, ptr_val, memory_class, length=1):
+        """ Traduce el valor de un puntero a la dirección en el espacio de
+            memory_class, verificando que el rango de length bytes sea válido.
+        """
+        for cls in memory_class.__mro__:
+            if cls in self.__index:
+                starts, entries = self.__index[cls]
+                break
+        else:
+            raise ValueError('Clase de Memoria desconocida.')
+
+        n = bisect_right(starts, ptr_val) - 1
+        if n < 0 or ptr_val >= entries[n][0]:
+            raise ValueError('El valor del puntero (0x{:04X}) no apunta al tipo de memoria requerido ({:s}).'.format(ptr_val, memory_class.__name__))
+
+        adr = ptr_val - entries[n][1]
+        space = self.space(memory_class)
+        if adr < space.start or adr + length - 1 > space.final:
+            raise ValueError('Valor del puntero (0x{:04X}) fuera de rango ([0x{:04X} - 0x{:04X}]).'.format(ptr_val, space.start, space.final))
+        return adr
+
+
 class XC8:
     """ Define como asigna el espacio de direcciones entre la RAM y FLASH
     """
     @classmethod
-    def to_adr(cls, ptr_val, memory_class):
-        if memory_class == Linear_RAM_Memory:
-            if ptr_val < 0x8000:
-                if ptr_val <= FacadeConfig.LINEAR_RAM_SPACE.final :
-                    return ptr_val
-                raise ValueError('Valor del puntero (0x{:04X}) fuera de rango ([0x{:04X} - 0x{:04X}]).'.format(ptr_val, FacadeConfig.RAM_SPACE.start, FacadeConfig.RAM_SPACE.final))
+    def memory_map(cls, config=FacadeConfig):
+        return MemoryMap({FLASH_Memory      : config.FLASH_SPACE,
+                          RAM_Memory        : config.RAM_SPACE,
+                          Linear_RAM_Memory : config.LINEAR_RAM_SPACE,
+                          EEPROM_Memory     : config.EEPROM_SPACE},
+                         [(Linear_RAM_Memory, 0x0000, 0x8000, 0x0000),
+                          (RAM_Memory,        0x0000, 0x8000, 0x0000),
+                          (FLASH_Memory,      0x8000, 0x10000, 0x8000),
+                          (EEPROM_Memory,     0x8000, 0x10000, 0x8000 + config.EMULATED_EEPROM_ADDRESS)])
 
-            raise ValueError('El valor del puntero (0x{:04X}) no apunta al tipo de memoria requerido ({:s}).'.format(ptr_val, memory_class.__name__))
-
-        elif memory_class == RAM_Memory:
-            if ptr_val < 0x8000:
-                if ptr_val <= FacadeConfig.RAM_SPACE.final :
-                    return ptr_val
-                raise ValueError('Valor del puntero (0x{:04X}) fuera de rango ([0x{:04X} - 0x{:04X}]).'.format(ptr_val, FacadeConfig.RAM_SPACE.start, FacadeConfig.RAM_SPACE.final))
+    @classmethod
+    def to_adr(cls, ptr_val, memory_class):
+        return default_memory_map().to_adr(ptr_val, memory_class)
 
-            raise ValueError('El valor del puntero (0x{:04X}) no apunta al tipo de memoria requerido ({:s}).'.format(ptr_val, memory_class.__name__))
 
-        elif memory_class == FLASH_Memory :
-            if ptr_val >= 0x8000:
-                if (ptr_val - 0x8000) <= FacadeConfig.FLASH_SPACE.final :
-                    return ptr_val - 0x8000
-                raise ValueError('Valor del puntero (0x{:04X}) fuera de rango ([0x{:04X} - 0x{:04X}]).'.format(ptr_val, FacadeConfig.FLASH_SPACE.start, FacadeConfig.FLASH_SPACE.final))
+C_compiler = XC8
 
-            raise ValueError('El valor del puntero (0x{:04X}) no apunta al tipo de memoria requerido ({:s}).'.format(ptr_val, memory_class.__name__))
 
-        elif memory_class == EEPROM_Memory :
-            if ptr_val >= 0x8000:
-                if (ptr_val >= (0x8000 + FacadeConfig.EMULATED_EEPROM_ADDRESS)) and (ptr_val <= (0x8000 + FacadeConfig.EMULATED_EEPROM_ADDRESS + FacadeConfig.EEPROM_SPACE.final)) :
-                    return ptr_val - 0x8000 - FacadeConfig.EMULATED_EEPROM_ADDRESS
-                raise ValueError('Valor del puntero (0x{:04X}) fuera de rango ([0x{:04X} - 0x{:04X}]).'.format(ptr_val, FacadeConfig.EEPROM_SPACE.start, FacadeConfig.EEPROM_SPACE.final))
+# In[3]:
 
-            raise ValueError('El valor del puntero (0x{:04X}) no apunta al tipo de memoria requerido ({:s}).'.format(ptr_val, memory_class.__name__))
 
-        raise ValueError('Clase de Memoria desconocida.')
+from FacadeWrapper import *
+from time import monotonic
+import weakref
+
+class CachePolicy:
+    """ Política del resguardo (cache) de las variables : el valor obtenido o
+        escrito en el dispositivo es válido durante ttl segundos, ttl = 0 implica
+        que cada lectura se obtiene del dispositivo y ttl = None que el resguardo
+        nunca expira (salvo que se invalide explícitamente, ver invalidate).
+    """
+    def __init__(self, ttl=0) :
+        self.ttl = ttl
 
+    def fresh(self, stamp) :
+        if stamp is None :
+            return False
+        return self.ttl is None or (monotonic() - stamp) < self.ttl
 
-C_compiler = XC8
+    def __repr__(self) :
+        return 'CachePolicy(ttl={!r})'.format(self.ttl)
 
+ALWAYS_FETCH = CachePolicy(0)
+NEVER_EXPIRE = CachePolicy(None)
 
-# In[3]:
 
+class FacadeMemory:
+    # Resguardos vigentes por puerto (para su invalidación por rango) :
+    __registry__ = weakref.WeakKeyDictionary()
 
-from FacadeWrapper import *
+    # Existe una memoria por campo, los atributos se almacenan en ranuras
+    # (__slots__) en lugar de un diccionario por instancia :
+    __slots__ = ('__adr__', '__port__', '__volatil__', '__cache__', '__offset__', '__map__',
+                 '__protocol__', '__policy__', '__stamp__', '__span__', '__derived__',
+                 '__weakref__')
 
-class FacadeMemory:
-    def __init__(self, base_address, port, volatil=True) :
+    def __init__(self, base_address, port, volatil=None, policy=None) :
         self.__adr__ = base_address
         self.__port__ = port
         self.__volatil__ = volatil
-        self.__updated__ = False
         self.__cache__  = None
         self.__offset__ = 0
-        self.__compiler__ = C_compiler
-
+        self.__map__ = memory_map_of(port)
+        space = self.__map__.space(self.__class__)
+        self.__protocol__ = space.offset if space else None
+
+        # La política explícita tiene precedencia, luego la volatilidad y
+        # por defecto la política de la clase de memoria :
+        if policy is None :
+            if volatil is None :
+                policy = self.CACHE_POLICY
+            else :
+                policy = ALWAYS_FETCH if volatil else NEVER_EXPIRE
+        self.__policy__ = policy
+        self.__stamp__ = None
+        self.__span__ = None
+        self.__derived__ = False
+        # Las bases dinámicas invalidan a sus memorias cuando cambian :
+        if isinstance(base_address, (Cursor, PointerMemory)) :
+            base_address.__dependents__.append(self)
+
+    CACHE_POLICY = ALWAYS_FETCH
 
     def __add__(self, other) :
-        mem = self.__class__(self , self.__port__, volatil = self.__volatil__)
-        mem.__offset__ = int(other)
+        # La dirección se resuelve al crear la memoria derivada : si la base es
+        # estática la dirección es absoluta, si depende de una base dinámica (un
+        # puntero) se conserva dicha base y el desplazamiento acumulado, de
+        # manera que el acceso no recorre la cadena de memorias contenedoras.
+        if isinstance(self.__adr__, FacadeMemory) :
+            mem = self.__class__(self.__adr__, self.__port__, policy = self.__policy__)
+            mem.__offset__ = self.__offset__ + int(other)
+        else :
+            mem = self.__class__(self.__adr__ + self.__offset__ + int(other), self.__port__, policy = self.__policy__)
+        mem.__volatil__ = self.__volatil__
+        mem.__derived__ = True
         return mem
 
     @property
@@ -354,48 +455,229 @@ class FacadeMemory:
 
         return self.__adr__ + self.__offset__
 
+    @property
+    def __fresh__(self) :
+        # El resguardo es válido sin necesidad de consultar al dispositivo :
+        return self.__cache__ is not None and self.__policy__.fresh(self.__stamp__)
+
+    def __check__(self, length):
+        # Verifica (al crear la variable, no en cada acceso) que el rango de
+        # direcciones sea válido, los sub-campos quedan comprendidos en el
+        # rango de su contenedor :
+        if self.__derived__ :
+            return
+        if isinstance(self.__adr__, int) and self.__protocol__ is not None :
+            self.__map__.check(self.__class__, self.__adr__ + self.__offset__, length)
+
     def __retrieve__(self, length):
-        if not self.__updated__ :
-            self.__cache__ = self.__port__.getData(self.__address__ + self.PROTOCOL_OFFSET.offset, length)
+        # La dirección se resuelve antes de consultar el resguardo, pues si la
+        # base es un puntero y su valor cambió el resguardo se invalida :
+        adr = self.__address__ + self.__protocol__
+        if not self.__fresh__ :
+            self.__cache__ = self.__port__.getData(adr, length)
+            self.__validate__(adr, length)
         return self.__cache__
 
     def __store__(self, data):
-        if not self.__port__.setData(self.__address__ + self.PROTOCOL_OFFSET.offset, data) :
+        adr = self.__address__ + self.__protocol__
+        if not self.__port__.setData(adr, data) :
             raise FacadeWrapperError("El dispositivo no acepto el cambio.")
         self.__cache__ = data
-        self.__updated__ = not self.__volatil__
+        self.__validate__(adr, len(data))
+
+    def __validate__(self, adr, length):
+        # Registra el resguardo (si la política lo conserva) :
+        if self.__policy__.ttl == 0 :
+            return
+        self.__stamp__ = monotonic()
+        self.__span__ = (adr, adr + length)
+        FacadeMemory.__registry__.setdefault(self.__port__, weakref.WeakSet()).add(self)
+
+    def __invalidate__(self):
+        self.__stamp__ = None
+
+
+def invalidate(port, start=0, end=0x10000, memory_class=None):
+    """ Invalida los resguardos de las variables del puerto port que se superponen
+        con el rango de direcciones [start, end), las direcciones son las del
+        protocolo, o las del dispositivo si se especifica memory_class.
+    """
+    if memory_class is not None :
+        offset = memory_map_of(port).protocol(memory_class)
+        start += offset
+        end += offset
+
+    for mem in list(FacadeMemory.__registry__.get(port, ())) :
+        if mem.__span__ is not None and mem.__span__[0] < end and start < mem.__span__[1] :
+            mem.__invalidate__()
 
 
 class PointerMemory(FacadeMemory) :
-    def __init__(self, base_address, port, volatil=True) :
-        super().__init__(base_address, port, volatil=True)
+    """ Base dinámica del destino de un puntero (instancia de Pointer_t), su
+        dirección es la que indica el valor del puntero.
+    """
+    __slots__ = ('__pointer__', '__ptr_val__', '__target_adr__', '__dependents__')
+
+    def __init__(self, pointer) :
+        memory = pointer.__memory__
+        super().__init__(memory.__adr__, memory.__port__, policy = memory.__policy__)
+        self.__dependents__ = []
+        self.__pointer__ = pointer
+        # La traducción (y validación del rango del destino) solo se realiza
+        # cuando cambia el valor del puntero :
+        self.__ptr_val__ = None
+        self.__target_adr__ = None
 
     @property
     def __address__(self) :
-        b_adr = self.__read__()
-        return self.__compiler__.to_adr(b_adr, self.__class__.__memory_class__)
+        pointer = self.__pointer__
+        b_adr = pointer.__read__()
+        if b_adr != self.__ptr_val__ :
+            self.__target_adr__ = self.__map__.to_adr(b_adr, pointer.__memory_class__, pointer.__target_length__)
+            self.__ptr_val__ = b_adr
+            # Los resguardos del destino anterior no son válidos (ver Cursor.move) :
+            for mem in self.__dependents__ :
+                mem.__invalidate__()
+        return self.__target_adr__
 
 
 class FLASH_Memory(FacadeMemory):
+    __slots__ = ()
     PROTOCOL_OFFSET = FacadeConfig.FLASH_SPACE
+    CACHE_POLICY = NEVER_EXPIRE
 
 class RAM_Memory(FacadeMemory):
+    __slots__ = ()
     PROTOCOL_OFFSET = FacadeConfig.RAM_SPACE
+    CACHE_POLICY = ALWAYS_FETCH
 
 class Linear_RAM_Memory(FacadeMemory):
+    __slots__ = ()
     PROTOCOL_OFFSET = FacadeConfig.LINEAR_RAM_SPACE
+    CACHE_POLICY = ALWAYS_FETCH
 
 class EEPROM_Memory(FacadeMemory):
+    __slots__ = ()
     PROTOCOL_OFFSET = FacadeConfig.EEPROM_SPACE
+    CACHE_POLICY = CachePolicy(ttl=60.0)
+
+
+class Cursor(FacadeMemory):
+    """ Base dinámica cuya dirección puede modificarse (ver CType_t.at), las
+        memorias derivadas de ella se invalidan en cada desplazamiento.
+    """
+    __slots__ = ('address', '__dependents__')
+
+    def __init__(self, address):
+        self.address = address
+        self.__dependents__ = []
+
+    @property
+    def __address__(self):
+        return self.address
+
+    def move(self, address):
+        self.address = address
+        for mem in self.__dependents__ :
+            mem.__invalidate__()
 
 
 class Unallocated_Memory(FacadeMemory):
+    """ Memoria de emulación (sin dispositivo) : cada variable conserva su
+        valor en su resguardo, inicialmente en cero.
+    """
+    __slots__ = ()
+
     def __init__(self):
-        pass
+        super().__init__(0, None, policy = NEVER_EXPIRE)
+
+    def __add__(self, other):
+        return Unallocated_Memory()
+
+    def __check__(self, length):
+        if self.__cache__ is None :
+            self.__cache__ = bytes(length)
+
+    def __retrieve__(self, length):
+        return self.__cache__
+
+    def __store__(self, data):
+        self.__cache__ = data
 
     def __call__(self, *args, **kwargs):
         return Unallocated_Memory()
 
+
+class Buffer_Memory(FacadeMemory):
+    """ Memoria de emulación sobre un buffer (bytearray, mmap, numpy.ndarray o
+        cualquier objeto que exponga un buffer modificable) provisto por el
+        usuario, la dirección es el desplazamiento en el buffer (ver
+        CType_t.from_buffer). Las lecturas y escrituras operan directamente
+        sobre el buffer, sin resguardos por variable.
+    """
+    __slots__ = ('__image__', '__extent__')
+
+    def __init__(self, base_address, buffer):
+        super().__init__(base_address, None, policy = NEVER_EXPIRE)
+        self.__image__ = buffer if isinstance(buffer, memoryview) else memoryview(buffer).cast('B')
+        if self.__image__.readonly :
+            raise ValueError('El buffer de la emulación debe ser modificable.')
+        self.__extent__ = 0
+
+    def __add__(self, other):
+        mem = Buffer_Memory(self.__address__ + int(other), self.__image__)
+        mem.__derived__ = True
+        return mem
+
+    def __check__(self, length):
+        # Registra la extensión de la variable (ver __cache__) y verifica que
+        # esté comprendida en el buffer :
+        self.__extent__ = length
+        if self.__address__ < 0 or self.__address__ + length > len(self.__image__) :
+            raise ValueError('Rango (0x{:04X} - 0x{:04X}) fuera del buffer ({:d} bytes).'.format(
+                             self.__address__, self.__address__ + length - 1, len(self.__image__)))
+
+    def __retrieve__(self, length):
+        # Una vista del buffer, no una copia :
+        adr = self.__address__
+        return self.__image__[adr:adr + length]
+
+    def __store__(self, data):
+        adr = self.__address__
+        self.__image__[adr:adr + len(data)] = data
+
+    def __validate__(self, adr, length):
+        pass
+
+    @property
+    def __cache__(self):
+        return self.__retrieve__(self.__extent__)
+
+    @__cache__.setter
+    def __cache__(self, bin_value):
+        # FacadeMemory.__init__ lo inicializa en None :
+        if bin_value is not None :
+            self.__store__(bin_value)
+
+
+__memory_maps__ = {}
+
+def default_memory_map():
+    """ Mapa de memoria del compilador (C_compiler) y configuración (FacadeConfig)
+        vigentes, se construye solo si estos cambian.
+    """
+    key = (C_compiler, FacadeConfig.FLASH_SPACE, FacadeConfig.LINEAR_RAM_SPACE,
+           FacadeConfig.RAM_SPACE, FacadeConfig.EEPROM_SPACE, FacadeConfig.EMULATED_EEPROM_ADDRESS)
+    if key not in __memory_maps__ :
+        __memory_maps__[key] = C_compiler.memory_map(FacadeConfig)
+    return __memory_maps__[key]
+
+def memory_map_of(port):
+    """ Mapa de memoria del puerto (atributo memory_map) o el mapa por defecto. """
+    return getattr(port, 'memory_map', None) or default_memory_map()
+
+
+# La emulación requiere el mapa de memoria por defecto :
 no_memory = Unallocated_Memory()
 
 
@@ -403,6 +685,10 @@ no_memory = Unallocated_Memory()
 
 
 from collections import OrderedDict, namedtuple
+from collections.abc import Sequence
+import ctypes
+import gc
+import sys
 
 class CType_Meta(type):
     # Prepara para mantener el orden de definición de los atributos de clase.
@@ -433,6 +719,10 @@ class CType_t(metaclass=CType_Meta):
         clase FacadeMemory, la que sirve de enlace con el almacenamiento en
         el dispositivo remoto.
     """
+    # Atributos comunes (ver __init__ y at), las primitivas (ver Primitive_t)
+    # no requieren un diccionario por instancia :
+    __slots__ = ('__memory__', 'port', '__length__', '__cursor__')
+
     def __new__(cls, **kwargs):
         cls_name = 'FacadeOf<{:s}>'.format(cls.__name__)
         cls_dict = kwargs.pop('cls_dict', dict(vars(cls)))
@@ -442,11 +732,39 @@ class CType_t(metaclass=CType_Meta):
         inst.__init__(**kwargs)
         return inst
 
+    @classmethod
+    def at(cls, port, address, memory_class=RAM_Memory, **kwargs):
+        """ Devuelve una vista reubicable del tipo en la dirección address, la
+            vista se construye una sola vez y puede desplazarse a otra dirección
+            (ver move y records) sin crear nuevas instancias.
+        """
+        cursor = Cursor(address)
+        view = cls(memory=memory_class(cursor, port, **kwargs))
+        view.__cursor__ = cursor
+        return view
+
+    @classmethod
+    def from_buffer(cls, buffer, offset=0):
+        """ Devuelve una instancia del tipo emulada sobre el buffer (modificable)
+            desde offset, ver Buffer_Memory, ejem. :
+
+                image = bytearray(4096)
+                config = config_t.from_buffer(image, 0x100)
+                config.gain = 12       # se escribe en image[0x100 + ...]
+        """
+        return cls(memory=Buffer_Memory(offset, buffer))
+
+    def __move__(self, address):
+        self.__memory__.__map__.check(self.__memory__.__class__, address, self.__length__)
+        self.__cursor__.move(address)
+        return self
+
     def __init__(self, **kwargs) :
-        memory = kwargs.get('memory', no_memory)
+        memory = kwargs.get('memory') or no_memory()
         self.__memory__ = memory
         self.port = self.__memory__.__port__
         self.__length__ = len(self)
+        memory.__check__(self.__length__)
 
     def __get__(self, instance, cls) :
         return self
@@ -460,6 +778,14 @@ class CType_t(metaclass=CType_Meta):
     def __write__(self, value):
         self.__memory__.__store__(self.to_canonical(value))
 
+    def __fetch__(self):
+        # Representación binaria (según la política de su memoria), sin decodificar :
+        return self.__memory__.__retrieve__(self.__length__)
+
+    def __record__(self, canonical_val):
+        # Valor de la representación binaria como campo de un Record :
+        return self.to_custom(canonical_val)
+
     # __cache__ se implementa para leer o acrualizar el valor de resguardo
     # sin disparar la lectura o ecritura remota.
     @property
@@ -470,6 +796,31 @@ class CType_t(metaclass=CType_Meta):
     def __cache__(self, bin_value):
         self.__memory__.__cache__ = bin_value
 
+    def __refresh__(self, bin_value):
+        # Actualiza el resguardo con el valor obtenido o escrito en el
+        # dispositivo y lo registra como vigente (ver __fresh__) :
+        memory = self.__memory__
+        memory.__cache__ = bin_value
+        if memory.__port__ is not None :
+            memory.__validate__(memory.__address__ + memory.__protocol__, self.__length__)
+
+    @property
+    def __fresh__(self):
+        # El resguardo es válido según la política de su memoria :
+        return self.__memory__.__fresh__
+
+    def __view__(self):
+        # Vista (memoryview) del resguardo, sobre un buffer (Buffer_Memory) es
+        # una referencia modificable al buffer, de lo contrario una vista del
+        # resguardo (una copia en el caso de las estructuras) :
+        memory = self.__memory__
+        if isinstance(memory, Buffer_Memory) :
+            return memory.__retrieve__(self.__length__)
+        return memoryview(self.__cache__)
+
+    def __watch__(self, callback, fields=None):
+        return Watch(self, callback, fields)
+
 
 
 # In[5]:
@@ -478,7 +829,19 @@ class CType_t(metaclass=CType_Meta):
 class Primitive_t(CType_t):
     """ Primitive_t es una clase abstracta para los elementos que almacenan un valor único,
         su memoria de contención __cache__ se almacena explícitamente (en __mirror__).
+
+        __kind__ indica la interpretación de su representación binaria en la
+        decodificación por columnas (ver columns) : 'u' entero sin signo, 'i'
+        entero con signo, 'f' flotante (float24) y 's' secuencia de bytes.
     """
+    __kind__ = 's'
+    __slots__ = ()
+
+    def __new__(cls, **kwargs) :
+        # Las primitivas no definen campos (descriptores) propios, por lo que
+        # no requieren una clase por instancia (ver CType_t.__new__) :
+        return object.__new__(cls)
+
     def __init__(self, **kwargs) :
         #self.__mirror__ = b'\x00'*len(self)
         super().__init__(**kwargs)
@@ -491,6 +854,17 @@ class Primitive_t(CType_t):
         # se interpretan explicitamente cmo un valor :
         return self.__read__()
 
+    def __columns__(self, offset=0, prefix='') :
+        return [Column(prefix, offset, len(self), self.__kind__)]
+
+    def __ctype__(self) :
+        # Los enteros de 1, 2, 4 y 8 bytes tienen su tipo ctypes, el resto se
+        # exporta como un vector de bytes :
+        size = len(self)
+        if self.__kind__ in __ctypes_codes__ and size in __ctypes_codes__[self.__kind__] :
+            return __ctypes_codes__[self.__kind__][size]
+        return (ctypes.c_char if self.__kind__ == 's' else ctypes.c_uint8) * size
+
 #    @property
 #    def __cache__(self):
 #        return self.__mirror__
@@ -507,6 +881,9 @@ class Primitive_t(CType_t):
 from functools import reduce
 
 class uint_t(Primitive_t) :
+    __kind__ = 'u'
+    __slots__ = ()
+
     def to_canonical(self, custom_val):
         # TO DO completar con ceros si es necesario
         try :
@@ -515,12 +892,15 @@ class uint_t(Primitive_t) :
             return int(custom_val).to_bytes((self.__BIT_LEN__ + 7)//8, 'little')
 
     def to_custom(self, canonical_val):
-        return reduce(lambda a,b : a*256+b, reversed(self.__cache__))
+        return reduce(lambda a,b : a*256+b, reversed(canonical_val), 0)
 
     def __str__(self) :
         return '{0:d}[0x{1:s}]'.format(self.to_custom(self.__cache__), self.__cache__.hex())
 
 class int_t(uint_t) :
+    __kind__ = 'i'
+    __slots__ = ()
+
     def to_canonical(self, custom_val):
         if custom_val < 0 :
             custom_val += 2**(self.__BIT_LEN__)
@@ -535,44 +915,58 @@ class int_t(uint_t) :
 
 class uint8_t(uint_t):
     __BIT_LEN__ = 8
+    __slots__ = ()
 
 class uint16_t(uint_t):
     __BIT_LEN__ = 16
+    __slots__ = ()
 
 class uint24_t(uint_t):
-    __BIT_LEN__ = 32
+    __BIT_LEN__ = 24
+    __slots__ = ()
 
 class uint32_t(uint_t):
     __BIT_LEN__ = 32
+    __slots__ = ()
 
 class uint35_t(uint_t):
     __BIT_LEN__ = 35
+    __slots__ = ()
 
 class uint40_t(uint_t):
     __BIT_LEN__ = 40
+    __slots__ = ()
 
 class int8_t(int_t):
     __BIT_LEN__ = 8
+    __slots__ = ()
 
 class int16_t(int_t):
     __BIT_LEN__ = 16
+    __slots__ = ()
 
 class int24_t(int_t):
-    __BIT_LEN__ = 32
+    __BIT_LEN__ = 24
+    __slots__ = ()
 
 class int32_t(int_t):
     __BIT_LEN__ = 32
+    __slots__ = ()
 
 class int35_t(int_t):
     __BIT_LEN__ = 35
+    __slots__ = ()
 
 class int40_t(int_t):
-    __BIT_LEN__ = 50
+    __BIT_LEN__ = 40
+    __slots__ = ()
 
 
 class float24_t(Primitive_t):
     import struct
     __BIT_LEN__ = 24
+    __kind__ = 'f'
+    __slots__ = ()
 
     def to_canonical(self, custom_val):
         return struct.pack('<f', custom_val)[1:]
@@ -585,7 +979,7 @@ class float24_t(Primitive_t):
 # In[7]:
 
 
-class Pointer_t( Primitive_t, PointerMemory):
+class Pointer_t(Primitive_t):
     """ Pointer_t es la clase base de la que se derivan los elementos que sirven como punteros,
         estas últimas son en si clases adhoc, provistas por el método factoría PointerTo.
 
@@ -594,31 +988,35 @@ class Pointer_t( Primitive_t, PointerMemory):
         puntero debe obtenerse con métodos indirectos. SetTargetAdr y GetTargetAdr,
     """
     __BIT_LEN__ = 16
+    __kind__ = 'u'
+    __slots__ = ('__target_inst__',)
 
-    def __new__(cls, **kwargs) :
-        memory = kwargs.get('memory', no_memory)
-
-        cls_dict = dict(vars(cls))
-        kwargs['cls_dict'] = cls_dict
-        self = super().__new__(cls, **kwargs)
-
-        target_memory = cls.__memory_class__(self, memory.__port__, volatil = memory.__volatil__)
-        target_inst = cls.__target__(memory = target_memory)
-        #cls.__target__ = target_inst
-        self.__class__.__target__ = target_inst
+    @property
+    def __pointee__(self) :
+        # La instancia del destino se crea en el primer acceso, de lo contrario
+        # una estructura que se referencia a si misma (listas, árboles) se
+        # instanciaría indefinidamente. No puede ser un atributo de la clase
+        # pues (como descriptor) su acceso devolvería su valor :
+        target = getattr(self, '__target_inst__', None)
+        if target is None :
+            target_memory = self.__memory_class__(PointerMemory(self), self.__memory__.__port__,
+                                                  volatil = self.__memory__.__volatil__)
+            target = self.__target__(memory = target_memory)
+            self.__target_inst__ = target
+        return target
 
-        Primitive_t.__init__(self, memory=memory)
-        PointerMemory.__init__(self, memory.__adr__, memory.__port__, memory.__volatil__)
-        return self
+    @property
+    def __target_length__(self) :
+        return len(self.__pointee__)
 
 
     def __get__(self, instance, cls) :
-        if issubclass(self.__target__.__class__, Primitive_t) :
-            return self.__target__.__read__()
-        return self.__target__
+        if issubclass(self.__pointee__.__class__, Primitive_t) :
+            return self.__pointee__.__read__()
+        return self.__pointee__
 
     def __set__(self, instance, value) :
-        return self.__target__.__write__(value)
+        return self.__pointee__.__write__(value)
 
     def to_canonical(self, custom_val):
         return bytes([int(custom_val % 256), int(custom_val//256)])
@@ -630,7 +1028,8 @@ class Pointer_t( Primitive_t, PointerMemory):
 
 def PointerTo(target_t, memory_class):
     cls = type('PointerTo<{:s}>'.format(target_t.__name__), (Pointer_t,), {'__target__' : target_t,
-                                                                           '__memory_class__' : memory_class})
+                                                                           '__memory_class__' : memory_class,
+                                                                           '__slots__' : ()})
     return cls
 
 
@@ -638,6 +1037,8 @@ def PointerTo(target_t, memory_class):
 
 
 class String_t(Primitive_t) :
+    __slots__ = ()
+
     def to_canonical(self, custom_val):
         canonical = custom_val if isinstance(custom_val, (bytearray, bytes)) else custom_val.encode()
         canonical = canonical[:self.__BIT_LEN__ // 8] + b'\x00'*(self.__BIT_LEN__ // 8 - len(canonical))
@@ -645,10 +1046,10 @@ class String_t(Primitive_t) :
 
     def to_custom(self, canonical_val):
         # El valor (canóncico) se interpreta como una cadena de caracteres :
-        return canonical_val.decode()
+        return bytes(canonical_val).decode()
 
 def CharArray_t(length):
-    return type('String[{:d}]_t'.format(length), (String_t,) , {'__BIT_LEN__' : length*8})
+    return type('String[{:d}]_t'.format(length), (String_t,) , {'__BIT_LEN__' : length*8, '__slots__' : ()})
 
 
 # In[9]:
@@ -657,14 +1058,179 @@ def CharArray_t(length):
 def name_fix(name):
     return name.replace('<', '_').replace('>', '').replace('[', '_').replace(']', '').replace('__', '')
 
+__record_formats__ = {}
+
+def record_format(name, field_names):
+    """ Tipo (namedtuple) de los valores de las estructuras, se construye una
+        sola vez por distribución y no por instancia.
+    """
+    key = (name, tuple(field_names))
+    if key not in __record_formats__ :
+        record_t = namedtuple(name, field_names)
+        # Índice de los campos por nombre (ver Record) :
+        record_t.__field_index__ = {field : n for n, field in enumerate(record_t._fields)}
+        __record_formats__[key] = record_t
+    return __record_formats__[key]
+
+__undecoded__ = object()
+
+class RecordLayout:
+    """ Distribución (inmutable) de los valores de un tipo de estructura (ver
+        Record) : su tupla nominada (format) y el rango en la representación
+        binaria y el decodificador de cada campo, la función to_custom de su
+        tipo primitivo o la distribución de la sub-estructura. No refiere a
+        ninguna fachada (ni a su memoria o puerto), se construye una sola vez
+        por distribución (ver record_layout).
+    """
+    __slots__ = ('format', 'fields')
+
+    def __init__(self, format, fields):
+        self.format = format
+        self.fields = fields
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+__record_layouts__ = {}
+__prototypes__ = {}
+
+def record_layout(format, fields):
+    """ Distribución (RecordLayout) de la tupla nominada format y los campos
+        (inicio, final, tipo primitivo o RecordLayout).
+    """
+    key = (format, fields)
+    if key not in __record_layouts__ :
+        decoders = []
+        for start, end, decoder in fields :
+            if not isinstance(decoder, RecordLayout) :
+                # La decodificación de las primitivas solo depende de su clase,
+                # se utiliza una instancia sin memoria (ver Primitive_t.__new__) :
+                if decoder not in __prototypes__ :
+                    __prototypes__[decoder] = decoder.__new__(decoder)
+                decoder = __prototypes__[decoder].to_custom
+            decoders.append((start, end, decoder))
+        __record_layouts__[key] = RecordLayout(format, tuple(decoders))
+    return __record_layouts__[key]
+
+class Record(Sequence):
+    """ Valor de una estructura (ver typedef.__read__) : una vista sobre su
+        representación binaria que decodifica cada campo solo al accederlo, y
+        conserva su valor, ejem. :
+
+            ctrl = read(ctrl_state)     # no se decodifica ningún campo
+            ctrl.mode, ctrl[2]          # solo se decodifican mode y el tercero
+
+        Se comporta como la tupla nominada (custom_format) de la estructura :
+        acceso por nombre o índice, iteración, desempaque, concatenación,
+        comparación, copia, _fields, _asdict y _replace. Solo conserva la
+        distribución (RecordLayout) y los bytes, no la fachada. _materialize
+        devuelve dicha tupla (y las de sus sub-estructuras) con todos sus campos
+        decodificados, ejem. para json o isinstance(valor, tuple) ; también
+        pueden obtenerse directamente con typedef.__lazy_read__ = False.
+    """
+    __slots__ = ('__layout__', '__raw__', '__values__')
+
+    def __init__(self, layout, raw):
+        self.__layout__ = layout
+        self.__raw__ = raw
+        self.__values__ = None
+
+    def __value__(self, n):
+        values = self.__values__
+        if values is None :
+            values = self.__values__ = [__undecoded__]*len(self.__layout__.fields)
+        value = values[n]
+        if value is __undecoded__ :
+            start, end, decoder = self.__layout__.fields[n]
+            raw = self.__raw__[start:end]
+            value = values[n] = Record(decoder, raw) if isinstance(decoder, RecordLayout) else decoder(raw)
+        return value
+
+    def __getattr__(self, name):
+        # Solo se invoca para los nombres que no son atributos (los campos) :
+        n = None if name.startswith('__') else self.__layout__.format.__field_index__.get(name)
+        if n is None :
+            raise AttributeError(name)
+        return self.__value__(n)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice) :
+            return tuple(self)[idx]
+        if idx < 0 :
+            idx += len(self)
+        if not 0 <= idx < len(self) :
+            raise IndexError('Índice fuera de rango.')
+        return self.__value__(idx)
+
+    def __len__(self):
+        return len(self.__layout__.fields)
+
+    def __iter__(self):
+        return (self.__value__(n) for n in range(len(self)))
+
+    def __eq__(self, other):
+        if isinstance(other, (tuple, Record)) :
+            return tuple(self) == tuple(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __add__(self, other):
+        if isinstance(other, (tuple, Record)) :
+            return tuple(self) + tuple(other)
+        return NotImplemented
+
+    def __radd__(self, other):
+        if isinstance(other, tuple) :
+            return other + tuple(self)
+        return NotImplemented
+
+    def __repr__(self):
+        return '{:s}({:s})'.format(self.__layout__.format.__name__,
+                                   ', '.join('{:s}={!r}'.format(name, value)
+                                             for name, value in zip(self._fields, self)))
+
+    # Es inmutable, las copias no requieren duplicarlo ; en la serialización
+    # (pickle) se reemplaza por su tupla nominada :
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return self._materialize().__reduce__()
+
+    @property
+    def _fields(self):
+        return self.__layout__.format._fields
+
+    def _asdict(self):
+        return dict(zip(self._fields, self))
+
+    def _materialize(self):
+        return self.__layout__.format(*(v._materialize() if isinstance(v, Record) else v for v in self))
+
+    def _replace(self, **fields):
+        return self._materialize()._replace(**fields)
+
 class typedef(CType_t):
     def __new__(cls, **kwargs) :
-        memory = kwargs.get('memory', no_memory)
+        memory = kwargs.setdefault('memory', no_memory())
 
         field_offset, fields, cls_dict = 0, [], dict(vars(cls))
+        policies = getattr(cls, '__policies__', {})
         for key, val in cls_dict.items() :
             if isinstance(val, (type,)) and issubclass(val, CType_t) :
-                cls_dict[key] = val(memory = memory + field_offset)
+                field_memory = memory + field_offset
+                # La política del campo (si se define) se propaga a sus sub-campos :
+                if key in policies :
+                    field_memory.__policy__ = policies[key]
+                cls_dict[key] = val(memory = field_memory)
                 field_offset += len(cls_dict[key])
 
         kwargs['cls_dict'] = cls_dict
@@ -674,14 +1240,48 @@ class typedef(CType_t):
         self.__fields__ = {name: typ  for name, typ in vars(self.__class__).items() if isinstance(typ, (CType_t,)) }
 
         tuple_name = name_fix(self.__class__.__name__)
-        field_names = [name_fix(f_n) for f_n in self.__fields__.keys()]
-        self.custom_format = namedtuple(tuple_name, field_names)
+        self.custom_format = record_format(tuple_name, self.__record_names__())
 
         super().__init__(**kwargs)
 
     def __len__(self) :
         return sum(len(f) for f in self.__fields__.values())
 
+    def __record_names__(self) :
+        return tuple(name_fix(f_n) for f_n in self.__fields__.keys())
+
+    # Distribución de sus valores (ver Record), se obtiene en la primera lectura :
+    __record_layout__ = None
+
+    def __layout__(self) :
+        if self.__record_layout__ is None :
+            fields, offset = [], 0
+            for f in self.__fields__.values() :
+                decoder = f.__layout__() if isinstance(f, typedef) else type(f)
+                fields.append((offset, offset + len(f), decoder))
+                offset += len(f)
+            self.__record_layout__ = record_layout(self.custom_format, tuple(fields))
+        return self.__record_layout__
+
+    def __columns__(self, offset=0, prefix='') :
+        columns = []
+        for name, f in self.__fields__.items() :
+            if name.startswith('__elem[') :
+                name = name[len('__elem'):-2]
+            elif prefix :
+                name = '.' + name
+            columns += f.__columns__(offset, prefix + name)
+            offset += len(f)
+        return columns
+
+    def __ctype__(self) :
+        fields = tuple((name_fix(name), f.__ctype__()) for name, f in self.__fields__.items())
+        # La estructura se denomina como el tipo C (no como su fachada) :
+        name = self.__class__.__name__
+        if name.startswith('FacadeOf<') :
+            name = name[len('FacadeOf<'):-1]
+        return ctypes_structure(name_fix(name), fields)
+
     @property
     def __cache__(self):
         cache = bytearray()
@@ -696,6 +1296,16 @@ class typedef(CType_t):
             field.__cache__ = bin_value[:len(field)]
             bin_value[:len(field)] = b''
 
+    def __refresh__(self, bin_value):
+        offset = 0
+        for field in self.__fields__.values() :
+            field.__refresh__(bin_value[offset:offset + len(field)])
+            offset += len(field)
+
+    @property
+    def __fresh__(self):
+        return all(field.__fresh__ for field in self.__fields__.values())
+
     def to_canonical(self, custom_val):
         return b''.join([f.to_canonical(v) for f, v in zip(self.__fields__.values(), custom_val)])
 
@@ -709,10 +1319,20 @@ class typedef(CType_t):
         return tuple(custom)
 
     def __read__(self) :
-        fields = []
-        for f in self.__fields__.values() :
-            fields.append(f.__read__())
-        return self.custom_format(*fields)
+        # Los campos se obtienen (según su política) pero solo se decodifican
+        # al accederlos, ver Record :
+        return self.__record__(self.__fetch__())
+
+    def __fetch__(self) :
+        return b''.join(f.__fetch__() for f in self.__fields__.values())
+
+    # Si __lazy_read__ es falso (en la clase o la instancia) los valores son
+    # tuplas nominadas con todos sus campos decodificados en lugar de Record :
+    __lazy_read__ = True
+
+    def __record__(self, canonical_val) :
+        record = Record(self.__layout__(), canonical_val)
+        return record if self.__lazy_read__ else record._materialize()
 
     def __write__(self, value):
         # Se permite que value sea un descendiente de CType_t :
@@ -723,24 +1343,475 @@ class typedef(CType_t):
         # Se verifica que la estructura de valores sea compatible :
         # TODO la verificación solo afecta el primer nivel de campos !
         field_cnt = 1 if isinstance(self, (Primitive_t,)) else len(self.__fields__)
-        value_cnt = len(value) if isinstance(value, (list, tuple)) else 1
+        value_cnt = len(value) if isinstance(value, (list, tuple, Record)) else 1
         if field_cnt != value_cnt :
             raise ValueError('El número de elementos es diferente.')
 
         # Se convierte a la secuencia de bytes respectiva ...
         canonical = self.to_canonical(value)
-        # Se alamacena como un todo ...
-        super().__write__(canonical)
+
+        known = self.__known__() if self.__diff_write__ else None
+        if known is None :
+            # Se alamacena como un todo ...
+            self.__memory__.__store__(canonical)
+        else :
+            # o solo los rangos modificados respecto del resguardo :
+            for start, end in self.__diff__(known, canonical) :
+                (self.__memory__ + start).__store__(canonical[start:end])
+
         # lo que implica que el resguardo de cada campo deben actualizarse
         # independientemente :
-        self.__cache__ = canonical
+        self.__refresh__(canonical)
+
+    # La escritura diferencial (__diff_write__ = True, en la clase o la instancia)
+    # solo trasmite los rangos de bytes que difieren del resguardo, los rangos
+    # separados por menos de __diff_gap__ bytes se trasmiten en una sola trama
+    # (cada trama SET adiciona 5 bytes y la latencia del dispositivo). Si el
+    # resguardo no está vigente (ejem. en RAM, ALWAYS_FETCH) se escribe completa.
+    __diff_write__ = False
+    __diff_gap__ = 8
+
+    def __known__(self):
+        # Devuelve el resguardo si es conocido y vigente según la política de
+        # la memoria de cada campo (ejem. en RAM el dispositivo puede haberlo
+        # modificado), o None :
+        if not self.__fresh__ :
+            return None
+        return self.__cache__
+
+    def __diff__(self, old, new):
+        ranges = []
+        for n, (a, b) in enumerate(zip(old, new)) :
+            if a != b :
+                if ranges and n - ranges[-1][1] <= self.__diff_gap__ :
+                    ranges[-1][1] = n + 1
+                else :
+                    ranges.append([n, n + 1])
+        return ranges
 
     def __str__(self) :
         return str(self.__read__())
 
+    # Campo contador (seqlock) de las estructuras que exceden una trama, el
+    # dispositivo lo incrementa antes y después de cada modificación (es
+    # impar mientras la modifica), ver __snapshot__ :
+    __seqlock__ = None
+
+    def __snapshot__(self, retries=8):
+        # Lectura consistente : si la estructura cabe en una trama su lectura
+        # es atómica, de lo contrario se lee el contador (__seqlock__) antes y
+        # después de la estructura (en el mismo grupo de tramas) y se repite
+        # solo si difieren o la modificación estaba en curso :
+        memory = self.__memory__
+        port, length = memory.__port__, self.__length__
+        adr = memory.__address__ + memory.__protocol__
+
+        if length <= min(port.chunk_size, 255) :
+            raw = port.getData(adr, length)
+        elif self.__seqlock__ is None :
+            raise ValueError('La estructura ({:d} bytes) excede una trama y no define '
+                             'el contador __seqlock__.'.format(length))
+        else :
+            offset = 0
+            for name, f in self.__fields__.items() :
+                if name == self.__seqlock__ :
+                    break
+                offset += len(f)
+            else :
+                raise ValueError('El contador {:s} no es un campo de la estructura.'.format(self.__seqlock__))
+            seq = self.__fields__[self.__seqlock__]
+            seq_range = (adr + offset, len(seq))
+
+            for attempt in range(retries + 1) :
+                before, raw, after = port.getDataBatch([seq_range, (adr, length), seq_range])
+                if before == after and not seq.to_custom(before) & 1 :
+                    break
+            else :
+                raise FacadeWrapperError('No se obtuvo una lectura consistente de la estructura '
+                                         '(0x{:04X}) en {:d} intentos.'.format(adr, retries + 1))
+
+        # El resguardo se actualiza con la lectura consistente (ver __known__) :
+        self.__refresh__(raw)
+        return self.__record__(bytes(raw))
+
+    def __records__(self, start, count, stride=None, batch=None):
+        # Se leen batch registros (contiguos) por orden, por defecto los que
+        # caben en una trama del protocolo :
+        length = self.__length__
+        stride = stride or length
+        if batch is None :
+            batch = max(1, 255 // length) if stride == length else 1
+
+        memory = self.__memory__
+        memory.__map__.check(memory.__class__, start, stride*(count - 1) + length)
+        for first in range(0, count, batch) :
+            n = min(batch, count - first)
+            self.__cursor__.move(start + first*stride)
+            image = memory.__port__.getData(memory.__address__ + memory.__protocol__,
+                                            stride*(n - 1) + length)
+            for k in range(n) :
+                yield self.__record__(image[k*stride:k*stride + length])
+
+__ctypes_codes__ = {
+    'u' : {1 : ctypes.c_uint8, 2 : ctypes.c_uint16, 4 : ctypes.c_uint32, 8 : ctypes.c_uint64},
+    'i' : {1 : ctypes.c_int8,  2 : ctypes.c_int16,  4 : ctypes.c_int32,  8 : ctypes.c_int64},
+}
+__struct_codes__ = {
+    'u' : {1 : 'B', 2 : 'H', 4 : 'I', 8 : 'Q'},
+    'i' : {1 : 'b', 2 : 'h', 4 : 'i', 8 : 'q'},
+}
+__ctypes_structures__ = {}
+
+def ctypes_structure(name, fields):
+    """ Tipo ctypes.Structure (little endian, sin relleno) de los campos
+        (nombre, tipo ctypes), se construye una sola vez por distribución.
+    """
+    key = (name, fields)
+    if key not in __ctypes_structures__ :
+        __ctypes_structures__[key] = type(name, (ctypes.LittleEndianStructure,),
+                                          {'_pack_' : 1, '_fields_' : list(fields)})
+    return __ctypes_structures__[key]
+
 def read(var) :
     return var.__read__()
 
+Column = namedtuple('Column', 'name offset size kind')
+
+def columns(var) :
+    """ Devuelve la lista de columnas (Column : nombre, desplazamiento, longitud
+        y tipo, ver Primitive_t) de los campos primitivos de var, en el orden de
+        su almacenamiento. Los nombres de los sub-campos se componen con '.' y
+        los elementos de los vectores con su índice, ejem. 'pos.x', 'buf[3]'.
+    """
+    return var.__columns__()
+
+def ctype_of(var) :
+    """ Tipo ctypes (LittleEndianStructure, vector o entero) equivalente a la
+        distribución de var (o de una instancia del tipo var). Los enteros de
+        3, 5, 6 y 7 bytes y float24_t se exportan como vectores de bytes y las
+        cadenas como vectores de c_char.
+    """
+    if isinstance(var, type) :
+        var = var.at(None, 0)
+    return var.__ctype__()
+
+def struct_format(var) :
+    """ Formato (módulo struct, little endian) de los campos primitivos de var
+        (o de una instancia del tipo var) en el orden de su almacenamiento, las
+        estructuras anidadas y los vectores se aplanan, ejem. '<B2H3s'.
+    """
+    if isinstance(var, type) :
+        var = var.at(None, 0)
+    codes = []
+    for c in columns(var) :
+        code = __struct_codes__.get(c.kind, {}).get(c.size)
+        if code is None :
+            codes.append([1, '{:d}s'.format(c.size)])
+        elif codes and codes[-1][1] == code :
+            codes[-1][0] += 1
+        else :
+            codes.append([1, code])
+    return '<' + ''.join((str(n) if n > 1 else '') + code for n, code in codes)
+
+def buffer_of(var) :
+    """ Vista (memoryview) de la representación binaria de var : sobre un
+        buffer (ver CType_t.from_buffer) es una referencia modificable, de lo
+        contrario una vista de su resguardo.
+    """
+    return var.__view__()
+
+def as_ctypes(var) :
+    """ Instancia del tipo ctype_of(var) con el valor de var, comparte la
+        memoria de var si esta reside en un buffer modificable (ver
+        CType_t.from_buffer), de lo contrario es una copia de su resguardo.
+    """
+    view, ctype = buffer_of(var), var.__ctype__()
+    if view.readonly :
+        return ctype.from_buffer_copy(view)
+    return ctype.from_buffer(view)
+
+Footprint = namedtuple('Footprint', 'count size')
+
+def footprint(var) :
+    """ Memoria (aproximada, en bytes) que ocupa la fachada var (o la de una
+        instancia del tipo var) por categoría : estructuras, clases propias de
+        las estructuras (ver CType_t.__new__), primitivas y memorias (ver
+        FacadeMemory). Devuelve un OrderedDict categoría -> Footprint, con el
+        total en 'total'.
+    """
+    if isinstance(var, type) :
+        var = var.at(None, 0)
+
+    def size(obj) :
+        n = sys.getsizeof(obj)
+        if isinstance(obj, type) :
+            # El diccionario de la clase está detrás de un mappingproxy :
+            return n + sum(sys.getsizeof(d) for d in gc.get_referents(obj.__dict__))
+        if hasattr(obj, '__dict__') :
+            n += sys.getsizeof(obj.__dict__)
+        return n
+
+    report = OrderedDict((k, [0, 0]) for k in ('structures', 'classes', 'primitives', 'memories'))
+    def add(category, obj) :
+        report[category][0] += 1
+        report[category][1] += size(obj)
+
+    seen, pending = set(), [var]
+    while pending :
+        v = pending.pop()
+        if id(v) in seen :
+            continue
+        seen.add(id(v))
+        if isinstance(v, Primitive_t) :
+            add('primitives', v)
+        else :
+            add('structures', v)
+            add('classes', v.__class__)
+            pending.extend(v.__fields__.values())
+        add('memories', v.__memory__)
+        target = getattr(v, '__target_inst__', None)
+        if target is not None :
+            add('memories', target.__memory__.__adr__)
+            pending.append(target)
+
+    result = OrderedDict((k, Footprint(*v)) for k, v in report.items())
+    result['total'] = Footprint(sum(v.count for v in result.values()), sum(v.size for v in result.values()))
+    return result
+
+def move(view, address) :
+    """ Desplaza la vista (ver CType_t.at) a la dirección address. """
+    return view.__move__(address)
+
+def records(view, start, count, stride=None, batch=None) :
+    """ Genera los valores de count registros desde la dirección start (cada
+        stride bytes, por defecto su longitud) utilizando la vista reubicable
+        view, sin construir nuevas instancias por registro.
+    """
+    return view.__records__(start, count, stride, batch)
+
+def snapshot(var, retries=8) :
+    """ Lectura consistente (no intercalada con las modificaciones del
+        dispositivo) de la estructura var : en una sola trama o, si la excede,
+        validada por su contador __seqlock__, ejem. :
+
+            class ctrl_t(typedef):
+                __seqlock__ = 'seq'
+                seq = uint8_t
+                ...
+    """
+    return var.__snapshot__(retries)
+
+class Watch:
+    """ Notificación de los cambios de los campos de una variable (ver watch),
+        cada consulta (poll) obtiene su representación binaria (en una sola
+        orden) y la compara con la anterior, solo los campos cuyos bytes
+        difieren se decodifican y se notifican (callback(nombre, valor)).
+    """
+    def __init__(self, var, callback, fields=None):
+        self.var = var
+        self.callback = callback
+        self.__previous__ = None
+
+        # Rango de cada campo observado en la representación de var, los
+        # nombres compuestos ('pos.x') se refieren a los sub-campos :
+        if fields is None :
+            fields = list(var.__fields__) if isinstance(var, typedef) else ['']
+        slices = []
+        for name in fields :
+            field, offset = var, 0
+            for part in filter(None, name.split('.')) :
+                for sub_name, sub in field.__fields__.items() :
+                    if sub_name == part :
+                        field = sub
+                        break
+                    offset += len(sub)
+                else :
+                    raise ValueError('{:s} no es un campo de la variable.'.format(name))
+            slices.append((offset, offset + len(field), name, field))
+        slices.sort(key=lambda s: s[0])
+        self.__slices__ = slices
+        self.__starts__ = [s[0] for s in slices]
+
+    @property
+    def __range__(self):
+        # Rango (dirección del protocolo, longitud) de la variable, o None si no
+        # reside en un dispositivo (emulación) :
+        memory = self.var.__memory__
+        if memory.__port__ is None :
+            return None
+        return memory.__address__ + memory.__protocol__, self.var.__length__
+
+    def poll(self):
+        """ Obtiene la variable y notifica sus campos modificados, devuelve la
+            lista de sus nombres. En la primera consulta se notifican todos.
+        """
+        span = self.__range__
+        if span is None :
+            return self.__update__(bytes(self.var.__fetch__()))
+        return self.__update__(self.var.__memory__.__port__.getData(*span))
+
+    def __update__(self, raw):
+        previous, self.__previous__ = self.__previous__, raw
+        if previous == raw :
+            return []
+        if self.var.__memory__.__port__ is not None :
+            self.var.__refresh__(raw)
+
+        if previous is None :
+            changed = self.__slices__
+        else :
+            # Los bytes modificados son los no nulos del 'o exclusivo' de ambas
+            # imágenes, solo se recorren los campos que los contienen :
+            diff = int.from_bytes(raw, 'little') ^ int.from_bytes(previous, 'little')
+            changed = []
+            while diff :
+                byte = ((diff & -diff).bit_length() - 1) // 8
+                n = bisect_right(self.__starts__, byte) - 1
+                if n >= 0 and byte < self.__slices__[n][1] :
+                    changed.append(self.__slices__[n])
+                    end = self.__slices__[n][1]
+                else :
+                    end = byte + 1
+                diff &= ~((1 << 8*end) - 1)
+
+        for start, end, name, field in changed :
+            self.callback(name, field.__record__(raw[start:end]))
+        return [name for _, _, name, _ in changed]
+
+def watch(var, callback, fields=None) :
+    """ Devuelve la observación (Watch) de los campos fields (por defecto
+        todos los campos de la estructura, o la primitiva) de var, ejem. :
+
+            w = watch(ctrl, lambda name, value: print(name, value), ['mode', 'pos.x'])
+            while running :
+                w.poll()
+
+        Los campos sin cambios (la comparación es de su representación binaria)
+        no se decodifican ni se notifican.
+    """
+    return var.__watch__(callback, fields)
+
+def poll(watches) :
+    """ Consulta las observaciones watches, las de un mismo puerto en un solo
+        grupo de órdenes (ver FacadeWrapper.getDataBatch), devuelve la lista de
+        los campos modificados de cada una.
+    """
+    changed, ports = [None]*len(watches), OrderedDict()
+    for n, w in enumerate(watches) :
+        span = w.__range__
+        if span is None :
+            changed[n] = w.poll()
+        else :
+            ports.setdefault(w.var.__memory__.__port__, []).append((n, span))
+    for port, pending in ports.items() :
+        images = port.getDataBatch([span for _, span in pending])
+        for (n, _), raw in zip(pending, images) :
+            changed[n] = watches[n].__update__(raw)
+    return changed
+
+def traverse(port, node_t, roots, links=None, memory_class=RAM_Memory, max_nodes=10000,
+             coalesce_gap=16, window=None, readahead=0) :
+    """ Recorre una estructura enlazada (lista, árbol, cola) de nodos node_t
+        desde las direcciones roots, siguiendo los punteros links (nombres de
+        los campos, por defecto los que apuntan a node_t en memory_class).
+
+        Los nodos se leen completos y por niveles : los descubiertos en un
+        nivel se agrupan (los vecinos separados por a lo sumo coalesce_gap
+        bytes se leen en un solo rango) y se solicitan juntos (ver
+        FacadeWrapper.getDataBatch), de manera que el costo es de unas pocas
+        tramas por nivel y no por campo. El recorrido se detiene en los
+        punteros nulos o fuera de rango y en los nodos ya visitados.
+
+        Si readahead > 0 cada rango se extiende (dentro de la trama) hasta
+        readahead bytes, los nodos que caen en lo ya leído (por ejemplo los
+        de una lista asignada en forma contigua) no se vuelven a solicitar.
+
+        Devuelve un OrderedDict dirección -> valor del nodo.
+    """
+    if isinstance(roots, int) :
+        roots = [roots]
+    roots = list(roots)
+    nodes = OrderedDict()
+    if not roots :
+        return nodes
+
+    # Una sola vista para decodificar los nodos :
+    view = node_t.at(port, roots[0], memory_class)
+    memory = view.__memory__
+    length = len(view)
+
+    fields = list(view.__fields__.items())
+    if links is None :
+        links = [name for name, f in fields if isinstance(f, Pointer_t)
+                 and f.__target__ is node_t and f.__memory_class__ is memory_class]
+    follow, offset = [], 0
+    for name, f in fields :
+        if name in links :
+            follow.append((offset, f))
+        offset += len(f)
+
+    space = memory.__map__.space(memory_class)
+    fetched = []        # rangos ya leídos : (inicio, fin, imagen)
+    level, seen = [], set()
+    for adr in roots :
+        memory.__map__.check(memory_class, adr, length)
+        if adr not in seen :
+            seen.add(adr)
+            level.append(adr)
+
+    while level and len(nodes) < max_nodes :
+        level = sorted(level[:max_nodes - len(nodes)])
+
+        # Los nodos contenidos en los rangos ya leídos no se solicitan :
+        spans, pending = [], []
+        for adr in level :
+            for start, end, image in fetched :
+                if start <= adr and adr + length <= end :
+                    spans.append((start, [adr], image))
+                    break
+            else :
+                pending.append(adr)
+
+        # Se agrupan los nodos vecinos en rangos de a lo sumo una trama :
+        groups = []
+        for adr in pending :
+            if groups and adr - groups[-1][1] <= coalesce_gap and adr + length - groups[-1][0] <= 255 :
+                groups[-1][1] = max(groups[-1][1], adr + length)
+                groups[-1][2].append(adr)
+            else :
+                groups.append([adr, adr + length, [adr]])
+        for group in groups :
+            group[1] = max(group[1], min(group[0] + max(length, readahead), group[0] + 255,
+                                         space.final + 1))
+
+        images = port.getDataBatch([(start + memory.__protocol__, end - start)
+                                    for start, end, _ in groups], window) if groups else []
+        for (start, end, members), image in zip(groups, images) :
+            image = memoryview(image)
+            if readahead :
+                fetched.append((start, end, image))
+            spans.append((start, members, image))
+
+        level = []
+        for start, members, image in spans :
+            for adr in members :
+                raw = image[adr - start:adr - start + length]
+                nodes[adr] = view.__record__(bytes(raw))
+                for offset, f in follow :
+                    ptr_val = f.to_custom(raw[offset:offset + len(f)])
+                    if ptr_val == 0 :
+                        continue
+                    try :
+                        target = memory.__map__.to_adr(ptr_val, f.__memory_class__, length)
+                    except ValueError :
+                        continue
+                    if target not in seen :
+                        seen.add(target)
+                        level.append(target)
+
+    return nodes
+
+
 
 def CStruct(dict_fields, tag=None) :
     if tag is None :
@@ -759,11 +1830,16 @@ class Array_t(typedef):
     def __setitem__(self, idx, value) :
         setattr(self, '__elem[{:d}]__'.format(idx), value)
 
-    def __read__(self) :
-        tuple_name = self.__class__.__name__.replace('<', '_').replace('>', '_').replace('[', '_').replace(']', '_')
-        names = list('e{:d}'.format(n) for n, _ in enumerate(self.__fields__.values()))
-        values = (e.__read__() for e in self.__fields__.values())
-        return namedtuple(tuple_name, names)(*values)
+    def __record_names__(self) :
+        # Los elementos se denominan e0, e1, ... :
+        return tuple('e{:d}'.format(n) for n in range(len(self.__fields__)))
+
+    def __ctype__(self) :
+        fields = list(self.__fields__.values())
+        # Un vector vacío (ejem. el último miembro flexible) no ocupa bytes :
+        if not fields :
+            return ctypes.c_uint8 * 0
+        return fields[0].__ctype__() * len(fields)
 
 
 def ArrayOf(pattern_t, length):
@@ -772,4 +1848,126 @@ def ArrayOf(pattern_t, length):
     return cls
 
 
+# In[11]:
+
+
+class Bit_t:
+    """ Descriptor de un campo de bits (de ancho width a partir del bit shift)
+        dentro de la palabra de una instancia de Bits_t.
+    """
+    def __init__(self, name, shift, width):
+        self.name, self.shift, self.width = name, shift, width
+        self.mask = ((1 << width) - 1) << shift
+
+    def __get__(self, instance, cls):
+        if instance is None:
+            return self
+        return (instance.__word__() & self.mask) >> self.shift
+
+    def __set__(self, instance, value):
+        instance.modify(**{self.name: value})
 
+
+class Bits_t(uint_t):
+    """ Bits_t es la clase base de las palabras con campos de bits, provistas por
+        la función factoría BitField. El acceso a cada campo se realiza con la
+        notación 'dot' (punto), ejem. :
+
+            class status_t(typedef):                 typedef struct {
+                flags = BitField(uint8_t,                uint8_t ready : 1 ;
+                                 ready=1, mode=3)        uint8_t mode  : 3 ;
+                                                     } status_t ;
+
+            status.flags.ready = 1
+
+        La modificación de un campo es una lectura-modificación-escritura de la
+        palabra, que se reduce a una sola escritura si el resguardo de la palabra
+        es válido (o si se modifican todos sus bits). Para modificar varios campos
+        con una sola operación se utiliza modify o la instancia como contexto :
+
+            status.flags.modify(ready=1, mode=2)
+
+            with status.flags as flags:
+                flags.ready = 1
+                flags.mode = 2
+
+        Los campos cuyo nombre inicia con '_' son de relleno (sin acceso).
+    """
+    __slots__ = ('__pending__',)
+
+    def __get__(self, instance, cls):
+        # Como las estructuras, se interpreta como un contenedor (de bits) :
+        return self
+
+    def __word__(self):
+        return uint_t.to_custom(self, self.__memory__.__retrieve__(self.__length__))
+
+    def __int__(self):
+        return self.__word__()
+
+    def to_canonical(self, custom_val):
+        if isinstance(custom_val, dict):
+            custom_val = self.__compose__(custom_val)[1]
+        elif isinstance(custom_val, (tuple, list)):
+            custom_val = self.__compose__(dict(zip(self.__BITS__, custom_val)))[1]
+        return super().to_canonical(custom_val)
+
+    def to_custom(self, canonical_val):
+        word = super().to_custom(canonical_val)
+        return self.custom_format(*((word & b.mask) >> b.shift for b in self.__BITS__.values()))
+
+    def __compose__(self, bits):
+        mask, value = 0, 0
+        for name, val in bits.items():
+            bit = self.__BITS__[name]
+            mask |= bit.mask
+            value = (value & ~bit.mask) | ((int(val) << bit.shift) & bit.mask)
+        return mask, value
+
+    def modify(self, **bits):
+        mask, value = self.__compose__(bits)
+        pending = getattr(self, '__pending__', None)
+        if pending is not None:
+            # Dentro de un contexto solo se acumulan las modificaciones :
+            pending[0] |= mask
+            pending[1] = (pending[1] & ~mask) | value
+        else:
+            self.__apply__(mask, value)
+
+    def __apply__(self, mask, value):
+        if not mask:
+            return
+        full = (1 << (8*self.__length__)) - 1
+        word = 0 if (mask & full) == full else self.__word__()
+        self.__write__((word & ~mask) | value)
+
+    def __enter__(self):
+        self.__pending__ = [0, 0]
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        mask, value = self.__pending__
+        self.__pending__ = None
+        if exc_type is None:
+            self.__apply__(mask, value)
+
+    def __str__(self):
+        return str(self.__read__())
+
+
+def BitField(base_t, **widths):
+    """ Devuelve el tipo de una palabra del tipo base_t (ejem. uint8_t) con los
+        campos de bits de los anchos dados (a partir del bit menos significativo).
+    """
+    if sum(widths.values()) > base_t.__BIT_LEN__:
+        raise ValueError('Los campos de bits exceden el ancho de {:s}.'.format(base_t.__name__))
+
+    bits, shift = OrderedDict(), 0
+    for name, width in widths.items():
+        if not name.startswith('_'):
+            bits[name] = Bit_t(name, shift, width)
+        shift += width
+
+    cls_dict = dict(bits, __BITS__=bits, __BIT_LEN__=base_t.__BIT_LEN__,
+                    custom_format=namedtuple('bits', list(bits)), __slots__=())
+    return type('BitField<{:s}>'.format(base_t.__name__), (Bits_t,), cls_dict)
@@ -0,0 +1,262 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Índice de los símbolos (variables globales) del programa del dispositivo a
+partir de los archivos de mapa (.map) y/o símbolos (.sym) del compilador XC8,
+de manera que las fachadas se vinculan por nombre en lugar de por dirección,
+ejem. :
+
+    device = load_symbols('dist/default/production/prog.map', facade_port)
+    ctrl = device.sym('ctrl_state', ctrl_t)
+
+Cada símbolo (Symbol) tiene su nombre C (sin el prefijo '_' del ensamblador),
+dirección, longitud, espacio de memoria ('RAM', 'FLASH' o 'EEPROM') y la
+sección (psect) en la que reside. El compilador no informa la longitud de cada
+variable, se estima como la distancia al siguiente símbolo de la sección (o a
+su final), es decir es una cota superior.
+
+El índice interpretado se guarda en un archivo (JSON) junto al mapa (o en
+cache_dir) identificado por el resumen (hash) de los archivos, de manera que
+las ejecuciones posteriores no vuelven a interpretarlos.
+"""
+
+import re
+import warnings
+from bisect import bisect_right
+from collections import namedtuple
+
+from CStruct import EEPROM_Memory, FLASH_Memory, RAM_Memory
+from filecache import load_cached
+
+INDEX_VERSION = 1
+
+Symbol = namedtuple('Symbol', 'name address size space psect')
+
+MEMORY_CLASSES = {
+    'RAM' : RAM_Memory, 'FLASH' : FLASH_Memory, 'EEPROM' : EEPROM_Memory,
+}
+
+# Espacios (columna Space de la tabla de secciones del mapa) :
+SPACES = {0 : 'FLASH', 1 : 'RAM', 3 : 'EEPROM'}
+
+# Espacio según el nombre (prefijo) de la sección o la clase de la sección
+# (archivos .sym), cuando la tabla de secciones no lo define :
+PSECT_SPACES = (
+    ('eeprom', 'EEPROM'), ('eedata', 'EEPROM'),
+    ('bss', 'RAM'), ('data', 'RAM'), ('nv', 'RAM'), ('cstack', 'RAM'), ('comram', 'RAM'),
+    ('bank', 'RAM'), ('common', 'RAM'), ('ram', 'RAM'), ('(abs)', 'RAM'), ('abs', 'RAM'),
+    ('text', 'FLASH'), ('code', 'FLASH'), ('const', 'FLASH'), ('smallconst', 'FLASH'),
+    ('mediumconst', 'FLASH'), ('idata', 'FLASH'), ('init', 'FLASH'), ('cinit', 'FLASH'),
+    ('config', 'FLASH'), ('idloc', 'FLASH'), ('strings', 'FLASH'),
+)
+
+# En los PIC18 la EEPROM se ubica en 0xF00000 del espacio del enlazador :
+EEPROM_BASE = 0xF00000
+
+# Las filas de la tabla de secciones (Name Link Load Length Selector Space
+# Scale), la primera de cada módulo comienza con su archivo objeto :
+PSECT_LINE = re.compile(r'^(?:\S*[./\\]\S*)?\s+([\w$]+)\s+([0-9A-Fa-f]+)\s+([0-9A-Fa-f]+)\s+([0-9A-Fa-f]+)'
+                        r'\s+([0-9A-Fa-f]+)\s+(\d+)(?:\s+\d+)?\s*$')
+HEX = re.compile(r'^[0-9A-Fa-f]+$')
+
+
+class SymbolError(ValueError):
+    pass
+
+
+
+def _space_of(psect, spaces) :
+    if psect in spaces :
+        return spaces[psect]
+    lower = psect.lower()
+    for prefix, space in PSECT_SPACES :
+        if lower.startswith(prefix) :
+            return space
+    return None
+
+def _c_name(name) :
+    """
+    Nombre C del símbolo del ensamblador ('_ctrl' -> 'ctrl'), None para los
+    símbolos internos del compilador y del enlazador ('__Hbss', '?_f', ...).
+    """
+    if name.startswith('__') or name.startswith('?') :
+        return None
+    return name[1:] if name.startswith('_') else name
+
+
+def parse_map(text) :
+    """
+    Interpreta un archivo de mapa de XC8, devuelve los símbolos (nombre del
+    ensamblador, dirección, sección) de la tabla de símbolos ('Symbol Table')
+    y las secciones : un diccionario nombre -> (inicio, final, espacio).
+    """
+    psects, symbols, in_table, has_table = {}, [], False, False
+    for line in text.splitlines() :
+        if in_table :
+            tokens = line.split()
+            # La tabla lista uno o más símbolos (nombre sección valor) por
+            # línea, y termina con la primera línea que no corresponde :
+            if not tokens :
+                continue
+            if len(tokens) % 3 or not all(HEX.match(v) for v in tokens[2::3]) :
+                in_table = False
+                continue
+            for k in range(0, len(tokens), 3) :
+                symbols.append((tokens[k], int(tokens[k + 2], 16), tokens[k + 1]))
+        elif line.strip() == 'Symbol Table' :
+            in_table = has_table = True
+        else :
+            psect = PSECT_LINE.match(line)
+            if psect :
+                name, link, length, space = psect.group(1), int(psect.group(2), 16), \
+                                            int(psect.group(4), 16), int(psect.group(6))
+                # Una sección se compone de las contribuciones de cada módulo :
+                start, end, _ = psects.get(name, (link, link + length, None))
+                psects[name] = (min(start, link), max(end, link + length), SPACES.get(space))
+    if has_table and not psects :
+        # Sin las secciones no se estima la longitud de los símbolos :
+        warnings.warn('El mapa no incluye la tabla de secciones (o no se '
+                      'reconoce su formato), no se verifica la longitud de los símbolos.')
+    return symbols, psects
+
+def parse_sym(text) :
+    """
+    Interpreta un archivo de símbolos (.sym) de XC8 : una línea por símbolo
+    con su nombre y valor (hexadecimal) seguidos de su clase y sección, devuelve
+    los símbolos (nombre del ensamblador, dirección, sección).
+    """
+    symbols = []
+    for line in text.splitlines() :
+        tokens = line.split()
+        if len(tokens) < 2 or not HEX.match(tokens[1]) :
+            continue
+        # La sección es el último campo antes del archivo objeto (si lo hay) que
+        # no es numérico :
+        names = [t for t in tokens[2:] if not t.isdigit() and '/' not in t and '\\' not in t and '.' not in t]
+        symbols.append((tokens[0], int(tokens[1], 16), names[-1] if names else ''))
+    return symbols
+
+def index(symbols, psects=None) :
+    """
+    Construye el índice : la lista de Symbol (ordenada por espacio y dirección)
+    de los símbolos C, la longitud se estima como la distancia al siguiente
+    símbolo de la sección o a su final.
+    """
+    psects = psects or {}
+    spaces = {name : space for name, (_, _, space) in psects.items() if space}
+
+    entries = {}
+    for raw_name, address, psect in symbols :
+        name = _c_name(raw_name)
+        if name is None or name in entries :
+            continue
+        space = _space_of(psect, spaces)
+        if space == 'EEPROM' and address >= EEPROM_BASE :
+            address -= EEPROM_BASE
+        entries[name] = [name, address, None, space, psect]
+
+    by_psect = {}
+    for entry in entries.values() :
+        by_psect.setdefault(entry[4], []).append(entry)
+    for psect, group in by_psect.items() :
+        group.sort(key = lambda e: e[1])
+        end = psects[psect][1] if psect in psects else None
+        if end is not None and group[0][3] == 'EEPROM' and end > EEPROM_BASE :
+            end -= EEPROM_BASE
+        for entry, following in zip(group, group[1:] + [None]) :
+            limit = following[1] if following else end
+            if limit is not None and limit > entry[1] :
+                entry[2] = limit - entry[1]
+
+    return sorted((Symbol(*e) for e in entries.values()), key = lambda s: (s.space or '', s.address))
+
+
+class SymbolTable :
+    """
+    Índice de los símbolos del programa del dispositivo (ver load_symbols),
+    vinculado opcionalmente al puerto de fachada port.
+    """
+    def __init__(self, symbols, port = None) :
+      self.port = port
+      self.__symbols = {s.name : s for s in symbols}
+      # Índice por dirección de cada espacio (ver symbol_at) :
+      self.__spaces = {}
+      for s in sorted(symbols, key = lambda s: s.address) :
+         addresses, entries = self.__spaces.setdefault(s.space, ([], []))
+         addresses.append(s.address)
+         entries.append(s)
+
+    def __len__(self) :
+      return len(self.__symbols)
+
+    def __contains__(self, name) :
+      return name in self.__symbols
+
+    def __iter__(self) :
+      return iter(self.__symbols.values())
+
+    def __getitem__(self, name) :
+      try :
+         return self.__symbols[name]
+      except KeyError :
+         raise SymbolError('El símbolo "{:s}" no está definido.'.format(name)) from None
+
+    def address(self, name) :
+      return self[name].address
+
+    def symbol_at(self, address, space = 'RAM') :
+      """ Símbolo que comprende la dirección address del espacio space, o None. """
+      addresses, entries = self.__spaces.get(space, ((), ()))
+      n = bisect_right(addresses, address) - 1
+      if n < 0 :
+         return None
+      symbol = entries[n]
+      if address >= symbol.address + (symbol.size or 1) :
+         return None
+      return symbol
+
+    def sym(self, name, type_t, memory_class = None, port = None, **kwargs) :
+      """
+      Devuelve la fachada (instancia de type_t) de la variable name, en la
+      memoria de su espacio (o memory_class) y el puerto de la tabla (o port),
+      los argumentos adicionales se transfieren a la memoria (volatil, policy).
+      """
+      symbol = self[name]
+      if memory_class is None :
+         memory_class = MEMORY_CLASSES.get(symbol.space, RAM_Memory)
+      var = type_t(memory = memory_class(symbol.address, port or self.port, **kwargs))
+      if symbol.size is not None and len(var) > symbol.size :
+         raise SymbolError('El tipo {:s} ({:d} bytes) excede el símbolo "{:s}" ({:d} bytes).'.format(
+                           type_t.__name__, len(var), name, symbol.size))
+      return var
+
+    def bind(self, types, port = None, **kwargs) :
+      """ Devuelve las fachadas de las variables de types (nombre -> tipo). """
+      return {name : self.sym(name, type_t, port = port, **kwargs) for name, type_t in types.items()}
+
+
+
+def _parse(texts) :
+    raw_symbols, psects = [], {}
+    for filename, text in texts :
+        if filename.lower().endswith('.sym') :
+            raw_symbols += parse_sym(text)
+        else :
+            found, sections = parse_map(text)
+            raw_symbols += found
+            psects.update(sections)
+    return index(raw_symbols, psects)
+
+def load_symbols(filenames, port = None, cache_dir = None) :
+    """
+    Devuelve la tabla de símbolos (SymbolTable) de los archivos filenames (un
+    nombre o una lista, de mapa .map y/o símbolos .sym) vinculada al puerto
+    port. El índice se toma del archivo <filename>.symbols.json (junto al
+    primero o en cache_dir) si corresponde al contenido actual de los archivos,
+    de lo contrario se interpretan y se actualiza el archivo.
+    """
+    if isinstance(filenames, str) :
+        filenames = [filenames]
+    symbols = load_cached(filenames, '.symbols.json', INDEX_VERSION, _parse, cache_dir)
+    return SymbolTable([Symbol(*s) for s in symbols], port)
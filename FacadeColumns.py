@@ -0,0 +1,499 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Decodificación por columnas de secuencias de imágenes binarias de estructuras
+(capturas de la memoria del dispositivo), ejem. :
+
+    cols = decode_columns(sample_t, 'captura.bin')
+    cols['pos.x'][1000]
+
+Cada campo primitivo de la estructura (ver CStruct.columns) produce una columna
+(array.array o, si numpy está disponible, numpy.ndarray) con el valor de todos
+los registros. La decodificación se reparte por trozos entre varios procesos,
+que escriben directamente en las columnas ubicadas en memoria compartida, de
+manera que no se construyen (ni serializan) tuplas por registro.
+
+Las columnas de tipo 's' (secuencias de bytes) se devuelven como un bytearray
+de count*size bytes (o un numpy.ndarray de tipo 'S<size>').
+
+ColumnRecorder registra en disco (por segmentos de archivos .npy) los valores
+muestreados de un conjunto de variables, ejem. :
+
+    with ColumnRecorder('registro', {'ctrl' : ctrl, 'adc' : adc}) as rec :
+        while running :
+            rec.sample()
+
+    cols = load_recording('registro')
+"""
+
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from time import time
+
+from CStruct import Column, CType_t, columns
+
+try :
+    import numpy
+except ImportError :
+    numpy = None
+
+# Bytes por trozo asignado a cada proceso :
+CHUNK_BYTES = 4 << 20
+
+# Tipo (array.array) de las columnas numéricas según su tipo y longitud :
+_TYPECODES = {
+    'u' : {1 : 'B', 2 : 'H', 3 : 'I', 4 : 'I', 5 : 'Q', 6 : 'Q', 7 : 'Q', 8 : 'Q'},
+    'i' : {1 : 'b', 2 : 'h', 3 : 'i', 4 : 'i', 5 : 'q', 6 : 'q', 7 : 'q', 8 : 'q'},
+    'f' : {3 : 'f', 4 : 'f'},
+}
+
+
+def typecode(column) :
+    """ Tipo (array.array) de la columna, None para las secuencias de bytes. """
+    if column.kind == 's' :
+        return None
+    try :
+        return _TYPECODES[column.kind][column.size]
+    except KeyError :
+        raise ValueError('El campo {:s} ({:d} bytes) no puede decodificarse en una columna.'.format(column.name, column.size))
+
+def itemsize(column) :
+    code = typecode(column)
+    return column.size if code is None else array(code).itemsize
+
+
+def plan(layout) :
+    """ Columnas de layout : una subclase (o instancia) de typedef o una lista
+        de Column (ver CStruct.columns).
+    """
+    if isinstance(layout, type) and issubclass(layout, CType_t) :
+        layout = layout.at(None, 0)
+    if isinstance(layout, CType_t) :
+        return columns(layout), len(layout)
+
+    layout = [Column(*c) for c in layout]
+    return layout, max(c.offset + c.size for c in layout)
+
+
+def _record_format(cols, stride) :
+    # Formato (struct) del registro completo, los campos sin equivalente
+    # directo se extraen como bytes :
+    fmt, pos = '<', 0
+    for c in sorted(cols, key=lambda c: c.offset) :
+        if c.offset < pos :
+            raise ValueError('El campo {:s} se superpone con el anterior.'.format(c.name))
+        fmt += 'x'*(c.offset - pos)
+        code = typecode(c)
+        fmt += code if code is not None and array(code).itemsize == c.size else '{:d}s'.format(c.size)
+        pos = c.offset + c.size
+    return fmt + 'x'*(stride - pos)
+
+
+def _convert(column, values) :
+    # Valores de la columna cuya longitud no tiene equivalente directo :
+    if column.kind == 'f' :
+        return [struct.unpack('<f', b'\x00' + v)[0] for v in values]
+    if column.kind == 'i' :
+        return [int.from_bytes(v, 'little', signed=True) for v in values]
+    return [int.from_bytes(v, 'little') for v in values]
+
+
+def _decode(cols, stride, raw, out, first) :
+    """ Decodifica los registros de raw (count*stride bytes) en las columnas out
+        (memoryview por columna) a partir del registro first.
+    """
+    n = len(raw) // stride
+    if numpy is not None :
+        image = numpy.frombuffer(raw, dtype=numpy.uint8, count=n*stride).reshape(n, stride)
+        for c, dest in zip(cols, out) :
+            field = image[:, c.offset:c.offset + c.size]
+            code = typecode(c)
+            if code is None :
+                values = numpy.ascontiguousarray(field).view('S{:d}'.format(c.size)).ravel()
+            elif c.kind == 'f' :
+                values = numpy.zeros((n, 4), dtype=numpy.uint8)
+                values[:, 4 - c.size:] = field
+                values = values.view('<f4').ravel()
+            elif c.size in (1, 2, 4, 8) :
+                values = numpy.ascontiguousarray(field).view('<{:s}{:d}'.format(c.kind, c.size)).ravel()
+            else :
+                values = numpy.zeros(n, dtype=numpy.uint64)
+                for k in range(c.size) :
+                    values |= field[:, k].astype(numpy.uint64) << numpy.uint64(8*k)
+                if c.kind == 'i' :
+                    values = values.view(numpy.int64)
+                    sign = 1 << (8*c.size - 1)
+                    values = (values ^ sign) - sign
+            if code is not None :
+                values = values.astype(code)
+            size = itemsize(c)
+            target = numpy.frombuffer(dest, dtype=numpy.uint8)[first*size:(first + n)*size]
+            target[:] = numpy.ascontiguousarray(values).view(numpy.uint8).ravel()
+        return
+
+    rows = struct.Struct(_record_format(cols, stride)).iter_unpack(raw[:n*stride])
+    order = sorted(range(len(cols)), key=lambda k: cols[k].offset)
+    fields = list(zip(*rows)) or [()]*len(cols)
+    for k, values in zip(order, fields) :
+        c, dest = cols[k], out[k]
+        code = typecode(c)
+        if code is None :
+            dest[first*c.size:(first + n)*c.size] = b''.join(values)
+            continue
+        if array(code).itemsize != c.size :
+            values = _convert(c, values)
+        dest.cast(code)[first:first + n] = array(code, values)
+
+
+def _decode_chunk(task) :
+    # Tarea de los procesos : decodifica un trozo en la memoria compartida.
+    cols, stride, source, first, count, shm_name, offsets, total = task
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try :
+        kind, name, base = source
+        if kind == 'file' :
+            with open(name, 'rb') as f :
+                f.seek(base + first*stride)
+                raw = f.read(count*stride)
+        else :
+            src = shared_memory.SharedMemory(name=name)
+            try :
+                with src.buf[base + first*stride:base + (first + count)*stride] as view :
+                    raw = bytes(view)
+            finally :
+                src.close()
+
+        _decode_into(cols, stride, raw, shm, offsets, total, first)
+    finally :
+        shm.close()
+    return count
+
+
+def _decode_into(cols, stride, raw, shm, offsets, total, first) :
+    # Las vistas de la memoria compartida se liberan aún si la decodificación
+    # falla, de lo contrario no puede cerrarse (BufferError) :
+    out = []
+    try :
+        for k, c in enumerate(cols) :
+            out.append(shm.buf[offsets[k]:offsets[k] + itemsize(c)*total])
+        _decode(cols, stride, raw, out, first)
+    finally :
+        for view in out :
+            view.release()
+
+
+def decode_columns(layout, source, count=None, offset=0, stride=None, processes=None,
+                   chunk=None) :
+    """ Decodifica count registros (por defecto todos) de source (bytes,
+        bytearray, memoryview o el nombre de un archivo) a partir de offset,
+        cada stride bytes (por defecto la longitud de layout, ver plan).
+
+        La decodificación se reparte en trozos de chunk registros entre
+        processes procesos (por defecto uno por núcleo), si hay un solo trozo
+        o processes es 1 se realiza en el propio proceso.
+
+        Devuelve un OrderedDict nombre del campo -> columna.
+    """
+    cols, length = plan(layout)
+    stride = stride or length
+    if stride < length :
+        raise ValueError('El paso (stride) es menor que la longitud del registro.')
+
+    if isinstance(source, (str, os.PathLike)) :
+        available = os.path.getsize(source) - offset
+    else :
+        source = memoryview(source).cast('B')
+        available = len(source) - offset
+    if count is None :
+        count = max(0, available // stride)
+    elif count*stride > available :
+        raise ValueError('La fuente contiene menos de {:d} registros.'.format(count))
+
+    chunk = chunk or max(1, CHUNK_BYTES // stride)
+    processes = processes or os.cpu_count() or 1
+
+    # Las columnas se ubican (alineadas) en un solo bloque de memoria compartida :
+    offsets, total = [], 0
+    for c in cols :
+        offsets.append(total)
+        total += (itemsize(c)*count + 7) & ~7
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, total))
+    src = None
+    try :
+        if processes == 1 or count <= chunk :
+            if not isinstance(source, memoryview) :
+                with open(source, 'rb') as f :
+                    f.seek(offset)
+                    source = memoryview(f.read(count*stride))
+                offset = 0
+            _decode_into(cols, stride, source[offset:offset + count*stride], shm, offsets, count, 0)
+        else :
+            if isinstance(source, memoryview) :
+                src = shared_memory.SharedMemory(create=True, size=max(1, count*stride))
+                src.buf[:count*stride] = source[offset:offset + count*stride]
+                source_desc = ('shm', src.name, 0)
+            else :
+                source_desc = ('file', os.fspath(source), offset)
+
+            tasks = [(cols, stride, source_desc, first, min(chunk, count - first), shm.name,
+                      offsets, count) for first in range(0, count, chunk)]
+            with ProcessPoolExecutor(processes) as pool :
+                for _ in pool.map(_decode_chunk, tasks) :
+                    pass
+
+        result = OrderedDict()
+        for c, start in zip(cols, offsets) :
+            result[c.name] = _column(c, shm.buf[start:start + itemsize(c)*count], count)
+        return result
+    finally :
+        if src is not None :
+            src.close()
+            src.unlink()
+        shm.close()
+        shm.unlink()
+
+
+def _column(column, raw, count) :
+    # Copia la columna de la memoria compartida :
+    code = typecode(column)
+    try :
+        if numpy is not None :
+            dtype = 'S{:d}'.format(column.size) if code is None else code
+            return numpy.frombuffer(raw, dtype=dtype, count=count).copy()
+        if code is None :
+            return bytearray(raw)
+        col = array(code)
+        col.frombytes(raw)
+        return col
+    finally :
+        raw.release()
+
+
+
+# Descripción (numpy) de los tipos de las columnas en los archivos .npy :
+_ENDIAN = '<' if sys.byteorder == 'little' else '>'
+_DESCR = {'B' : '|u1', 'b' : '|i1', 'H' : 'u2', 'h' : 'i2', 'I' : 'u4', 'i' : 'i4',
+          'Q' : 'u8', 'q' : 'i8', 'f' : 'f4', 'd' : 'f8'}
+
+NPY_MAGIC = b'\x93NUMPY\x01\x00'
+
+
+def _descr(code, size=None) :
+    if code is None :
+        return '|S{:d}'.format(size)
+    descr = _DESCR[code]
+    return descr if descr[0] == '|' else _ENDIAN + descr
+
+def write_npy(f, descr, count, data) :
+    """ Escribe en el archivo (binario) f el vector de count elementos de tipo
+        descr (descripción numpy, ejem. '<u2') con los datos data.
+    """
+    header = "{{'descr': '{:s}', 'fortran_order': False, 'shape': ({:d},), }}".format(descr, count)
+    header += ' '*(63 - (len(NPY_MAGIC) + 2 + len(header)) % 64) + '\n'
+    f.write(NPY_MAGIC + struct.pack('<H', len(header)) + header.encode('latin1'))
+    f.write(data)
+
+def read_npy(filename) :
+    """ Lee un vector escrito por write_npy (sin requerir numpy), devuelve un
+        array.array o un bytearray para los vectores de bytes ('S<n>').
+    """
+    with open(filename, 'rb') as f :
+        if f.read(len(NPY_MAGIC)) != NPY_MAGIC :
+            raise ValueError('%s no es un archivo .npy (versión 1.0).' % filename)
+        header = f.read(struct.unpack('<H', f.read(2))[0]).decode('latin1')
+        data = f.read()
+
+    descr = header.split("'descr': '")[1].split("'")[0]
+    if descr[1] == 'S' :
+        return bytearray(data)
+    code = {v[-2:] : k for k, v in _DESCR.items()}[descr[-2:]]
+    col = array(code)
+    col.frombytes(data)
+    if descr[0] not in ('|', _ENDIAN) :
+        col.byteswap()
+    return col
+
+
+class ColumnRecorder :
+    """
+    Registro por columnas de las muestras de un conjunto de variables sources
+    (un diccionario nombre -> variable, instancias de typedef o primitivas),
+    cada muestra (sample) registra el tiempo (columna 'time') y la imagen
+    binaria de las variables, leída del dispositivo en una trama por variable.
+
+    Las muestras se acumulan sin decodificar (ni construir objetos por fila) en
+    buffers pre-asignados de segment_rows filas, un hilo secundario decodifica
+    cada segmento completo por columnas y lo escribe en el directorio
+    directory/NNNNNN/ (un archivo .npy por columna), de manera que la
+    adquisición no se detiene por la escritura en disco.
+
+    La memoria es acotada (buffers segmentos), si el hilo secundario no da
+    abasto la adquisición espera (block verdadero) o descarta las muestras
+    (se contabilizan en dropped).
+    """
+    def __init__(self, directory, sources, segment_rows = 4096, buffers = 4, block = True) :
+      self.directory = directory
+      self.segment_rows = segment_rows
+      self.block = block
+      self.dropped = 0
+      self.segments = 0
+      self.error = None
+
+      self.__sources, self.columns, self.stride = [], [], 0
+      for name, var in sources.items() :
+         length = len(var)
+         self.__sources.append((var.__memory__, length, self.stride))
+         for c in columns(var) :
+            field = name + ('.' + c.name if c.name and c.name[0] != '[' else c.name)
+            self.columns.append(Column(field, self.stride + c.offset, c.size, c.kind))
+         self.stride += length
+      if any(c.name == 'time' for c in self.columns) :
+         raise ValueError("El nombre 'time' está reservado para la columna de tiempos.")
+
+      os.makedirs(directory, exist_ok = True)
+      with open(os.path.join(directory, 'columns.json'), 'w') as f :
+         json.dump(['time'] + [c.name for c in self.columns], f)
+
+      self.__free = queue.Queue()
+      for _ in range(buffers) :
+         self.__free.put((bytearray(segment_rows*self.stride), array('d', bytes(8*segment_rows))))
+      self.__full = queue.Queue()
+      self.__segment, self.__rows = None, 0
+
+      self.__thread = threading.Thread(target = self.__writer, name = 'ColumnRecorder', daemon = True)
+      self.__thread.start()
+
+    def sample(self, t = None) :
+      """
+      Lee las variables del dispositivo y registra la muestra con el tiempo t
+      (por defecto el actual).
+      """
+      t = time() if t is None else t
+      row = self.__row()
+      if row is None :
+         return False
+      data, times = self.__segment
+      times[self.__rows] = t
+      for memory, length, offset in self.__sources :
+         data[row + offset:row + offset + length] = memory.__retrieve__(length)
+      self.__commit()
+      return True
+
+    def append(self, raw, t = None) :
+      """
+      Registra la imagen binaria raw (stride bytes, las variables consecutivas)
+      obtenida por otros medios (ejem. records).
+      """
+      if len(raw) != self.stride :
+         raise ValueError('La imagen debe tener {:d} bytes.'.format(self.stride))
+      t = time() if t is None else t
+      row = self.__row()
+      if row is None :
+         return False
+      data, times = self.__segment
+      times[self.__rows] = t
+      data[row:row + self.stride] = raw
+      self.__commit()
+      return True
+
+    def __row(self) :
+      # Posición de la fila siguiente, None si se descarta :
+      if self.error is not None :
+         raise self.error
+      if self.__segment is None :
+         try :
+            self.__segment = self.__free.get(block = self.block)
+         except queue.Empty :
+            self.dropped += 1
+            return None
+         self.__rows = 0
+      return self.__rows*self.stride
+
+    def __commit(self) :
+      self.__rows += 1
+      if self.__rows == self.segment_rows :
+         self.flush()
+
+    def flush(self) :
+      """ Entrega el segmento en curso (incompleto) al hilo de escritura. """
+      if self.__segment is not None and self.__rows :
+         self.__full.put((self.__segment, self.__rows))
+         self.__segment = None
+
+    def close(self) :
+      """ Escribe las muestras pendientes y termina el hilo de escritura. """
+      self.flush()
+      if self.__thread.is_alive() :
+         self.__full.put(None)
+         self.__thread.join()
+      if self.error is not None :
+         raise self.error
+
+    def __enter__(self) :
+      return self
+
+    def __exit__(self, *args) :
+      self.close()
+
+    def __writer(self) :
+      out = [bytearray(itemsize(c)*self.segment_rows) for c in self.columns]
+      while True :
+         item = self.__full.get()
+         if item is None :
+            return
+         (data, times), rows = item
+         try :
+            try :
+               views = [memoryview(b) for b in out]
+               _decode(self.columns, self.stride, memoryview(data)[:rows*self.stride], views, 0)
+               stamps = bytes(memoryview(times)[:rows].cast('B'))
+            finally :
+               # El buffer se libera antes de escribir en disco :
+               self.__free.put((data, times))
+
+            path = os.path.join(self.directory, '{:06d}'.format(self.segments))
+            os.makedirs(path, exist_ok = True)
+            with open(os.path.join(path, 'time.npy'), 'wb') as f :
+               write_npy(f, _descr('d'), rows, stamps)
+            for c, view in zip(self.columns, views) :
+               with open(os.path.join(path, c.name + '.npy'), 'wb') as f :
+                  write_npy(f, _descr(typecode(c), c.size), rows, view[:rows*itemsize(c)])
+               view.release()
+            self.segments += 1
+         except Exception as e :
+            self.error = e
+
+
+def load_recording(directory) :
+    """ Lee los segmentos registrados por ColumnRecorder en directory y devuelve
+        un OrderedDict nombre -> columna (numpy.ndarray si numpy está
+        disponible, de lo contrario array.array o bytearray).
+    """
+    with open(os.path.join(directory, 'columns.json')) as f :
+        names = json.load(f)
+
+    segments = sorted(s for s in os.listdir(directory) if os.path.isdir(os.path.join(directory, s)))
+    result = OrderedDict()
+    for name in names :
+        parts = []
+        for segment in segments :
+            filename = os.path.join(directory, segment, name + '.npy')
+            parts.append(numpy.load(filename) if numpy is not None else read_npy(filename))
+        if numpy is not None :
+            result[name] = numpy.concatenate(parts) if parts else numpy.zeros(0)
+        else :
+            result[name] = parts[0] if parts else array('d')
+            for part in parts[1:] :
+                result[name] += part
+    return result
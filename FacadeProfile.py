@@ -0,0 +1,223 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Caracterización del enlace con un dispositivo : mide la latencia y el caudal
+de las lecturas (getData) y escrituras (setData) según el tamaño de la trama,
+con datos sin y con abundantes secuencias de escape, y de las lecturas en
+grupo (getDataBatch) según el número de órdenes por grupo, sobre una región
+de memoria de prueba, y recomienda los parámetros de transferencia del puerto,
+ejem. :
+
+    profile = profile_link(port, 0xE100, 255)
+    print(profile)
+    profile.save('enlace.json')
+
+    port = FacadeWrapper(Serial(...), profile = 'enlace.json')
+
+También puede ejecutarse como un programa :
+
+    python FacadeProfile.py COM3 --baudrate 115200 --address 0xE100 -o enlace.json
+
+La región de prueba se escribe (salvo write = False) y luego se restaura, debe
+ser una región de RAM que el programa del dispositivo no utilice.
+"""
+
+import json
+from statistics import median
+from time import monotonic
+
+from FacadeWrapper import (ACK_CHAR, ESCAPE_CHAR, EXIT_CHAR, FacadeWrapper, FacadeWrapperError,
+                           GET_CHAR, NACK_CHAR, SET_CHAR)
+
+SIZES   = (1, 8, 16, 32, 64, 128, 192, 255)
+WINDOWS = (1, 2, 4, 8, 16)
+
+# Patrones de datos : sin secuencias de escape y con todos los bytes escapados
+# (en ambos sentidos) :
+PATTERNS = {
+    'plain'   : bytes(range(0x20, 0x40)),
+    'escaped' : ESCAPE_CHAR + GET_CHAR + ACK_CHAR + SET_CHAR + NACK_CHAR + EXIT_CHAR,
+}
+
+
+def _fill(pattern, size) :
+    return (pattern*(size // len(pattern) + 1))[:size]
+
+
+def _measure(operation, repeats) :
+    """ Ejecuta la operación repeats veces, devuelve la mediana del tiempo (en
+        segundos) de las exitosas y el número de fallas.
+    """
+    times, failures = [], 0
+    for _ in range(repeats) :
+        start = monotonic()
+        try :
+            ok = operation()
+        except FacadeWrapperError :
+            ok = False
+        if ok is False :
+            failures += 1
+        else :
+            times.append(monotonic() - start)
+    return (median(times) if times else None), failures
+
+
+class LinkProfile :
+    """
+    Resultado de la caracterización (ver profile_link) :
+
+        get, set : {patrón : [(tamaño, latencia, caudal, fallas), ...]}
+        batch    : [(órdenes por grupo, latencia por orden, caudal, fallas), ...]
+        recommended : parámetros recomendados (ver FacadeWrapper.loadProfile).
+
+    Las latencias en segundos y el caudal en bytes (de datos) por segundo.
+    """
+    def __init__(self, get, set, batch, recommended, port = None) :
+      self.get = get
+      self.set = set
+      self.batch = batch
+      self.recommended = recommended
+      self.port = port
+
+    def as_dict(self) :
+      return {'port' : self.port, 'get' : self.get, 'set' : self.set, 'batch' : self.batch,
+              'recommended' : self.recommended}
+
+    def save(self, filename) :
+      """ Guarda la caracterización (JSON), el puerto la carga con loadProfile. """
+      with open(filename, 'w') as f :
+         json.dump(self.as_dict(), f, indent = 1)
+
+    @staticmethod
+    def load(filename) :
+      with open(filename) as f :
+         d = json.load(f)
+      return LinkProfile(d['get'], d['set'], d['batch'], d['recommended'], d.get('port'))
+
+    def __str__(self) :
+      lines = []
+      for name, curves in (('GET', self.get), ('SET', self.set)) :
+         for pattern, curve in curves.items() :
+            lines.append('{:s} ({:s}) :'.format(name, pattern))
+            for size, latency, rate, failures in curve :
+               lines.append(_row(size, latency, rate, failures, 'bytes'))
+      if self.batch :
+         lines.append('GET en grupo :')
+         for window, latency, rate, failures in self.batch :
+            lines.append(_row(window, latency, rate, failures, 'órdenes'))
+      lines.append('Recomendado : ' + ', '.join('{:s} = {}'.format(k, v) for k, v in self.recommended.items()))
+      return '\n'.join(lines)
+
+
+def _row(n, latency, rate, failures, unit) :
+    if latency is None :
+        return '  {:4d} {:s} : sin respuesta ({:d} fallas)'.format(n, unit, failures)
+    return '  {:4d} {:s} : {:8.2f} ms {:10.0f} B/s{:s}'.format(n, unit, 1000*latency, rate,
+                                    ' ({:d} fallas)'.format(failures) if failures else '')
+
+
+def _curve(operation, sizes, repeats) :
+    curve = []
+    for size in sizes :
+        latency, failures = _measure(lambda: operation(size), repeats)
+        curve.append((size, latency, size/latency if latency else 0.0, failures))
+    return curve
+
+
+def _best(curve, tolerance = 0.95) :
+    # El menor parámetro (tamaño, órdenes) sin fallas cuyo caudal alcanza
+    # tolerance del máximo :
+    valid = [point for point in curve if point[1] is not None and not point[3]]
+    if not valid :
+        return None
+    top = max(point[2] for point in valid)
+    return min(point[0] for point in valid if point[2] >= tolerance*top)
+
+
+def profile_link(port, adr, size = 255, sizes = SIZES, windows = WINDOWS, patterns = None,
+                 repeats = 5, write = True, batch_size = 16) :
+    """
+    Caracteriza el enlace del puerto port (FacadeWrapper) sobre la región de
+    prueba [adr, adr + size) (direcciones del protocolo).
+
+    Para cada patrón de datos (por defecto PATTERNS) se mide la mediana de
+    repeats lecturas y escrituras de cada tamaño de sizes (hasta 255, el límite
+    de una trama), si write es falso no se escribe la región y solo se miden
+    las lecturas de su contenido actual. Las lecturas en grupo se miden con
+    rangos de batch_size bytes (sin la orden de múltiples rangos) para cada
+    número de órdenes por grupo de windows.
+
+    Se recomienda el menor tamaño de fragmento y número de órdenes por grupo
+    que alcanzan el 95 % del máximo caudal (con datos escapados, el peor caso)
+    sin fallas, y el límite de espera inicial (4 veces la máxima latencia).
+    """
+    sizes = [s for s in sizes if s <= min(size, 255)]
+    patterns = PATTERNS if patterns is None else patterns
+    if not write :
+        patterns = {'current' : None}
+
+    saved = {'chunk_size' : port.chunk_size, 'scatter' : port.scatter, 'retries' : port.retries}
+    original = port.getData(adr, size)
+    # Cada medición es una sola trama y sin reintentos :
+    port.chunk_size, port.retries = 255, 0
+
+    get, set_, batch = {}, {}, []
+    try :
+        for name, pattern in patterns.items() :
+            if pattern is not None :
+                data = _fill(pattern, size)
+                port.setData(adr, data)
+                set_[name] = _curve(lambda n: port.setData(adr, data[:n]), sizes, repeats)
+            get[name] = _curve(lambda n: port.getData(adr, n), sizes, repeats)
+
+        # Lecturas en grupo : rangos contiguos de batch_size bytes (la región
+        # se recorre circularmente) :
+        port.scatter = False
+        count = max(1, size // batch_size)
+        for window in windows :
+            ranges = [(adr + (k % count)*batch_size, batch_size) for k in range(max(windows))]
+            latency, failures = _measure(lambda: port.getDataBatch(ranges, window), repeats)
+            per_frame = latency/len(ranges) if latency else None
+            batch.append((window, per_frame, batch_size/per_frame if per_frame else 0.0, failures))
+    finally :
+        port.chunk_size, port.scatter, port.retries = saved['chunk_size'], saved['scatter'], saved['retries']
+        if write :
+            port.setData(adr, original)
+
+    worst = get.get('escaped') or next(iter(get.values()))
+    latencies = [p[1] for curve in list(get.values()) + list(set_.values()) for p in curve if p[1]]
+    recommended = {
+        'chunk_size' : _best(worst) or port.chunk_size,
+        'window'     : _best(batch) or port.window,
+    }
+    if latencies :
+        recommended['timeout'] = round(4*max(latencies), 4)
+
+    return LinkProfile(get, set_, batch, recommended, getattr(port, 'port', None))
+
+
+
+if __name__ == '__main__' :
+    import argparse
+    from serial import Serial
+
+    parser = argparse.ArgumentParser(description = 'Caracterización del enlace con un dispositivo.')
+    parser.add_argument('port', help = 'puerto serie, ejem. COM3 o /dev/ttyUSB0')
+    parser.add_argument('--baudrate', type = int, default = 115200)
+    parser.add_argument('--address', type = lambda v: int(v, 0), required = True,
+                        help = 'dirección (del protocolo) de la región de prueba')
+    parser.add_argument('--size', type = int, default = 255, help = 'longitud de la región de prueba')
+    parser.add_argument('--repeats', type = int, default = 5)
+    parser.add_argument('--read-only', action = 'store_true', help = 'no escribir la región de prueba')
+    parser.add_argument('-o', '--output', help = 'archivo (JSON) de la caracterización')
+    args = parser.parse_args()
+
+    serial_port = Serial(baudrate = args.baudrate)
+    serial_port.port = args.port
+    with FacadeWrapper(serial_port) as facade :
+        profile = profile_link(facade, args.address, args.size, repeats = args.repeats,
+                               write = not args.read_only)
+    print(profile)
+    if args.output :
+        profile.save(args.output)
@@ -0,0 +1,229 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import struct
+from array import array
+from time import monotonic, sleep
+
+# Sentido de las tramas registradas :
+
+TX = 0
+RX = 1
+
+TRACE_MAGIC  = b'FTRC'
+TRACE_HEADER = struct.Struct('<4sBd')     # marca, versión, tiempo de referencia
+RECORD       = struct.Struct('<dBI')      # tiempo, sentido, longitud
+TRACE_VERSION = 2
+
+# Registros según la versión del archivo (la versión 1 limitaba la longitud
+# de las tramas a 65535 bytes) :
+RECORDS = {1 : struct.Struct('<dBH'), 2 : RECORD}
+
+
+class WireTrace :
+    """
+    Registro binario de las tramas trasmitidas (TX) y recibidas (RX) por un
+    FacadeWrapper, sobre memorias de contención circulares pre-asignadas, de
+    manera que su costo es el de copiar la trama y puede mantenerse activo
+    en producción.
+
+    Los datos de las tramas se almacenan en un anillo de capacity bytes y su
+    índice (tiempo, sentido, posición y longitud) en un anillo de max_frames
+    registros, cuando alguno se llena se sobrescriben las tramas más antiguas.
+
+    El registro se vuelca a un archivo bajo demanda (dump) o automáticamente
+    ante un error del puerto si se asigna el atributo dump_on_error (nombre
+    del archivo), el archivo puede reproducirse con ReplaySerial.
+    """
+    def __init__(self, capacity = 1 << 20, max_frames = 1 << 16, dump_on_error = None) :
+      self.capacity = capacity
+      self.max_frames = max_frames
+      self.dump_on_error = dump_on_error
+
+      self.__data  = bytearray(capacity)
+      self.__time  = array('d', bytes(8*max_frames))
+      self.__dir   = bytearray(max_frames)
+      self.__start = array('Q', bytes(8*max_frames))
+      self.__len   = array('I', bytes(array('I').itemsize*max_frames))
+
+      self.__count = 0      # número total de tramas registradas
+      self.__total = 0      # número total de bytes registrados
+      self.t0 = monotonic()
+
+    def record(self, direction, frame) :
+      """
+      Registra la trama frame (bytes o bytearray) en el sentido TX o RX.
+      """
+      n = len(frame)
+      if n > self.capacity :
+         frame, n = frame[-self.capacity:], self.capacity
+
+      idx = self.__count % self.max_frames
+      self.__time[idx] = monotonic()
+      self.__dir[idx] = direction
+      self.__start[idx] = self.__total
+      self.__len[idx] = n
+
+      pos = self.__total % self.capacity
+      head = min(n, self.capacity - pos)
+      self.__data[pos:pos + head] = frame[:head]
+      if head < n :
+         self.__data[:n - head] = frame[head:]
+
+      self.__total += n
+      self.__count += 1
+
+    def frames(self) :
+      """
+      Genera las tramas vigentes (de la más antigua a la más reciente) como
+      tuplas (tiempo, sentido, trama).
+      """
+      first = max(0, self.__count - self.max_frames)
+      for n in range(first, self.__count) :
+         idx = n % self.max_frames
+         start, length = self.__start[idx], self.__len[idx]
+
+         # Los datos de la trama pueden haber sido sobrescritos :
+         if start < self.__total - self.capacity :
+            continue
+
+         pos = start % self.capacity
+         head = min(length, self.capacity - pos)
+         frame = bytes(self.__data[pos:pos + head]) + bytes(self.__data[:length - head])
+         yield self.__time[idx] - self.t0, self.__dir[idx], frame
+
+    def clear(self) :
+      self.__count = 0
+      self.__total = 0
+      self.t0 = monotonic()
+
+    def __len__(self) :
+      return min(self.__count, self.max_frames)
+
+    def dump(self, filename) :
+      """
+      Vuelca las tramas vigentes al archivo (binario) filename.
+      """
+      with open(filename, 'wb') as f :
+         f.write(TRACE_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, self.t0))
+         for t, direction, frame in self.frames() :
+            f.write(RECORD.pack(t, direction, len(frame)))
+            f.write(frame)
+
+    def error(self) :
+      """
+      Invocado por el puerto ante un error, vuelca el registro si se asignó
+      el archivo dump_on_error.
+      """
+      if self.dump_on_error :
+         self.dump(self.dump_on_error)
+
+    @staticmethod
+    def load(filename) :
+      """
+      Lee un archivo generado por dump y devuelve la lista de tramas como
+      tuplas (tiempo, sentido, trama).
+      """
+      with open(filename, 'rb') as f :
+         raw = f.read()
+
+      magic, version, _ = TRACE_HEADER.unpack_from(raw, 0)
+      if magic != TRACE_MAGIC or version not in RECORDS :
+         raise ValueError('%s no es un registro de tramas.' % filename)
+
+      record = RECORDS[version]
+      frames, pos = [], TRACE_HEADER.size
+      while pos < len(raw) :
+         t, direction, length = record.unpack_from(raw, pos)
+         pos += record.size
+         frames.append((t, direction, raw[pos:pos + length]))
+         pos += length
+
+      return frames
+
+
+
+class ReplaySerial :
+    """
+    Dispositivo serie ficticio que reproduce un registro de tramas (un archivo
+    generado por WireTrace.dump, una instancia de WireTrace o una lista de
+    tuplas (tiempo, sentido, trama)), puede utilizarse en lugar de Serial con
+    FacadeWrapper.
+
+    Cada trama trasmitida (write) habilita la lectura de las tramas recibidas
+    que le siguen en el registro. Si strict es verdadero se verifica que la
+    trama trasmitida coincida con la registrada. Si realtime es verdadero se
+    reproduce además la latencia registrada, de lo contrario la reproducción
+    es inmediata (y por ende determinística).
+    """
+    def __init__(self, trace, strict = True, realtime = False, port = 'REPLAY') :
+      if isinstance(trace, str) :
+         trace = WireTrace.load(trace)
+      elif isinstance(trace, WireTrace) :
+         trace = list(trace.frames())
+
+      self.port = port
+      self.baudrate = 0
+      self.timeout = None
+      self.strict = strict
+      self.realtime = realtime
+
+      self.__frames = trace
+      self.__next = 0
+      self.__pending = bytearray()
+      self.__tx = bytearray()
+      self.__open = False
+
+    def open(self) :
+      self.__open = True
+
+    def close(self) :
+      self.__open = False
+
+    def isOpen(self) :
+      return self.__open
+
+    is_open = property(isOpen)
+
+    @property
+    def in_waiting(self) :
+      return len(self.__pending)
+
+    def flushInput(self) :
+      self.__pending.clear()
+
+    reset_input_buffer = flushInput
+
+    def write(self, data) :
+      # Las tramas pueden trasmitirse fragmentadas (ver Pacer) :
+      self.__tx += data
+
+      while self.__next < len(self.__frames) :
+         t, direction, frame = self.__frames[self.__next]
+         if direction != TX :
+            break
+         if len(self.__tx) < len(frame) :
+            return len(data)
+         if self.strict and self.__tx[:len(frame)] != frame :
+            raise ValueError('La trama 0x%s difiere de la registrada 0x%s.'
+                              % (self.__tx[:len(frame)].hex().upper(), frame.hex().upper()))
+         del self.__tx[:len(frame)]
+         self.__next += 1
+
+         # Se habilitan las tramas recibidas a continuación :
+         while self.__next < len(self.__frames) and self.__frames[self.__next][1] == RX :
+            t_rx, _, rx = self.__frames[self.__next]
+            if self.realtime :
+               sleep(max(0, t_rx - t))
+            self.__pending += rx
+            self.__next += 1
+
+      return len(data)
+
+    def read(self, size = 1) :
+      data = bytes(self.__pending[:size])
+      del self.__pending[:size]
+      return data
+
+    def flush(self) :
+      pass
@@ -1,11 +1,14 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+import json
+import logging
 import struct
 import sys
 import threading
-from time import sleep
+from time import monotonic, sleep
 
+from FacadeTrace import RX, TX
 from report import report
 from serial import Serial
 
@@ -15,6 +18,7 @@ ESCAPE_CHAR = b'\x1B'
 EXIT_CHAR   = b'X'
 GET_CHAR    = b'G'
 SET_CHAR    = b'S'
+MULTI_CHAR  = b'M'
 ACK_CHAR    = b'\x17'
 NACK_CHAR   = b'\x15'
 
@@ -22,6 +26,10 @@ SpecialChar = [ESCAPE_CHAR, EXIT_CHAR, GET_CHAR, SET_CHAR, ACK_CHAR, NACK_CHAR]
 EncodedChar = [ESCAPE_CHAR, EXIT_CHAR, GET_CHAR, SET_CHAR]
 DecodedChar = [ESCAPE_CHAR, ACK_CHAR, NACK_CHAR]
 
+# La orden GET de múltiples rangos (opcional, ver FacadeWrapper.getDataBatch)
+# admite a lo más MULTI_RANGES rangos con un total de 255 bytes :
+MULTI_RANGES = 16
+
 
 class FacadeWrapperError(Exception):
   def __init__(self, msg, cause=None, obj=None) :
@@ -44,6 +52,170 @@ class FacadeWrapperError(Exception):
 
 
 
+class AdaptiveTimeout :
+    """
+    Estima el límite de tiempo de espera (timeout) de la respuesta del dispositivo
+    a partir de la latencia observada en cada orden (el tiempo entre el fin de la
+    transmisión de la orden y la recepción del primer byte de la respuesta).
+
+    Se utiliza el estimador de Jacobson/Karels (el mismo de TCP) : se mantiene el
+    promedio móvil de la latencia (srtt) y de su desviación (rttvar), el límite
+    es srtt + k*rttvar acotado entre minimum y maximum. Ante un timeout el límite
+    se duplica (backoff) hasta que una nueva muestra lo corrija.
+
+    minimum no debe ser menor que el tiempo de respuesta más lento esperado del
+    dispositivo (ejem. una escritura en EEPROM o FLASH), pues el estimador solo
+    conoce las latencias observadas.
+    """
+    def __init__(self, initial = 0.5, minimum = 0.5, maximum = 2.0, k = 4) :
+      self.initial = initial
+      self.minimum = minimum
+      self.maximum = maximum
+      self.k = k
+      self.srtt = None
+      self.rttvar = None
+      self.__value = initial
+
+    def copy(self) :
+      """
+      Un estimador (sin muestras) con la misma configuración.
+      """
+      return AdaptiveTimeout(self.initial, self.minimum, self.maximum, self.k)
+
+    def update(self, sample) :
+      """
+      Incorpora la latencia (en segundos) observada en una orden.
+      """
+      if self.srtt is None :
+         self.srtt = sample
+         self.rttvar = sample/2
+      else :
+         self.rttvar += (abs(self.srtt - sample) - self.rttvar)/4
+         self.srtt += (sample - self.srtt)/8
+
+      self.__value = self.srtt + self.k*self.rttvar
+
+    def backoff(self) :
+      """
+      Duplica el límite de espera luego de un timeout.
+      """
+      self.__value = 2*self.value
+
+    @property
+    def value(self) :
+      return min(max(self.__value, self.minimum), self.maximum)
+
+
+
+class TokenBucket :
+    """
+    Cubeta de fichas (token bucket) : se acumulan rate fichas por segundo hasta
+    un máximo de burst, cada unidad consumida requiere una ficha. Si no hay
+    fichas suficientes se espera (el saldo puede quedar negativo, de manera que
+    los consumos mayores que burst esperan en proporción a su tamaño).
+    """
+    def __init__(self, rate, burst) :
+      self.rate = rate
+      self.burst = burst
+      self.tokens = burst
+      self.last = monotonic()
+
+    def take(self, amount, scale = 1.0) :
+      now = monotonic()
+      rate = self.rate*scale
+      self.tokens = min(self.burst, self.tokens + (now - self.last)*rate)
+      self.last = now
+
+      self.tokens -= amount
+      if self.tokens < 0 :
+         sleep(-self.tokens/rate)
+
+
+
+class Pacer :
+    """
+    Regula el ritmo de transmisión hacia el dispositivo, en bytes por segundo
+    (byte_rate, con una ráfaga máxima de byte_burst bytes) y/o en tramas por
+    segundo (frame_rate, con una ráfaga máxima de frame_burst tramas). Un límite
+    en None no se aplica.
+
+    Si auto_tune es verdadero, el ritmo se ajusta en forma AIMD : cada falla
+    (timeout o NACK) reduce a la mitad la escala de los ritmos (hasta min_scale)
+    y cada orden exitosa la incrementa en step (hasta max_scale), de manera que
+    cada dispositivo (simulador o tarjeta) opera a su máximo ritmo seguro. Los
+    ritmos configurados son los iniciales, el máximo es max_scale veces estos;
+    si max_scale es None la escala no se acota y el límite es el del enlace
+    (un ritmo mayor que el del puerto no demora la transmisión).
+    """
+    def __init__(self, byte_rate = None, frame_rate = None, byte_burst = 64,
+                 frame_burst = 1, auto_tune = False, min_scale = 0.05, step = 0.02,
+                 max_scale = 4.0) :
+      self.byte_burst = byte_burst
+      self.__bytes = TokenBucket(byte_rate, byte_burst) if byte_rate else None
+      self.__frames = TokenBucket(frame_rate, frame_burst) if frame_rate else None
+      self.auto_tune = auto_tune
+      self.min_scale = min_scale
+      self.step = step
+      self.max_scale = max_scale
+      self.scale = 1.0
+
+    def paced(self, data) :
+      """
+      Genera los segmentos de la trama data a medida que el ritmo lo permite.
+      """
+      if self.__frames is not None :
+         self.__frames.take(1, self.scale)
+
+      if self.__bytes is None :
+         yield data
+         return
+
+      for offset in range(0, len(data), self.byte_burst) :
+         piece = data[offset:offset + self.byte_burst]
+         self.__bytes.take(len(piece), self.scale)
+         yield piece
+
+    def success(self) :
+      if self.auto_tune :
+         self.scale += self.step
+         if self.max_scale is not None :
+            self.scale = min(self.max_scale, self.scale)
+
+    def failure(self) :
+      if self.auto_tune :
+         self.scale = max(self.min_scale, self.scale/2)
+
+
+
+class Flight :
+    """
+    Lectura en curso del rango [adr, adr + size), las lecturas (de otros hilos)
+    de un rango comprendido en el suyo esperan (event) su resultado (data) o su
+    falla (error) en lugar de trasmitirse. Deja de compartirse al terminar la
+    lectura (antes de liberar el puerto) o (close) si se modifica su rango.
+    """
+    __slots__ = ('adr', 'end', 'event', 'data', 'error', 'shared')
+
+    def __init__(self, adr, size) :
+      self.adr = adr
+      self.end = adr + size
+      self.event = threading.Event()
+      self.data = None
+      self.error = None
+      self.shared = True
+
+    def covers(self, adr, size) :
+      return self.shared and self.adr <= adr and adr + size <= self.end
+
+    def close(self, adr, size) :
+      if adr < self.end and self.adr < adr + size :
+         self.shared = False
+
+    def slice(self, adr, size) :
+      return bytearray(self.data[adr - self.adr:adr - self.adr + size])
+
+
+
 class FacadeWrapper :
     """
     Protocolo de comunicación con dispositivos/micro-controladores con un interfaz serie,
@@ -73,6 +245,12 @@ class FacadeWrapper :
     Si la orden es GET, el dispositivo continua con el envío del número de datos 
     especificado terminando con el identificador ACK. El dispositivo también puede 
     responder con NACK si no puede cumplir la orden.
+
+    Opcionalmente el dispositivo puede implementar la orden GET de múltiples rangos
+    ('M'), seguida del número de rangos y de la dirección (LSB, MSB) y número de
+    datos de cada uno, a la que responde con los datos de todos los rangos (en
+    orden) terminando con ACK, o con NACK si no la implementa. Si el dispositivo
+    la implementa 'M' también es un identificador (y se traduce en los datos).
    
     """
 
@@ -83,12 +261,18 @@ class FacadeWrapper :
       excepción (del tipo FacadeWrapperError).
       """
       try :
-         self.log.debug('Trasmitiendo : 0x%s' %data.hex().upper())
-         for d in data :
-          self.__comm.write(bytes([d]))
-          #sleep(2/self.__comm.baudrate)
-         if self.throughput_limit :
-            sleep(0.05)
+         if self.__debug :
+            self.log.debug('Trasmitiendo : 0x%s' %data.hex().upper())
+         if self.pacer is None :
+            self.__comm.write(data)
+         else :
+            # El ritmo de transmisión lo establece el regulador, que puede
+            # fragmentar las tramas extensas :
+            for piece in self.pacer.paced(data) :
+               self.__comm.write(piece)
+         self.__sent = monotonic()
+         if self.trace is not None :
+            self.trace.record(TX, data)
 
       except FacadeWrapperError as e:
          raise FacadeWrapperError('Fallo de Transmisión (timeout).', e, self)
@@ -98,14 +282,27 @@ class FacadeWrapper :
       """
       Espera por la recepción de 1 byte desde el dispositivo.
       """
-      self.log.debug('Recibiendo (1 byte) ...')
+      if self.__debug :
+         self.log.debug('Recibiendo (1 byte) ...')
       byte = self.__comm.read(1)
 
       if (byte == b'') or (byte is None) :
+         if self.__timeout is not None :
+            self.__timeout.backoff()
          raise FacadeWrapperError('El dispositivo no responde (timeout).',
                                                                     None, self)
 
-      self.log.debug('Se recibió : 0x%s,' %(byte.hex().upper()))
+      if self.trace is not None :
+         self.__rx += byte
+
+      # El primer byte de la respuesta establece la latencia de la orden :
+      if self.__sent is not None :
+         if self.__timeout is not None :
+            self.__timeout.update(monotonic() - self.__sent)
+         self.__sent = None
+
+      if self.__debug :
+         self.log.debug('Se recibió : 0x%s,' %(byte.hex().upper()))
 
       return byte
 
@@ -118,17 +315,20 @@ class FacadeWrapper :
       identificada.
       """
       try :
-         self.log.debug('Recibiendo la respuesta (ACK/NACK) ...')
+         if self.__debug :
+            self.log.debug('Recibiendo la respuesta (ACK/NACK) ...')
          ans = self.__rcve()
       except FacadeWrapperError as e :
          raise FacadeWrapperError('El dispositivo no envió '
                                'la respuesta de aceptación/rechazo.', None, self)
 
       if  ans == NACK_CHAR :
-         self.log.debug('Respuesta de Rechazo (NACK).')
+         if self.__debug :
+            self.log.debug('Respuesta de Rechazo (NACK).')
          return False
       elif ans == ACK_CHAR :
-         self.log.debug('Respuesta de aceptación (ACK).')
+         if self.__debug :
+            self.log.debug('Respuesta de aceptación (ACK).')
          return True
 
       raise FacadeWrapperError('El dispositivo envió una '
@@ -147,8 +347,10 @@ class FacadeWrapper :
       transmisión es parcial o nula (timeout) o se recibe una secuencia de
       escape inválida.
       """
+      self.__rejected = False
       try :
-         self.log.debug('Esperando la recepción de %d (data) bytes' % size)
+         if self.__debug :
+            self.log.debug('Esperando la recepción de %d (data) bytes' % size)
          data = bytearray(b'')
          for i in range(0, size) :
             byte = self.__rcve()
@@ -161,8 +363,9 @@ class FacadeWrapper :
                                          'ESC (0x1B) / 0x%02X' % ord(byte))
                   raise FacadeWrapperError('Se recibio una secuencia '
                                           'de escape desconocida', None, self)
-               self.log.debug('Secuencia de escape identificada '
-                                               'para : 0x%02X' % ord(byte))
+               if self.__debug :
+                  self.log.debug('Secuencia de escape identificada '
+                                                  'para : 0x%02X' % ord(byte))
 
             elif byte == ACK_CHAR :
                raise FacadeWrapperError('Se recibio ACK, truncando'
@@ -170,12 +373,15 @@ class FacadeWrapper :
                                                    % ((i+1), size), None, self)
 
             elif byte == NACK_CHAR :
+               # Solo el NACK inicial es el rechazo de la orden :
+               self.__rejected = i == 0
                raise FacadeWrapperError('Se recibió (NACK), interrumpiendo'
                                 ' la recepción (a %d en lugar de %d bytes).'
                                                    % ((i+1), size), None, self)
             data += byte
 
          if not self.__RcveAns() :
+            self.__rejected = size == 0
             raise FacadeWrapperError('El dispositivo rechazo la lectura.',
                                                                     None, self)
 
@@ -186,43 +392,375 @@ class FacadeWrapper :
          raise FacadeWrapperError('Fallo la Recepcion.', e, self)
 
 
-    def __encodeData(self, data_bytes) :
+    def __encodeData(self, data_bytes, encoded = None) :
       # En este punto data puede contener los caracteres especiales
       # que deben ser substituidos por sus secuencias de escape ...
-      for ch in EncodedChar :
+      # 'M' puede ser una orden salvo que el dispositivo no la implemente, en
+      # tal caso (y aún antes de negociarla) se traduce :
+      if encoded is None :
+         encoded = EncodedChar if self.scatter is False else EncodedChar + [MULTI_CHAR]
+      for ch in encoded :
             data_bytes = data_bytes.replace(ch,
                                           b'\x1B' + bytes([0x1B ^ ord(ch) ^ 0x55]))
       # antes de enviarla :
       return data_bytes
 
 
+    def __resync(self) :
+      """
+      Restablece la sincronía con el dispositivo luego de una falla, descartando
+      solo los bytes remanentes de la respuesta interrumpida, i.e. se lee hasta
+      que la línea permanezca en silencio durante el límite de espera vigente.
+      """
+      self.__sent = None
+      discarded = 0
+      while True :
+         pending = self.__comm.read(max(1, self.__comm.in_waiting))
+         if not pending :
+            break
+         discarded += len(pending)
+         if self.trace is not None :
+            self.__rx += pending
+
+      if discarded :
+         self.log.debug('Resincronización : se descartaron %d bytes.' % discarded)
+
+
+    def __chunks(self, adr, size) :
+      """
+      Divide el rango [adr, adr + size) en fragmentos de a lo más chunk_size
+      bytes (que es también el límite del protocolo, 255 bytes).
+      """
+      chunk_size = min(self.chunk_size, 255)
+      for offset in range(0, size, chunk_size) :
+         yield adr + offset, min(chunk_size, size - offset)
+
+
+    def __applyTimeout(self, timeout = None) :
+      # El estimador de la orden (por defecto el de las lecturas, ver
+      # ack_timeout) es el que se actualiza con su latencia. Reconfigurar el
+      # puerto tiene su costo, solo se actualiza el límite de espera si la
+      # variación es significativa :
+      self.__timeout = timeout or self.timeout
+      if self.__timeout is not None :
+         current = self.__comm.timeout
+         if current is None or abs(current - self.__timeout.value) > 0.001 :
+            self.__comm.timeout = self.__timeout.value
+
+
+    def __retry(self, operation, *args) :
+      """
+      Ejecuta la operación (la lectura o escritura de un fragmento) hasta
+      retries + 1 veces, resincronizando el puerto luego de cada falla, de
+      manera que solo se repite el fragmento fallido.
+      """
+      # La espera del ACK de una escritura (que puede demorar lo que la
+      # escritura en EEPROM o FLASH) tiene su propio estimador :
+      timeout = self.ack_timeout if operation == self.__set else self.timeout
+      for attempt in range(self.retries + 1) :
+         try :
+            self.__applyTimeout(timeout)
+            result = operation(*args)
+            if self.pacer is not None :
+               self.pacer.success()
+            return result
+
+         except FacadeWrapperError as e :
+            cause = e
+            if self.pacer is not None :
+               self.pacer.failure()
+            self.log.warning('Fallo en el intento %d de %d.'
+                                                % (attempt + 1, self.retries + 1))
+            self.__resync()
+
+         finally :
+            self.__recordRx()
+
+      raise FacadeWrapperError('Se agotaron los reintentos.', cause, self)
+
+
+    def __get(self, adr, size) :
+      """
+      Lee un fragmento (de a lo más 255 bytes) desde la dirección adr.
+      """
+      self.__sendGet(adr, size)
+
+      # Se espera por la respuesta del comando :
+      return self.__RcveData(size)
+
+
+    def __sendGet(self, adr, size) :
+      # Envía el comando según el protocolo, nótese que se asegura la con-
+      #versión a una secuencia de bytes de los parámetros importados :
+      cmd = GET_CHAR + self.__encodeData(struct.pack('<H', adr)
+                                                   + struct.pack('<B', size))
+      self.__xmit(cmd)
+
+
+    def __sendMulti(self, chunks) :
+      # Orden GET de múltiples rangos, 'M' se traduce siempre en sus datos :
+      params = struct.pack('<B', len(chunks)) + b''.join(struct.pack('<HB', adr, size)
+                                                          for adr, size in chunks)
+      self.__xmit(MULTI_CHAR + self.__encodeData(params, EncodedChar + [MULTI_CHAR]))
+
+
+    def __frames(self, chunks) :
+      """
+      Agrupa los fragmentos en las tramas de la lectura en grupo : si el
+      dispositivo implementa (o puede implementar) la orden de múltiples rangos
+      cada trama comprende hasta MULTI_RANGES fragmentos (255 bytes en total),
+      de lo contrario cada fragmento es una trama (GET).
+      """
+      if self.scatter is False :
+         return [[chunk] for chunk in chunks]
+
+      frames, total = [], 0
+      for chunk in chunks :
+         if frames and len(frames[-1]) < MULTI_RANGES and total + chunk[1] <= 255 :
+            frames[-1].append(chunk)
+            total += chunk[1]
+         else :
+            frames.append([chunk])
+            total = chunk[1]
+      return frames
+
+
+    def __sendFrame(self, frame) :
+      if len(frame) == 1 :
+         self.__sendGet(*frame[0])
+      else :
+         self.__sendMulti(frame)
+
+
+    def __rcveFrame(self, frame) :
+      # Los datos de la respuesta se dividen en los de cada fragmento :
+      data = self.__RcveData(sum(size for adr, size in frame))
+      pieces, offset = [], 0
+      for adr, size in frame :
+         pieces.append(data[offset:offset + size])
+         offset += size
+      return pieces
+
+
+    def __probeScatter(self, frame) :
+      """
+      Negocia la orden de múltiples rangos leyendo la trama frame con ella (hasta
+      retries + 1 veces) : si el dispositivo la rechaza (NACK) o no responde en
+      ninguno de los intentos (con el enlace resincronizado) se deja de utilizar.
+      Ante otras fallas, que pueden ser transitorias, se vuelve a negociar con la
+      lectura siguiente. Devuelve los fragmentos leídos o None.
+      """
+      pieces, silent = None, True
+      for attempt in range(self.retries + 1) :
+         self.__rejected = False
+         try :
+            self.__applyTimeout()
+            self.__sendMulti(frame)
+            pieces = self.__rcveFrame(frame)
+            break
+         except FacadeWrapperError :
+            # Si no se recibió byte alguno de la respuesta __sent persiste :
+            silent = silent and self.__sent is not None
+            self.__resync()
+            if self.__rejected :
+               break
+         finally :
+            self.__recordRx()
+
+      if pieces is None :
+         if self.__rejected or silent :
+            self.scatter = False
+            self.log.info('El dispositivo no implementa la orden GET de múltiples rangos.')
+         else :
+            self.log.warning('Fallo la negociación de la orden GET de múltiples rangos.')
+         return None
+
+      self.scatter = True
+      self.log.info('El dispositivo implementa la orden GET de múltiples rangos.')
+      return pieces
+
+
+    def __recordRx(self) :
+      if self.__rx :
+         self.trace.record(RX, self.__rx)
+         self.__rx = bytearray()
+
+
+    def __set(self, adr, data_bytes) :
+      """
+      Escribe un fragmento (de a lo más 255 bytes) desde la dirección adr, levanta
+      una excepción si el dispositivo lo rechaza (NACK) de manera que se reintente.
+      """
+      # Envía el comando según el protocolo, nótese que se asegura la con-
+      # versión a una secuencia de bytes de los parámetros importados y se
+      # asegura de substituir los caracteres especiales por sus secuencias
+      # de escape :
+      cmd = SET_CHAR + self.__encodeData(struct.pack('<H', adr) + struct.pack('B',
+                                               len(data_bytes)) + data_bytes)
+      self.__rejected = False
+      self.__xmit(cmd)
+
+      # Se espera por la respuesta del comando :
+      if not self.__RcveAns() :
+         self.__rejected = True
+         raise FacadeWrapperError('El dispositivo rechazo la escritura.', None, self)
+
+
     def getData(self, adr, size) :
       """
       Lee size bytes desde la dirección adr en el dispositivo y los devuelve
       como una lista.
+      La lectura se realiza en fragmentos de a lo más chunk_size bytes, ante
+      una falla solo se repite la lectura del fragmento respectivo.
+
+      Si single_flight es verdadero, la lectura cuyo rango está comprendido en
+      el de otra en curso (de otro hilo) no se trasmite, se espera y se toma
+      del resultado de aquella (ver Flight).
       """
+      if not self.single_flight :
+         return self.__getData(adr, size)
+
+      with self.__flightLock :
+         shared = next((f for f in self.__flights if f.covers(adr, size)), None)
+         if shared is None :
+            # La lectura se registra antes de esperar por el puerto, de manera
+            # que las que lleguen mientras tanto se sumen a ella :
+            flight = Flight(adr, size)
+            self.__flights.append(flight)
+         else :
+            self.shared_reads += 1
+
+      if shared is None :
+         return self.__lead(flight)
+      return self.__join(shared, adr, size)
+
+
+    def __lead(self, flight) :
+      try :
+         data = self.__getData(flight.adr, flight.end - flight.adr, flight)
+         flight.data = bytes(data)
+         return data
+      except FacadeWrapperError as e :
+         flight.error = e
+         raise
+      finally :
+         flight.event.set()
+
+
+    def __join(self, flight, adr, size) :
+      flight.event.wait()
+      if flight.error is not None :
+         raise FacadeWrapperError('No se pudo obtener el contenido de 0x%04X / 0x%02X bytes.'
+                                                         % (adr, size), flight.error, self)
+      return flight.slice(adr, size)
+
+
+    def __getData(self, adr, size, flight = None) :
       with self._lock :
+         self.__debug = self.log.isEnabledFor(logging.DEBUG)
 
          try :
             self.log.debug('Lectura del contenido de %d bytes desde 0x%04X.' \
                                                                   %(size, adr))
+            data = bytearray()
+            for chunk_adr, chunk_size in self.__chunks(adr, size) :
+               data += self.__retry(self.__get, chunk_adr, chunk_size)
 
-            # Limpia la memoria de contención de recepción :
-            self.__comm.flushInput()
+            return data
 
-            # Envía el comando según el protocolo, nótese que se asegura la con-
-            #versión a una secuencia de bytes de los parámetros importados :
-            cmd = GET_CHAR + self.__encodeData(struct.pack('<H', adr)
-                                                         + struct.pack('<B', size))
-            self.__xmit(cmd)
+         except FacadeWrapperError as e :
+            if self.trace is not None :
+               self.trace.error()
+            raise FacadeWrapperError('No se pudo obtener el contenido de 0x%04X / 0x%02X bytes.'%(adr, size), e, self)
+
+         finally :
+            # La lectura deja de compartirse antes de liberar el puerto, de
+            # manera que no se sumen a ella las posteriores a una escritura :
+            if flight is not None :
+               with self.__flightLock :
+                  self.__flights.remove(flight)
+
+
+    def __closeFlights(self, adr, size) :
+      # Las lecturas registradas que aún esperan por el puerto no comparten
+      # su resultado con las posteriores a la escritura del rango :
+      with self.__flightLock :
+         for flight in self.__flights :
+            flight.close(adr, size)
 
-            # Se espera por la respuesta del comando :
-            ans = self.__RcveData(size)
 
-            return ans
+    def getDataBatch(self, ranges, window = None) :
+      """
+      Lee los rangos (adr, size) de la secuencia ranges y devuelve la lista de
+      sus contenidos. Se envían hasta window órdenes GET antes de recibir sus
+      respuestas (el dispositivo las responde en orden), de manera que la
+      latencia del dispositivo se paga una vez por grupo y no por rango.
+      Ante una falla se resincroniza el puerto y los fragmentos del grupo se
+      leen uno a uno (con reintentos). Por defecto window es el del puerto.
+
+      Si el dispositivo implementa la orden GET de múltiples rangos (ver
+      scatter) los rangos pequeños se agrupan en una sola trama.
+      """
+      with self._lock :
+         self.__debug = self.log.isEnabledFor(logging.DEBUG)
+
+         window = window or self.window
+         ranges = list(ranges)
+         chunks = [chunk for adr, size in ranges for chunk in self.__chunks(adr, size)]
+         frames = self.__frames(chunks)
+         pieces = [None]*len(frames)
+         try :
+            # La primera trama de múltiples rangos negocia su uso :
+            if self.scatter is None :
+               probe = next((n for n, frame in enumerate(frames) if len(frame) > 1), None)
+               if probe is not None :
+                  pieces[probe] = self.__probeScatter(frames[probe])
+                  if pieces[probe] is None :
+                     # Sin la orden (o hasta negociarla) cada fragmento es una trama :
+                     frames = [[chunk] for chunk in chunks]
+                     pieces = [None]*len(frames)
+
+            pending = [n for n, piece in enumerate(pieces) if piece is None]
+            for first in range(0, len(pending), window) :
+               group = pending[first:first + window]
+               try :
+                  self.__applyTimeout()
+                  for n in group :
+                     self.__sendFrame(frames[n])
+                  for n in group :
+                     pieces[n] = self.__rcveFrame(frames[n])
+                  if self.pacer is not None :
+                     self.pacer.success()
+
+               except FacadeWrapperError as e :
+                  self.log.warning('Fallo la lectura en grupo, se lee por fragmentos.')
+                  if self.pacer is not None :
+                     self.pacer.failure()
+                  self.__resync()
+                  for n in group :
+                     pieces[n] = [self.__retry(self.__get, chunk_adr, chunk_size)
+                                  for chunk_adr, chunk_size in frames[n]]
+
+               finally :
+                  self.__recordRx()
 
          except FacadeWrapperError as e :
-            raise FacadeWrapperError('No se pudo obtener el contenido de 0x%04X / 0x%02X bytes.'%(adr, size), e, self)
+            if self.trace is not None :
+               self.trace.error()
+            raise FacadeWrapperError('No se pudo obtener el contenido de %d rangos.'
+                                                           % len(ranges), e, self)
+
+         data = [piece for frame in pieces for piece in frame]
+
+         # Se reagrupan los fragmentos de cada rango :
+         result, n = [], 0
+         for adr, size in ranges :
+            content = bytearray()
+            while len(content) < size :
+               content += data[n]
+               n += 1
+            result.append(content)
+         return result
 
 
     def setData(self, adr, data, mode = 'byte') :
@@ -272,29 +810,32 @@ class FacadeWrapper :
                                                 'los argumentos, detalle :\n')
             raise e
 
+         self.__debug = self.log.isEnabledFor(logging.DEBUG)
          try :
             self.log.debug('Modificación del contenido de %d bytes '
                                       'desde 0x%04X.' %(len(data_bytes), adr))
 
-            # Limpia la memoria de contención de recepción :
-            self.__comm.flushInput()
-
-            # Envía el comando según el protocolo, nótese que se asegura la con-
-            # versión a una secuencia de bytes de los parámetros importados y se
-            # asegura de substituir los caracteres especiales por sus secuencias
-            # de escape :
-            cmd = SET_CHAR + self.__encodeData(struct.pack('<H', adr) + struct.pack('B',
-                                                     len(data_bytes)) + data_bytes)
-            self.__xmit(cmd)
-
-            # Se espera por la respuesta del comando :
-            ans = self.__RcveAns()
-            return ans
+            for chunk_adr, chunk_size in self.__chunks(adr, len(data_bytes)) :
+               offset = chunk_adr - adr
+               self.__retry(self.__set, chunk_adr,
+                                      data_bytes[offset:offset + chunk_size])
+            return True
 
          except FacadeWrapperError as e :
+            # Se preserva la semántica original, el rechazo (NACK) persistente
+            # se notifica devolviendo False :
+            if self.trace is not None :
+               self.trace.error()
+            if self.__rejected :
+               return False
             raise FacadeWrapperError(u'No se pudo modificar el contenido de '
                     u'0x%04X / 0x%02X bytes.' %(adr, len(data_bytes)), e, self)
 
+         finally :
+            # Con el puerto aún tomado, ver Flight :
+            if self.single_flight :
+               self.__closeFlights(adr, len(data_bytes))
+
     def open(self):
       """
       Abre el puerto serie, si no puede realizarse levanta la excepción FacadeWrapperError.
@@ -328,15 +869,79 @@ class FacadeWrapper :
       self.close()
 
 
-    def __init__(self, serial_port, throughput_limit = False, open = False) :
+    def __init__(self, serial_port, throughput_limit = False, open = False,
+                       adaptive_timeout = True, retries = 2, chunk_size = 255,
+                       pacer = None, trace = None, scatter = None, single_flight = True,
+                       window = 4, profile = None) :
       """
       Encapsula el interfaz serial serial_port, para dotarlo de las operaciones
       de lectura y escritura con las especificaciones del protocolo.
+
+      Si adaptive_timeout es verdadero, el límite de espera (timeout) del puerto
+      se ajusta a la latencia observada (ver AdaptiveTimeout), también puede ser
+      una instancia de AdaptiveTimeout con una configuración particular. El
+      límite configurado en serial_port (si lo hay) es el mínimo del límite
+      adaptativo, que solo puede extenderlo. Las lecturas y las escrituras
+      (la espera de su ACK) tienen estimadores independientes (timeout y
+      ack_timeout).
+      Las lecturas/escrituras se dividen en fragmentos de chunk_size bytes, cada
+      fragmento se reintenta hasta retries veces ante un timeout o un NACK.
+      El ritmo de transmisión lo regula pacer (una instancia de Pacer), si es
+      None no se limita.
+      Si se asigna trace (una instancia de FacadeTrace.WireTrace) se registran
+      las tramas trasmitidas y recibidas.
+      scatter indica si el dispositivo implementa la orden GET de múltiples
+      rangos : None (por defecto) se negocia en la primera lectura en grupo
+      que la requiera, True o False la habilita o deshabilita.
+      Si single_flight es verdadero las lecturas simultáneas (de varios hilos)
+      de un mismo rango se trasmiten una sola vez (ver getData).
+      window es el número de órdenes por grupo de las lecturas en grupo (ver
+      getDataBatch).
+      profile (el nombre de un archivo o un diccionario) son los parámetros
+      recomendados por la caracterización del enlace (ver FacadeProfile), que
+      tienen precedencia sobre los anteriores.
       """
       # Cuando se utiliza el simulador de Proteus es necesario limitar el volumen de 
-      # datos a transmitir, se define el atributo throughput_limit para definir si se 
-      # limita o no el volumen de datos :
+      # datos a transmitir, throughput_limit se conserva por compatibilidad como
+      # un regulador de 20 tramas por segundo que se ajusta automáticamente :
       self.throughput_limit = throughput_limit
+      if pacer is None and throughput_limit :
+         pacer = Pacer(frame_rate = 20, auto_tune = True)
+      self.pacer = pacer
+
+      # Límite de espera adaptativo, reintentos y tamaño de los fragmentos :
+      if adaptive_timeout is True :
+         configured = getattr(serial_port, 'timeout', None)
+         minimum = configured if configured else 0.5
+         adaptive_timeout = AdaptiveTimeout(initial = minimum, minimum = minimum,
+                                            maximum = max(2.0, minimum))
+      self.timeout = adaptive_timeout or None
+      self.ack_timeout = self.timeout.copy() if self.timeout is not None else None
+      self.__timeout = self.timeout
+      self.retries = retries
+      self.chunk_size = chunk_size
+      self.window = window
+      self.__sent = None
+      self.__rejected = False
+
+      # Orden GET de múltiples rangos (ver __encodeData) :
+      self.scatter = scatter
+
+      # Lecturas en curso (compartidas) y el número de lecturas resueltas con
+      # el resultado de otra :
+      self.single_flight = single_flight
+      self.shared_reads = 0
+      self.__flights = []
+      self.__flightLock = threading.Lock()
+
+      # Registro binario de las tramas :
+      self.trace = trace
+
+      # Mapa de memoria del dispositivo (CStruct.MemoryMap), si es None las
+      # fachadas utilizan el mapa por defecto :
+      self.memory_map = None
+      self.__rx = bytearray()
+      self.__debug = False
 
       # Asigna directamente como el puerto de comunicaciones :
       self.__comm  = serial_port 
@@ -355,4 +960,33 @@ class FacadeWrapper :
           
       # Se asigna el manejador de reportes :
       self.log = report.getLogger('FacadePort.' + self.__comm.port)
+
+      if profile is not None :
+         self.loadProfile(profile)
+
+
+    def loadProfile(self, profile) :
+      """
+      Aplica los parámetros de transferencia recomendados por la caracterización
+      del enlace (ver FacadeProfile.LinkProfile), profile es el nombre del
+      archivo (JSON) guardado o el diccionario de los parámetros : chunk_size,
+      window, timeout (el límite de espera inicial) y scatter.
+      """
+      if isinstance(profile, str) :
+         with open(profile) as f :
+            profile = json.load(f)
+      profile = profile.get('recommended', profile)
+
+      self.chunk_size = profile.get('chunk_size', self.chunk_size)
+      self.window = profile.get('window', self.window)
+      if 'timeout' in profile and self.timeout is not None :
+         # El límite recomendado no reduce el mínimo configurado :
+         initial = max(profile['timeout'], self.timeout.minimum)
+         self.timeout = AdaptiveTimeout(initial = initial, minimum = self.timeout.minimum,
+                                        maximum = max(self.timeout.maximum, initial), k = self.timeout.k)
+         self.ack_timeout = self.timeout.copy()
+      if 'scatter' in profile :
+         self.scatter = profile['scatter']
+      self.log.info('Parámetros del enlace : fragmentos de %d bytes, grupos de %d órdenes.'
+                                                         % (self.chunk_size, self.window))
          
@@ -0,0 +1,198 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import struct
+from time import monotonic, sleep
+
+from FacadeWrapper import ACK_CHAR, ESCAPE_CHAR, GET_CHAR, MULTI_CHAR, NACK_CHAR, SET_CHAR
+
+
+class VirtualDevice :
+    """
+    Dispositivo serie virtual que implementa el protocolo de FacadeWrapper sobre
+    una imagen de memoria (memory, un bytearray indexado por las direcciones del
+    protocolo), puede utilizarse en lugar de Serial para pruebas, ejem. :
+
+        device = VirtualDevice()
+        port = FacadeWrapper(device, open = True)
+
+    Si scatter es verdadero implementa la orden GET de múltiples rangos ('M'),
+    si es falso la rechaza (NACK) como un dispositivo que no la implementa, y
+    si es None la ignora (no responde) como uno que la desconoce.
+    Las órdenes cuyo rango excede la memoria se rechazan (NACK). Si se asigna
+    latency (segundos) la respuesta de cada orden se demora en dicho lapso, y
+    set_latency (por defecto latency) la de las escrituras. Como en un puerto
+    serie, read espera la respuesta a lo más timeout segundos.
+
+    Para simular fallas del enlace, se descartan las respuestas de las drop
+    órdenes siguientes.
+
+    frames y rx_bytes contabilizan las órdenes y los bytes recibidos.
+    """
+    def __init__(self, memory = None, scatter = True, latency = 0.0, port = 'VIRTUAL',
+                 set_latency = None) :
+      self.memory = bytearray(0x10000) if memory is None else memory
+      self.scatter = scatter
+      self.latency = latency
+      self.set_latency = set_latency
+      self.drop = 0
+      self.port = port
+      self.baudrate = 0
+      self.timeout = None
+
+      self.frames = 0
+      self.rx_bytes = 0
+
+      self.__rx = bytearray()
+      self.__tx = bytearray()
+      self.__ready = 0.0
+      self.__open = False
+
+    def open(self) :
+      self.__open = True
+
+    def close(self) :
+      self.__open = False
+
+    def isOpen(self) :
+      return self.__open
+
+    is_open = property(isOpen)
+
+    @property
+    def in_waiting(self) :
+      return len(self.__tx) if monotonic() >= self.__ready else 0
+
+    def flushInput(self) :
+      self.__tx.clear()
+
+    reset_input_buffer = flushInput
+
+    def write(self, data) :
+      self.rx_bytes += len(data)
+      self.__rx += data
+      while self.__rx and self.__process() :
+         pass
+      return len(data)
+
+    def read(self, size = 1) :
+      # Sin respuesta pendiente (ejem. descartada, ver drop) se espera el
+      # límite completo, como en un puerto serie :
+      if not self.__tx :
+         sleep(self.timeout or 0)
+         return b''
+      wait = self.__ready - monotonic()
+      if wait > 0 :
+         if self.timeout is not None and wait > self.timeout :
+            sleep(self.timeout)
+            return b''
+         sleep(wait)
+      data = bytes(self.__tx[:size])
+      del self.__tx[:size]
+      return data
+
+    def flush(self) :
+      pass
+
+    def __decode(self, start, n) :
+      """
+      Decodifica n datos desde la posición start de lo recibido, devuelve los
+      datos y la posición siguiente o (None, None) si aún no se recibieron.
+      """
+      data, pos = bytearray(), start
+      while len(data) < n :
+         if pos >= len(self.__rx) :
+            return None, None
+         byte = self.__rx[pos]
+         pos += 1
+         if byte == ESCAPE_CHAR[0] :
+            if pos >= len(self.__rx) :
+               return None, None
+            byte = self.__rx[pos] ^ ESCAPE_CHAR[0] ^ 0x55
+            pos += 1
+         data.append(byte)
+      return data, pos
+
+    def __encode(self, data) :
+      out = bytearray()
+      for byte in data :
+         if byte in (ESCAPE_CHAR[0], ACK_CHAR[0], NACK_CHAR[0]) :
+            out += ESCAPE_CHAR + bytes([byte ^ ESCAPE_CHAR[0] ^ 0x55])
+         else :
+            out.append(byte)
+      return out
+
+    def __valid(self, adr, size) :
+      return adr + size <= len(self.memory)
+
+    def __reply(self, data, latency = None) :
+      if self.drop :
+         self.drop -= 1
+         return
+      self.__tx += data
+      self.__ready = monotonic() + (self.latency if latency is None else latency)
+
+    def __process(self) :
+      """
+      Procesa la orden al inicio de lo recibido, devuelve False si aún no se
+      recibió completa.
+      """
+      cmd = self.__rx[:1]
+      if cmd == GET_CHAR :
+         params, end = self.__decode(1, 3)
+         if params is None :
+            return False
+         adr, size = struct.unpack('<HB', params)
+         del self.__rx[:end]
+         self.frames += 1
+         if self.__valid(adr, size) :
+            self.__reply(self.__encode(self.memory[adr:adr + size]) + ACK_CHAR)
+         else :
+            self.__reply(NACK_CHAR)
+
+      elif cmd == SET_CHAR :
+         params, end = self.__decode(1, 3)
+         if params is None :
+            return False
+         adr, size = struct.unpack('<HB', params)
+         data, end = self.__decode(end, size)
+         if data is None :
+            return False
+         del self.__rx[:end]
+         self.frames += 1
+         latency = self.set_latency
+         if self.__valid(adr, size) :
+            self.memory[adr:adr + size] = data
+            self.__reply(ACK_CHAR, latency)
+         else :
+            self.__reply(NACK_CHAR, latency)
+
+      elif cmd == MULTI_CHAR and self.scatter :
+         count, end = self.__decode(1, 1)
+         if count is None :
+            return False
+         params, end = self.__decode(end, 3*count[0])
+         if params is None :
+            return False
+         del self.__rx[:end]
+         self.frames += 1
+         ranges = [struct.unpack_from('<HB', params, 3*k) for k in range(count[0])]
+         if all(self.__valid(adr, size) for adr, size in ranges) and sum(size for _, size in ranges) <= 255 :
+            data = b''.join(self.memory[adr:adr + size] for adr, size in ranges)
+            self.__reply(self.__encode(data) + ACK_CHAR)
+         else :
+            self.__reply(NACK_CHAR)
+
+      elif cmd == MULTI_CHAR :
+         # Un dispositivo que no implementa la orden la rechaza (o la ignora),
+         # sus parámetros se descartan como bytes sin orden :
+         del self.__rx[:1]
+         self.frames += 1
+         if self.scatter is not None :
+            self.__reply(NACK_CHAR)
+
+      else :
+         # Los bytes que no inician una orden se descartan :
+         del self.__rx[:1]
+
+      return True
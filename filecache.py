@@ -0,0 +1,49 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Resguardo en disco (JSON) de los resultados de interpretar archivos (ejem.
+encabezados C o mapas del enlazador), identificado por el resumen (hash) de su
+contenido, de manera que las ejecuciones posteriores no vuelven a
+interpretarlos.
+"""
+
+import hashlib
+import json
+import os
+
+
+def load_cached(filenames, suffix, version, parse, cache_dir = None) :
+    """
+    Devuelve el resultado (serializable en JSON) de parse(texts) para el
+    contenido de los archivos filenames (texts es la lista de sus nombres y
+    textos). Se toma del archivo <filename><suffix> (junto al primero o en
+    cache_dir) si corresponde al resumen (hash) de los archivos y a version, de
+    lo contrario se invoca parse y se actualiza el archivo.
+    """
+    texts, digest = [], hashlib.sha1()
+    for filename in filenames :
+        with open(filename, 'rb') as f :
+            raw = f.read()
+        digest.update(raw)
+        texts.append((filename, raw.decode('utf-8', errors = 'replace')))
+    digest = digest.hexdigest()
+
+    cache_name = os.path.basename(filenames[0]) + suffix
+    cache_file = os.path.join(cache_dir if cache_dir else os.path.dirname(filenames[0]), cache_name)
+
+    try :
+        with open(cache_file, 'r', encoding = 'utf-8') as f :
+            cached = json.load(f)
+        if cached.get('hash') == digest and cached.get('version') == version :
+            return cached['data']
+    except (OSError, ValueError, TypeError, KeyError, AttributeError) :
+        pass
+
+    data = parse(texts)
+    try :
+        with open(cache_file, 'w', encoding = 'utf-8') as f :
+            json.dump({'hash' : digest, 'version' : version, 'data' : data}, f)
+    except OSError :
+        pass
+    return data
@@ -13,12 +13,15 @@ class report :
    parent_logger = None
    console_handler = None
 
-   def __init__(self, parent_logger, filename = 'report.log') :
+   def __init__(self, parent_logger, filename = 'report.log',
+                                                   file_level = logging.DEBUG) :
       """
       Inicializa el sistema de reporte, el cual es dual, dirigido
       a la consola con un reporte sumario de incidencias y uno
       detallado al archivo filename, el que si no se especifíca
-      tiene el nombre por defecto 'report.log'.
+      tiene el nombre por defecto 'report.log'. El nivel de detalle
+      del archivo es file_level (por defecto DEBUG), para el registro
+      de las tramas es preferible FacadeTrace.WireTrace.
       """
       # Solo se permite un sistema de reporte :
       if report.parent_logger is not None :
@@ -27,7 +30,7 @@ class report :
 
       # Crea la raíz de reporte :
       report.parent_logger = logging.getLogger(parent_logger)
-      report.parent_logger.setLevel(logging.DEBUG)
+      report.parent_logger.setLevel(min(logging.ERROR, file_level))
 
       # Se utilizan dos manejadores, uno para la consola con mensajes de error
       # graves :
@@ -36,7 +39,7 @@ class report :
 
       # y un segundo para un archivo de texto, con un detalle exhaustivo :
       file_handler = logging.FileHandler(filename, 'w')
-      file_handler.setLevel(logging.DEBUG)
+      file_handler.setLevel(file_level)
 
       # Se utiliza el mismo formato para ambos manejadores :
       formatter = logging.Formatter('\n%(asctime)s - %(name)s - '
@@ -57,7 +60,7 @@ class report :
       a Nulllogging
       """
       if report.parent_logger is None :
-         logger = logging.getlogger('DummyLogger')
+         logger = logging.getLogger('DummyLogger')
          logger.addHandler(logging.NullHandler())
          return logger
 
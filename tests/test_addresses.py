@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from CStruct import *
+from VirtualDevice import VirtualDevice
+
+
+class leaf_t(typedef):
+    x = uint8_t
+    y = uint16_t
+
+class inner_t(typedef):
+    pad = uint8_t
+    a = ArrayOf(leaf_t, 3)
+
+class outer_t(typedef):
+    pad = uint16_t
+    b = ArrayOf(inner_t, 2)
+
+class node_t(typedef):
+    v = uint16_t
+    w = ArrayOf(leaf_t, 2)
+
+class head_t(typedef):
+    pad = uint8_t
+    ptr = PointerTo(node_t, RAM_Memory)
+
+
+def memory_of(var, name) :
+    return vars(type(var))[name].__memory__
+
+
+class AddressTest(unittest.TestCase):
+
+    def setUp(self):
+        self.device = VirtualDevice()
+        self.port = FacadeWrapper(self.device, open = True)
+        self.ram = FacadeConfig.RAM_SPACE.offset
+
+    def test_nested_fields_are_absolute(self):
+        var = outer_t(memory = RAM_Memory(0x10, self.port))
+        leaf = var.b[1].a[2]
+        memory = memory_of(leaf, 'y')
+        # Las memorias derivadas de una dirección fija guardan la dirección
+        # absoluta, sin desplazamiento acumulado :
+        # (leaf_t ocupa 3 bytes, inner_t 1 + 3*3)
+        expected = 0x10 + 2 + 10 + 1 + 2*3 + 1
+        self.assertIsInstance(memory.__adr__, int)
+        self.assertEqual(memory.__adr__, expected)
+        self.assertEqual(memory.__offset__, 0)
+        self.assertEqual(memory.__address__, expected)
+        self.device.memory[self.ram + expected : self.ram + expected + 2] = b'\x34\x12'
+        self.assertEqual(leaf.y, 0x1234)
+
+    def test_pointer_targets_keep_offsets(self):
+        head = head_t(memory = RAM_Memory(0x200, self.port))
+        self.device.memory[self.ram + 0x201 : self.ram + 0x203] = b'\x00\x03'
+        memory = memory_of(head.ptr.w[1], 'y')
+        # Las memorias derivadas de un puntero siguen al puntero :
+        self.assertIsInstance(memory.__adr__, FacadeMemory)
+        self.assertEqual(memory.__offset__, 2 + 3 + 1)
+        self.assertEqual(memory.__address__, 0x300 + 2 + 3 + 1)
+        self.device.memory[self.ram + 0x202] = 0x04
+        self.assertEqual(memory.__address__, 0x400 + 2 + 3 + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
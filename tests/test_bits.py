@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from CStruct import *
+from VirtualDevice import VirtualDevice
+
+
+class status_t(typedef):
+    flags = BitField(uint8_t, ready=1, mode=3, _pad=2, top=2)
+    nibbles = BitField(uint8_t, low=4, high=4)
+
+
+class BitFieldTest(unittest.TestCase):
+
+    def setUp(self):
+        self.device = VirtualDevice()
+        self.port = FacadeWrapper(self.device, open = True)
+        self.ram = FacadeConfig.RAM_SPACE.offset + 0x40
+        self.device.memory[self.ram] = 0b11000001
+        self.status = status_t(memory = RAM_Memory(0x40, self.port))
+
+    def test_read_fields(self):
+        flags = self.status.flags
+        self.assertEqual((flags.ready, flags.mode, flags.top), (1, 0, 3))
+
+    def test_modify_is_one_round_trip(self):
+        # Una lectura y una escritura de la palabra, los demás bits se preservan :
+        frames = self.device.frames
+        self.status.flags.mode = 5
+        self.assertEqual(self.device.frames - frames, 2)
+        self.assertEqual(self.device.memory[self.ram], 0b11001011)
+
+    def test_context_merges_fields(self):
+        frames = self.device.frames
+        with self.status.flags as flags :
+            flags.ready = 0
+            flags.mode = 2
+        self.assertEqual(self.device.frames - frames, 2)
+        self.assertEqual(self.device.memory[self.ram], 0b11000100)
+
+    def test_full_word_skips_read(self):
+        frames = self.device.frames
+        self.status.nibbles.modify(low=0x5, high=0xA)
+        self.assertEqual(self.device.frames - frames, 1)
+        self.assertEqual(self.device.memory[self.ram + 1], 0xA5)
+
+
+if __name__ == '__main__':
+    unittest.main()
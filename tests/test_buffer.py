@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+from array import array
+
+from CStruct import *
+
+
+class pos_t(typedef):
+    x = int16_t
+    y = int16_t
+
+class config_t(typedef):
+    mode = uint8_t
+    gain = uint16_t
+    pos = pos_t
+    name = CharArray_t(4)
+
+
+class FromBufferTest(unittest.TestCase):
+
+    def setUp(self):
+        self.image = bytearray(64)
+        self.var = config_t.from_buffer(self.image, 0x10)
+
+    def test_writes_reach_buffer(self):
+        self.var.gain = 0x1234
+        self.var.pos.y = -2
+        self.var.name = 'ab'
+        self.assertEqual(self.image[0x11:0x13], b'\x34\x12')
+        self.assertEqual(self.image[0x15:0x17], b'\xFE\xFF')
+        self.assertEqual(self.image[0x17:0x1B], b'ab\x00\x00')
+        self.assertEqual(self.image.count(0), 64 - 6)
+
+    def test_reads_follow_buffer(self):
+        self.assertEqual(self.var.mode, 0)
+        # Sin resguardo : las modificaciones externas se leen de inmediato :
+        self.image[0x10] = 7
+        self.image[0x13:0x15] = b'\x05\x00'
+        self.assertEqual((self.var.mode, self.var.pos.x), (7, 5))
+        self.assertEqual(read(self.var).mode, 7)
+
+    def test_other_buffers(self):
+        words = array('H', [0]*8)
+        var = pos_t.from_buffer(words, 4)
+        var.__write__((1, -1))
+        self.assertEqual(list(words[2:4]), [1, 0xFFFF])
+
+    def test_range_checks(self):
+        config_t.from_buffer(self.image, 64 - 11)
+        with self.assertRaises(ValueError) :
+            config_t.from_buffer(self.image, 64 - 10)
+        with self.assertRaises(ValueError) :
+            config_t.from_buffer(bytes(64))
+
+    def test_emulation_without_buffer(self):
+        var = config_t()
+        self.assertEqual(var.gain, 0)
+        var.gain = 500
+        var.pos.x = -3
+        self.assertEqual((var.gain, var.pos.x, var.pos.y), (500, -3, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+import warnings
+
+from CHeader import CHeaderError, build, load_header, parse_header
+from CStruct import columns
+
+
+HEADER = """
+#define N 3
+
+typedef struct {
+    uint8_t  a ;
+    uint24_t b ;
+    int24_t  c ;
+    unsigned short long d ;
+    short long e ;
+    int40_t  f ;
+    uint40_t g ;
+    float    h ;
+    uint16_t buf[N] ;
+} widths_t ;
+"""
+
+
+def types_of(text) :
+    return build(parse_header(text))
+
+
+class LayoutSizeTest(unittest.TestCase):
+
+    def test_sizes_match_xc8(self):
+        widths_t = types_of(HEADER)['widths_t']
+        var = widths_t()
+        # 1 + 3*4 + 5*2 + 3 + 2*3 (XC8) :
+        self.assertEqual(len(var), 32)
+        offsets = {c.name : c.offset for c in columns(var)}
+        self.assertEqual([offsets[n] for n in 'abcdefgh'], [0, 1, 4, 7, 10, 13, 18, 23])
+        self.assertEqual(offsets['buf[0]'], 26)
+
+
+class MacroTest(unittest.TestCase):
+
+    def test_nested_macros(self):
+        layout = parse_header('''
+#define BASE 0x10u
+#define N (BASE/4 + (1 << 2) - 3 % 2)
+typedef struct { uint8_t buf[N] ; } buf_t ;
+''')
+        self.assertEqual(len(build(layout)['buf_t']()), 7)
+
+    def test_undefined_macro_names_typedef(self):
+        for macro in ('FOO', 'ABC') :
+            with self.assertRaises(CHeaderError) as e :
+                parse_header('typedef struct { uint8_t buf[%s] ; } buf_t ;' % macro)
+            self.assertIn(macro, str(e.exception))
+            self.assertIn('buf_t', str(e.exception))
+
+    def test_unsupported_typedef_warns(self):
+        with warnings.catch_warnings(record = True) as caught :
+            warnings.simplefilter('always')
+            layout = parse_header('typedef void (*callback_t)(uint8_t) ;\n'
+                                  'typedef struct { uint8_t a ; } a_t ;')
+        self.assertIn('a_t', build(layout))
+        self.assertEqual(len(caught), 1)
+
+
+class CacheTest(unittest.TestCase):
+
+    def test_layout_is_cached(self):
+        with tempfile.TemporaryDirectory() as folder :
+            filename = os.path.join(folder, 'widths.h')
+            with open(filename, 'w') as f :
+                f.write(HEADER)
+            load_header(filename)
+            self.assertTrue(os.path.exists(filename + '.layout.json'))
+            self.assertEqual(len(load_header(filename)['widths_t']()), 32)
+
+
+if __name__ == '__main__':
+    unittest.main()
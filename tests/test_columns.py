@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+import os
+import random
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import FacadeColumns
+from CStruct import *
+from FacadeColumns import ColumnRecorder, decode_columns, load_recording
+from VirtualDevice import VirtualDevice
+
+
+class pos_t(typedef):
+    x = int16_t
+    y = float24_t
+
+class sample_t(typedef):
+    a = uint8_t
+    b = ArrayOf(uint16_t, 2)
+    p = pos_t
+    s = CharArray_t(4)
+    z = int24_t
+
+
+def images(count, seed = 3):
+    # Registros aleatorios, con texto en el campo s :
+    rnd = random.Random(seed)
+    length = len(sample_t())
+    raw = bytearray(rnd.randrange(256) for _ in range(count*length))
+    for k in range(count) :
+        raw[k*length + 10:k*length + 14] = b'ab%02d' % (k % 100)
+    return bytes(raw)
+
+
+class DecodeColumnsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.var = sample_t.at(None, 0)
+        self.length = len(self.var)
+
+    def check(self, cols, raw):
+        self.assertEqual(list(cols), ['a', 'b[0]', 'b[1]', 'p.x', 'p.y', 's', 'z'])
+        for k in range(len(raw) // self.length) :
+            ref = self.var.to_custom(raw[k*self.length:(k + 1)*self.length])
+            row = (cols['a'][k], (cols['b[0]'][k], cols['b[1]'][k]), (cols['p.x'][k], cols['p.y'][k]),
+                   bytes(cols['s'][k*4:k*4 + 4]).decode(), cols['z'][k])
+            # repr, pues los float24 aleatorios pueden ser NaN :
+            self.assertEqual(repr(row), repr(tuple(ref)))
+
+    def test_buffer_one_and_many_processes(self):
+        raw = images(500)
+        one = decode_columns(sample_t, raw, processes = 1)
+        many = decode_columns(sample_t, raw, processes = 3, chunk = 64)
+        self.check(one, raw)
+        for name in one :
+            self.assertEqual(bytes(one[name]), bytes(many[name]))
+
+    def test_file_source(self):
+        raw = images(300)
+        with tempfile.TemporaryDirectory() as folder :
+            filename = os.path.join(folder, 'capture.bin')
+            with open(filename, 'wb') as f :
+                f.write(b'HDR' + raw)
+            one = decode_columns(sample_t, filename, offset = 3, processes = 1)
+            many = decode_columns(sample_t, filename, offset = 3, processes = 2, chunk = 50)
+        self.check(one, raw)
+        for name in one :
+            self.assertEqual(bytes(one[name]), bytes(many[name]))
+
+    def test_empty_source(self):
+        cols = decode_columns(sample_t, b'')
+        self.assertTrue(all(len(col) == 0 for col in cols.values()))
+
+    def test_decode_failure_is_not_masked(self):
+        # El error de la decodificación se propaga (la memoria compartida se
+        # libera en lugar de levantar BufferError) :
+        with mock.patch.object(FacadeColumns, '_decode', side_effect = RuntimeError('decode')) :
+            with self.assertRaises(RuntimeError) :
+                decode_columns(sample_t, images(10), processes = 1)
+
+
+class RecorderTest(unittest.TestCase):
+
+    def test_recording_round_trip(self):
+        var = sample_t.at(None, 0)
+        length = len(var)
+        raw = images(25)
+        with tempfile.TemporaryDirectory() as folder :
+            with ColumnRecorder(folder, {'rec' : var}, segment_rows = 10) as recorder :
+                for k in range(25) :
+                    recorder.append(raw[k*length:(k + 1)*length], t = float(k))
+            self.assertEqual(recorder.segments, 3)
+            cols = load_recording(folder)
+        self.assertEqual(list(cols['time']), [float(k) for k in range(25)])
+        expected = decode_columns(sample_t, raw, processes = 1)
+        for name, col in expected.items() :
+            self.assertEqual(bytes(cols['rec.' + name]), bytes(col))
+
+    def test_samples_from_device(self):
+        device = VirtualDevice()
+        port = FacadeWrapper(device, open = True)
+        count = uint16_t(memory = RAM_Memory(0x10, port))
+        pos = pos_t(memory = RAM_Memory(0x20, port))
+        with tempfile.TemporaryDirectory() as folder :
+            with ColumnRecorder(folder, {'count' : count, 'pos' : pos}, segment_rows = 4) as recorder :
+                for k in range(6) :
+                    count.__write__(100 + k)
+                    pos.x = -k
+                    frames = device.frames
+                    self.assertTrue(recorder.sample(t = float(k)))
+                    # Una trama por variable :
+                    self.assertEqual(device.frames - frames, 2)
+            cols = load_recording(folder)
+        self.assertEqual(list(cols), ['time', 'count', 'pos.x', 'pos.y'])
+        self.assertEqual(list(cols['count']), [100 + k for k in range(6)])
+        self.assertEqual(list(cols['pos.x']), [-k for k in range(6)])
+
+    def test_dropped_without_blocking(self):
+        var = sample_t.at(None, 0)
+        raw = images(1)
+        release = threading.Event()
+        decode = FacadeColumns._decode
+
+        def slow_decode(*args) :
+            release.wait(5)
+            return decode(*args)
+
+        with tempfile.TemporaryDirectory() as folder :
+            with mock.patch.object(FacadeColumns, '_decode', slow_decode) :
+                recorder = ColumnRecorder(folder, {'rec' : var}, segment_rows = 1, buffers = 1, block = False)
+                # El único buffer queda en el hilo de escritura :
+                self.assertTrue(recorder.append(raw, t = 0.0))
+                self.assertFalse(recorder.append(raw, t = 1.0))
+                self.assertFalse(recorder.append(raw, t = 2.0))
+                release.set()
+                recorder.close()
+            self.assertEqual((recorder.segments, recorder.dropped), (1, 2))
+            self.assertEqual(list(load_recording(folder)['time']), [0.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
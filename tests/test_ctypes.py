@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+import ctypes
+import unittest
+
+from CStruct import ArrayOf, buffer_of, ctype_of, typedef, uint8_t, uint16_t
+
+
+class packet_t(typedef):
+    size = uint8_t
+    data = ArrayOf(uint16_t, 0)
+
+class frame_t(typedef):
+    head = packet_t
+    items = ArrayOf(uint16_t, 3)
+
+
+class CtypeTest(unittest.TestCase):
+
+    def test_structure_uses_typedef_name(self):
+        ctype = ctype_of(frame_t)
+        self.assertEqual(ctype.__name__, 'frame_t')
+        self.assertEqual(dict(ctype._fields_)['head'].__name__, 'packet_t')
+
+    def test_empty_array(self):
+        ctype = ctype_of(packet_t)
+        self.assertEqual(ctypes.sizeof(ctype), len(packet_t()))
+        self.assertEqual(ctypes.sizeof(ctype_of(frame_t)), len(frame_t()))
+
+
+class BufferTest(unittest.TestCase):
+
+    def test_buffer_view_is_shared(self):
+        image = bytearray(16)
+        var = frame_t.from_buffer(image, 4)
+        view = buffer_of(var)
+        self.assertEqual(len(view), len(var))
+        self.assertFalse(view.readonly)
+        view[0] = 7
+        self.assertEqual(image[4], 7)
+        self.assertEqual(var.head.size, 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from CStruct import *
+from VirtualDevice import VirtualDevice
+
+
+class sample_t(typedef):
+    t = uint16_t
+    v = int8_t
+    s = ArrayOf(uint8_t, 2)
+
+
+class CursorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.device = VirtualDevice()
+        self.port = FacadeWrapper(self.device, open = True)
+        ram = FacadeConfig.RAM_SPACE.offset + 0x100
+        for i in range(300) :
+            self.device.memory[ram + 5*i : ram + 5*i + 5] = bytes([i & 255, i >> 8, (256 - i) & 255, i % 7, 3])
+        self.view = sample_t.at(self.port, 0x100)
+
+    def test_move_retargets_view(self):
+        fields = self.view.s
+        self.assertEqual(self.view.t, 0)
+        move(self.view, 0x105)
+        # La misma vista (y sus campos) lee el nuevo registro :
+        self.assertEqual((self.view.t, self.view.v), (1, -1))
+        self.assertIs(self.view.s, fields)
+        self.assertEqual(fields[0], 1)
+        with self.assertRaises(ValueError) :
+            move(self.view, 0xFFE)
+
+    def test_records_are_batched(self):
+        frames = self.device.frames
+        values = list(records(self.view, 0x100, 300))
+        self.assertEqual(len(values), 300)
+        self.assertEqual((values[299].t, values[299].v, tuple(values[299].s)), (299, -43, (5, 3)))
+        # 51 registros de 5 bytes por trama :
+        self.assertEqual(self.device.frames - frames, 6)
+
+    def test_records_stride(self):
+        values = list(records(self.view, 0x100, 10, stride = 10))
+        self.assertEqual([value.t for value in values], list(range(0, 20, 2)))
+        with self.assertRaises(ValueError) :
+            list(records(self.view, 0xF00, 100))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+import unittest
+
+from FacadeWrapper import FacadeWrapper, FacadeWrapperError
+from VirtualDevice import VirtualDevice
+
+
+def start(target, *args):
+    result = {}
+    def run() :
+        try :
+            result['data'] = target(*args)
+        except Exception as e :
+            result['error'] = e
+    thread = threading.Thread(target = run)
+    thread.start()
+    return thread, result
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def setUp(self):
+        self.device = VirtualDevice(latency = 0.2)
+        self.device.memory[0xE000:0xE010] = bytes(range(16))
+        self.port = FacadeWrapper(self.device, open = True)
+
+    def test_covered_read_is_shared(self):
+        leader, first = start(self.port.getData, 0xE000, 16)
+        time.sleep(0.05)
+        follower, second = start(self.port.getData, 0xE004, 4)
+        leader.join(); follower.join()
+        self.assertEqual(bytes(first['data']), bytes(range(16)))
+        self.assertEqual(bytes(second['data']), bytes(range(4, 8)))
+        self.assertEqual(self.device.frames, 1)
+        self.assertEqual(self.port.shared_reads, 1)
+
+    def test_error_reaches_followers(self):
+        self.port.retries = 0
+        self.device.drop = 1
+        leader, first = start(self.port.getData, 0xE000, 16)
+        time.sleep(0.05)
+        follower, second = start(self.port.getData, 0xE004, 4)
+        leader.join(); follower.join()
+        self.assertIsInstance(first.get('error'), FacadeWrapperError)
+        self.assertIsInstance(second.get('error'), FacadeWrapperError)
+        self.assertEqual(self.port.shared_reads, 1)
+
+    def test_read_after_write_sees_it(self):
+        # Una lectura en curso y otra que espera por el puerto mientras se
+        # escribe, la lectura posterior a la escritura no se suma a ellas :
+        leader, first = start(self.port.getData, 0xE000, 16)
+        time.sleep(0.05)
+        writer, written = start(self.port.setData, 0xE004, b'\xAA')
+        time.sleep(0.05)
+        waiting, second = start(self.port.getData, 0xE000, 16)
+        writer.join()
+        self.assertEqual(self.port.getData(0xE004, 1), b'\xAA')
+        leader.join(); waiting.join()
+        self.assertTrue(written['data'])
+
+    def test_concurrent_read_your_writes(self):
+        self.device.latency = 0.0
+        stop = threading.Event()
+        def reader() :
+            while not stop.is_set() :
+                self.port.getData(0xE000, 16)
+        readers = [threading.Thread(target = reader) for _ in range(3)]
+        for thread in readers :
+            thread.start()
+        try :
+            for k in range(200) :
+                self.port.setData(0xE008, bytes([k]))
+                self.assertEqual(self.port.getData(0xE008, 1)[0], k)
+        finally :
+            stop.set()
+            for thread in readers :
+                thread.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from CStruct import *
+from VirtualDevice import VirtualDevice
+
+
+class pos_t(typedef):
+    x = int16_t
+    y = int16_t
+
+class rec_t(typedef):
+    mode = uint8_t
+    pos = pos_t
+    buf = ArrayOf(uint8_t, 3)
+
+
+class SlotsTest(unittest.TestCase):
+
+    def test_no_instance_dict(self):
+        port = FacadeWrapper(VirtualDevice(), open = True)
+        var = rec_t(memory = RAM_Memory(0x10, port))
+        for obj in (var.__memory__, var.pos.__fields__['x'], var.buf.__fields__['__elem[0]__'],
+                    rec_t().__memory__, uint8_t(memory = RAM_Memory(0x10, port))) :
+            self.assertFalse(hasattr(obj, '__dict__'), type(obj).__name__)
+        with self.assertRaises(AttributeError) :
+            var.__memory__.extra = 1
+
+
+class FootprintTest(unittest.TestCase):
+
+    def test_report(self):
+        report = footprint(rec_t())
+        self.assertEqual(list(report), ['structures', 'classes', 'primitives', 'memories', 'total'])
+        # rec_t, pos_t y el arreglo ; mode, x, y y los 3 elementos :
+        counts = {name : item.count for name, item in report.items()}
+        self.assertEqual(counts, {'structures' : 3, 'classes' : 3, 'primitives' : 6,
+                                  'memories' : 9, 'total' : 21})
+        self.assertTrue(all(item.size > 0 for item in report.values()))
+        self.assertEqual(report['total'].size, sum(item.size for name, item in report.items() if name != 'total'))
+
+    def test_type_report(self):
+        self.assertEqual(footprint(rec_t)['total'].count, footprint(rec_t())['total'].count)
+
+
+if __name__ == '__main__':
+    unittest.main()
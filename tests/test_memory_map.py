@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from CStruct import *
+from VirtualDevice import VirtualDevice
+
+
+class MemoryMapTest(unittest.TestCase):
+
+    def setUp(self):
+        self.map = XC8.memory_map()
+
+    def test_pointer_windows(self):
+        self.assertEqual(self.map.to_adr(0x0123, RAM_Memory), 0x0123)
+        self.assertEqual(self.map.to_adr(0x8010, FLASH_Memory), 0x0010)
+        self.assertEqual(self.map.to_adr(0x8000 + FacadeConfig.EMULATED_EEPROM_ADDRESS + 4,
+                                         EEPROM_Memory), 4)
+        # Un puntero a FLASH no apunta a la RAM y viceversa :
+        with self.assertRaises(ValueError) :
+            self.map.to_adr(0x8010, RAM_Memory)
+        with self.assertRaises(ValueError) :
+            self.map.to_adr(0x0010, FLASH_Memory)
+
+    def test_range_checks(self):
+        self.map.check(RAM_Memory, 0x0FFE, 2)
+        with self.assertRaises(ValueError) :
+            self.map.check(RAM_Memory, 0x0FFF, 2)
+        with self.assertRaises(ValueError) :
+            self.map.to_adr(0x0FFF, RAM_Memory, 2)
+
+    def test_port_map(self):
+        # Cada puerto puede tener su propio mapa (ejem. otra familia) :
+        device = VirtualDevice()
+        port = FacadeWrapper(device, open = True)
+        port.memory_map = MemoryMap({RAM_Memory : MemoryConfig(0x4000, 0x0000, 0x00FF)},
+                                    [(RAM_Memory, 0x0000, 0x0100, 0x0000)])
+        var = uint8_t(memory = RAM_Memory(0x10, port))
+        device.memory[0x4010] = 42
+        self.assertEqual(var.__read__(), 42)
+        with self.assertRaises(ValueError) :
+            uint16_t(memory = RAM_Memory(0xFF, port))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from CStruct import *
+from VirtualDevice import VirtualDevice
+
+
+class ptr_t(typedef):
+    p = PointerTo(uint8_t, FLASH_Memory)
+
+
+class PointerRetargetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.device = VirtualDevice()
+        self.port = FacadeWrapper(self.device, open = True)
+        flash = FacadeConfig.FLASH_SPACE.offset
+        self.device.memory[flash + 0x10] = 11
+        self.device.memory[flash + 0x20] = 22
+        self.var = ptr_t(memory = RAM_Memory(0x100, self.port))
+
+    def test_cached_target_follows_pointer(self):
+        # El destino en FLASH nunca expira, pero cambiar el puntero lo invalida :
+        self.var.__fields__['p'].__write__(0x8010)
+        self.assertEqual(self.var.p, 11)
+        self.var.__fields__['p'].__write__(0x8020)
+        self.assertEqual(self.var.p, 22)
+
+    def test_pointer_changed_by_device(self):
+        self.var.__fields__['p'].__write__(0x8010)
+        self.assertEqual(self.var.p, 11)
+        ram = FacadeConfig.RAM_SPACE.offset
+        self.device.memory[ram + 0x100] = 0x20
+        self.assertEqual(self.var.p, 22)
+
+    def test_unchanged_pointer_keeps_cache(self):
+        self.var.__fields__['p'].__write__(0x8010)
+        self.assertEqual(self.var.p, 11)
+        frames = self.device.frames
+        self.assertEqual(self.var.p, 11)
+        # Solo se lee el puntero (RAM), el destino se toma del resguardo :
+        self.assertEqual(self.device.frames - frames, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
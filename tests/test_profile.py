@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+
+from FacadeProfile import LinkProfile, profile_link
+from FacadeWrapper import FacadeWrapper
+from VirtualDevice import VirtualDevice
+
+
+class ProfileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.device = VirtualDevice()
+        self.port = FacadeWrapper(self.device, open = True)
+        self.device.memory[0x100:0x200] = bytes(range(256))
+
+    def profile(self, **kwargs):
+        return profile_link(self.port, 0x100, 64, sizes = (8, 32, 64), windows = (1, 2),
+                            repeats = 1, **kwargs)
+
+    def test_region_and_port_restored(self):
+        saved = (self.port.chunk_size, self.port.retries, self.port.scatter)
+        profile = self.profile()
+        self.assertEqual(self.device.memory[0x100:0x200], bytes(range(256)))
+        self.assertEqual((self.port.chunk_size, self.port.retries, self.port.scatter), saved)
+        self.assertEqual(sorted(profile.get), ['escaped', 'plain'])
+        self.assertEqual([point[0] for point in profile.get['plain']], [8, 32, 64])
+        self.assertEqual([point[0] for point in profile.batch], [1, 2])
+        self.assertEqual(sorted(profile.recommended), ['chunk_size', 'timeout', 'window'])
+        self.assertIn(profile.recommended['chunk_size'], (8, 32, 64))
+
+    def test_read_only(self):
+        frames = self.device.frames
+        profile = self.profile(write = False)
+        self.assertEqual(list(profile.get), ['current'])
+        self.assertEqual(profile.set, {})
+        self.assertEqual(self.device.memory[0x100:0x200], bytes(range(256)))
+        self.assertGreater(self.device.frames, frames)
+
+    def test_saved_profile_is_applied(self):
+        profile = self.profile()
+        profile.recommended.update(chunk_size = 32, window = 2, timeout = 0.5)
+        with tempfile.TemporaryDirectory() as folder :
+            filename = os.path.join(folder, 'link.json')
+            profile.save(filename)
+            loaded = LinkProfile.load(filename)
+            port = FacadeWrapper(VirtualDevice(), profile = filename)
+        self.assertEqual(loaded.recommended, profile.recommended)
+        self.assertEqual(len(loaded.get['plain']), 3)
+        self.assertEqual((port.chunk_size, port.window), (32, 2))
+        self.assertEqual(port.timeout.value, 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+import copy
+import gc
+import json
+import unittest
+import weakref
+from collections.abc import Sequence
+
+from CStruct import *
+from VirtualDevice import VirtualDevice
+
+
+class pos_t(typedef):
+    x = int16_t
+    y = int16_t
+
+class rec_t(typedef):
+    mode = uint8_t
+    gain = uint16_t
+    pos = pos_t
+    buf = ArrayOf(uint8_t, 3)
+    name = CharArray_t(4)
+
+
+class RecordTest(unittest.TestCase):
+
+    def setUp(self):
+        self.device = VirtualDevice()
+        self.port = FacadeWrapper(self.device, open = True)
+        self.var = rec_t(memory = RAM_Memory(0x100, self.port))
+        self.var.__write__((3, 500, (-7, 9), (1, 2, 3), 'ab'))
+
+    def test_namedtuple_compatibility(self):
+        record = read(self.var)
+        expected = (3, 500, (-7, 9), (1, 2, 3), 'ab\x00\x00')
+        self.assertEqual(record, expected)
+        self.assertEqual(record, record._materialize())
+        mode, gain, pos, buf, name = record
+        self.assertEqual((mode, gain, pos.x, buf[2]), (3, 500, -7, 3))
+        self.assertEqual(record + (1,), expected + (1,))
+        self.assertEqual((0,) + record, (0,) + expected)
+        self.assertEqual(record._fields, ('mode', 'gain', 'pos', 'buf', 'name'))
+        self.assertEqual(record._asdict()['gain'], 500)
+        self.assertEqual(record._replace(mode = 4).mode, 4)
+        self.assertEqual(hash(record), hash(record._materialize()))
+        self.assertIsInstance(record, Sequence)
+        self.assertIn(500, record)
+        self.assertEqual(record.index(500), 1)
+
+    def test_copy_and_serialization(self):
+        record = read(self.var)
+        self.assertEqual(copy.deepcopy(record), record)
+        self.assertEqual(copy.copy(record), record)
+        self.assertEqual(json.loads(json.dumps(record._materialize()))[2], [-7, 9])
+        self.assertIsInstance(record._materialize(), tuple)
+
+    def test_eager_reads(self):
+        self.var.__lazy_read__ = False
+        record = read(self.var)
+        self.assertIsInstance(record, tuple)
+        self.assertIsInstance(record.pos, tuple)
+        self.assertEqual(json.loads(json.dumps(record))[1], 500)
+
+    def test_record_does_not_keep_facade(self):
+        record = read(self.var)
+        ref = weakref.ref(self.var)
+        del self.var
+        gc.collect()
+        self.assertIsNone(ref())
+        self.assertEqual(record.gain, 500)
+
+    def test_write_back(self):
+        other = rec_t(memory = RAM_Memory(0x200, self.port))
+        other.__write__(read(self.var))
+        self.assertEqual(read(other), read(self.var))
+
+    def test_records_are_nested(self):
+        view = pos_t.at(self.port, 0x100 + 3)
+        values = list(records(view, 0x100 + 3, 1))
+        self.assertEqual(values[0].x, -7)
+        self.assertEqual(list(records(rec_t.at(self.port, 0), 0x100, 1))[0].pos.y, 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
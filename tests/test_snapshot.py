@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from CStruct import *
+from VirtualDevice import VirtualDevice
+
+
+RAM = FacadeConfig.RAM_SPACE.offset
+
+
+class FirmwareDevice(VirtualDevice):
+    """ Dispositivo cuyo programa modifica el contador de la estructura en
+        0x200 mientras se atienden las órdenes : updates[n] es el valor del
+        contador al recibir la orden n (si existe).
+    """
+    def __init__(self, updates):
+        super().__init__()
+        self.updates = dict(updates)
+        self.count = 0
+
+    def write(self, data):
+        if self.count in self.updates :
+            self.memory[RAM + 0x200] = self.updates[self.count]
+        self.count += 1
+        return super().write(data)
+
+
+class small_t(typedef):
+    a = uint16_t
+    b = uint16_t
+
+class big_t(typedef):
+    __seqlock__ = 'seq'
+    seq = uint8_t
+    data = ArrayOf(uint8_t, 300)
+
+class plain_t(typedef):
+    data = ArrayOf(uint8_t, 300)
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.device = FirmwareDevice({})
+        self.port = FacadeWrapper(self.device, open = True)
+        self.device.memory[RAM + 0x200] = 2
+        self.device.memory[RAM + 0x201 : RAM + 0x201 + 300] = bytes([7])*300
+
+    def test_single_frame(self):
+        var = small_t(memory = RAM_Memory(0x100, self.port))
+        self.device.memory[RAM + 0x100 : RAM + 0x104] = b'\x01\x00\x02\x00'
+        frames = self.device.frames
+        self.assertEqual(tuple(snapshot(var)), (1, 2))
+        self.assertEqual(self.device.frames - frames, 1)
+
+    def test_consistent_read(self):
+        value = snapshot(big_t(memory = RAM_Memory(0x200, self.port)))
+        self.assertEqual(value.seq, 2)
+        self.assertEqual(tuple(value.data), (7,)*300)
+
+    def test_updates_cache(self):
+        var = big_t(memory = RAM_Memory(0x200, self.port, policy = NEVER_EXPIRE))
+        snapshot(var)
+        frames = self.device.frames
+        self.assertEqual(var.data[299], 7)
+        self.assertEqual(self.device.frames, frames)
+
+    def test_retries_while_updated(self):
+        var = big_t(memory = RAM_Memory(0x200, self.port))
+        self.device.count = 0
+        # Modificación en curso (impar) y luego terminada durante la lectura :
+        self.device.updates = {0 : 3, 2 : 4}
+        self.assertEqual(snapshot(var).seq, 4)
+        self.assertGreater(self.device.count, 4)
+
+    def test_gives_up(self):
+        var = big_t(memory = RAM_Memory(0x200, self.port))
+        self.device.memory[RAM + 0x200] = 5
+        with self.assertRaises(FacadeWrapperError) :
+            snapshot(var, retries = 2)
+
+    def test_requires_seqlock(self):
+        with self.assertRaises(ValueError) :
+            snapshot(plain_t(memory = RAM_Memory(0x200, self.port)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+import warnings
+
+from CSymbols import index, load_symbols, parse_map
+
+
+MAP = """
+                Name                               Link     Load   Length Selector   Space Scale
+/tmp/xcXa1b2.o  init                                  0        0        4         0       0
+main.p1         bssCOMMON                            70       70        6        70       1
+                dataBANK0                           100      100        8       100       1
+                eeprom_data                      F00000   F00000       10    F00000       3
+
+Symbol Table
+
+_ctrl                 bssCOMMON        0070
+_count                bssCOMMON        0072  _table  dataBANK0  0100
+_cal                  eeprom_data      F00004
+"""
+
+
+class ParseMapTest(unittest.TestCase):
+
+    def test_module_rows(self):
+        symbols, psects = parse_map(MAP)
+        self.assertEqual(psects['init'], (0, 4, 'FLASH'))
+        self.assertEqual(psects['bssCOMMON'], (0x70, 0x76, 'RAM'))
+        self.assertEqual(psects['dataBANK0'], (0x100, 0x108, 'RAM'))
+        sizes = {s.name : (s.address, s.size, s.space) for s in index(symbols, psects)}
+        self.assertEqual(sizes, {'ctrl' : (0x70, 2, 'RAM'), 'count' : (0x72, 4, 'RAM'),
+                                 'table' : (0x100, 8, 'RAM'), 'cal' : (4, 12, 'EEPROM')})
+
+    def test_missing_psects_warns(self):
+        text = MAP.split('Symbol Table')[1]
+        with warnings.catch_warnings(record = True) as caught :
+            warnings.simplefilter('always')
+            symbols, psects = parse_map('Symbol Table' + text)
+        self.assertEqual(len(symbols), 4)
+        self.assertEqual(psects, {})
+        self.assertEqual(len(caught), 1)
+
+
+class CacheTest(unittest.TestCase):
+
+    def test_index_is_cached_by_content(self):
+        with tempfile.TemporaryDirectory() as folder :
+            filename = os.path.join(folder, 'prog.map')
+            with open(filename, 'w') as f :
+                f.write(MAP)
+            first = load_symbols(filename)
+            self.assertTrue(os.path.exists(filename + '.symbols.json'))
+            self.assertEqual(list(load_symbols(filename)), list(first))
+            with open(filename, 'w') as f :
+                f.write(MAP.replace('_ctrl ', '_state '))
+            self.assertIn('state', load_symbols(filename))
+
+
+if __name__ == '__main__':
+    unittest.main()
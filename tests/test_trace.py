@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+import os
+import struct
+import tempfile
+import unittest
+
+from FacadeTrace import RX, TRACE_HEADER, TRACE_MAGIC, TX, ReplaySerial, WireTrace
+from FacadeWrapper import FacadeWrapper
+from VirtualDevice import VirtualDevice
+
+
+class WireTraceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.folder.name, 'wire.trc')
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_large_frame_round_trip(self):
+        trace = WireTrace(capacity = 1 << 18)
+        big = bytes(range(256))*300
+        trace.record(TX, b'G\x00\xE0\x04')
+        trace.record(RX, big)
+        trace.dump(self.filename)
+        frames = WireTrace.load(self.filename)
+        self.assertEqual([(d, f) for _, d, f in frames], [(TX, b'G\x00\xE0\x04'), (RX, big)])
+
+    def test_version_1_file(self):
+        with open(self.filename, 'wb') as f :
+            f.write(TRACE_HEADER.pack(TRACE_MAGIC, 1, 0.0))
+            f.write(struct.pack('<dBH', 0.5, RX, 3) + b'abc')
+        self.assertEqual(WireTrace.load(self.filename), [(0.5, RX, b'abc')])
+
+    def test_replay_session(self):
+        device = VirtualDevice()
+        device.memory[0xE000:0xE008] = bytes(range(8))
+        trace = WireTrace()
+        port = FacadeWrapper(device, open = True, trace = trace)
+        self.assertTrue(port.setData(0xE004, b'\x1B\x17'))
+        read = port.getData(0xE000, 8)
+        trace.dump(self.filename)
+
+        replay = FacadeWrapper(ReplaySerial(self.filename), open = True)
+        self.assertTrue(replay.setData(0xE004, b'\x1B\x17'))
+        self.assertEqual(replay.getData(0xE000, 8), read)
+
+
+if __name__ == '__main__':
+    unittest.main()
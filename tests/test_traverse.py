@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from CStruct import *
+from VirtualDevice import VirtualDevice
+
+
+class item_t(typedef):
+    v = uint16_t
+item_t.next = PointerTo(item_t, RAM_Memory)
+
+class branch_t(typedef):
+    k = uint8_t
+branch_t.l = PointerTo(branch_t, RAM_Memory)
+branch_t.r = PointerTo(branch_t, RAM_Memory)
+
+
+class TraverseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.device = VirtualDevice()
+        self.port = FacadeWrapper(self.device, open = True)
+        self.ram = FacadeConfig.RAM_SPACE.offset
+        # Lista de 30 nodos contiguos desde 0x200 :
+        for i in range(30) :
+            adr = 0x200 + 4*i
+            self.poke(adr, [i, 0] + self.pointer(adr + 4 if i < 29 else 0))
+
+    def poke(self, adr, data):
+        self.device.memory[self.ram + adr : self.ram + adr + len(data)] = bytes(data)
+
+    def pointer(self, adr):
+        return [adr & 255, adr >> 8]
+
+    def test_list(self):
+        nodes = traverse(self.port, item_t, 0x200)
+        self.assertEqual(list(nodes), [0x200 + 4*i for i in range(30)])
+        self.assertEqual([node.v for node in nodes.values()], list(range(30)))
+        self.assertEqual(nodes[0x200 + 4*29].next, 0)
+
+    def test_cycles_stop(self):
+        self.poke(0x200 + 4*29 + 2, self.pointer(0x200))
+        self.assertEqual(len(traverse(self.port, item_t, [0x200])), 30)
+
+    def test_tree_by_levels(self):
+        # Árbol binario completo de 15 nodos (4 niveles) :
+        for i in range(1, 16) :
+            left = 0x400 + 5*(2*i) if 2*i < 16 else 0
+            right = 0x400 + 5*(2*i + 1) if 2*i + 1 < 16 else 0
+            self.poke(0x400 + 5*i, [i] + self.pointer(left) + self.pointer(right))
+        frames = self.device.frames
+        nodes = traverse(self.port, branch_t, 0x405)
+        self.assertEqual(sorted(node.k for node in nodes.values()), list(range(1, 16)))
+        # Una trama por nivel :
+        self.assertEqual(self.device.frames - frames, 4)
+
+    def test_readahead(self):
+        frames = self.device.frames
+        nodes = traverse(self.port, item_t, 0x200, readahead = 255)
+        self.assertEqual(len(nodes), 30)
+        # Los nodos contiguos ya leídos no se vuelven a solicitar :
+        self.assertEqual(self.device.frames - frames, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+from unittest import mock
+
+from CStruct import *
+from VirtualDevice import VirtualDevice
+
+
+RAM = FacadeConfig.RAM_SPACE.offset
+
+
+class pos_t(typedef):
+    x = int16_t
+    y = int16_t
+
+class ctrl_t(typedef):
+    mode = uint8_t
+    gain = uint16_t
+    p = pos_t
+    name = CharArray_t(4)
+
+
+class WatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.device = VirtualDevice()
+        self.port = FacadeWrapper(self.device, open = True)
+        self.var = ctrl_t.at(self.port, 0x100, policy = NEVER_EXPIRE)
+        self.log = []
+
+    def notify(self, name, value):
+        self.log.append((name, value))
+
+    def test_changed_fields_only(self):
+        w = watch(self.var, self.notify)
+        self.assertEqual(w.poll(), ['mode', 'gain', 'p', 'name'])
+        self.assertEqual(len(self.log), 4)
+        del self.log[:]
+        self.assertEqual(w.poll(), [])
+        self.assertEqual(self.log, [])
+
+        self.device.memory[RAM + 0x102] = 7
+        self.device.memory[RAM + 0x105] = 1
+        self.assertEqual(w.poll(), ['gain', 'p'])
+        self.assertEqual(self.log[0], ('gain', 0x700))
+        self.assertEqual(tuple(self.log[1][1]), (0, 1))
+        # El resguardo de la variable se actualiza con la consulta :
+        frames = self.device.frames
+        self.assertEqual(self.var.gain, 0x700)
+        self.assertEqual(self.device.frames, frames)
+
+    def test_sub_fields(self):
+        w = watch(self.var, self.notify, ['p.x', 'mode'])
+        w.poll()
+        del self.log[:]
+        self.device.memory[RAM + 0x103] = 2
+        self.device.memory[RAM + 0x101] = 8
+        self.assertEqual(w.poll(), ['p.x'])
+        self.assertEqual(self.log, [('p.x', 2)])
+        with self.assertRaises(ValueError) :
+            watch(self.var, self.notify, ['p.z'])
+
+    def test_batched_poll(self):
+        first = watch(self.var, self.notify, ['mode'])
+        second = watch(ctrl_t.at(self.port, 0x200), self.notify, ['gain'])
+        with mock.patch.object(self.port, 'getDataBatch', wraps = self.port.getDataBatch) as batch, \
+             mock.patch.object(self.port, 'getData', wraps = self.port.getData) as single :
+            self.assertEqual(poll([first, second]), [['mode'], ['gain']])
+            self.device.memory[RAM + 0x201] = 5
+            self.assertEqual(poll([first, second]), [[], ['gain']])
+        self.assertEqual(batch.call_count, 2)
+        self.assertEqual(single.call_count, 0)
+        self.assertEqual(self.log[-1], ('gain', 5))
+
+    def test_emulation(self):
+        var = ctrl_t()
+        w = watch(var, self.notify, ['mode'])
+        w.poll()
+        var.mode = 4
+        self.assertEqual(w.poll(), ['mode'])
+        self.assertEqual(self.log[-1], ('mode', 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
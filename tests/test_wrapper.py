@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from FacadeTrace import TX, WireTrace
+
+from FacadeWrapper import FacadeWrapper, FacadeWrapperError, Pacer
+from VirtualDevice import VirtualDevice
+
+
+class TimeoutTest(unittest.TestCase):
+
+    def test_slow_set_after_fast_gets(self):
+        # Las lecturas rápidas no reducen la espera del ACK de las escrituras :
+        device = VirtualDevice(set_latency = 0.15)
+        port = FacadeWrapper(device, open = True)
+        for _ in range(50) :
+            port.getData(0xE000, 4)
+        frames = device.frames
+        self.assertTrue(port.setData(0xE000, b'\x01\x02'))
+        self.assertEqual(device.frames - frames, 1)
+        self.assertGreaterEqual(port.timeout.value, 0.5)
+
+    def test_configured_timeout_is_floor(self):
+        device = VirtualDevice()
+        device.timeout = 0.8
+        port = FacadeWrapper(device, open = True)
+        for _ in range(20) :
+            port.getData(0xE000, 4)
+        self.assertEqual(port.timeout.minimum, 0.8)
+        self.assertGreaterEqual(device.timeout, 0.8)
+
+
+class RetryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.device = VirtualDevice()
+        self.device.memory[0xE000:0xE004] = b'\x01\x02\x03\x04'
+        self.port = FacadeWrapper(self.device, open = True)
+
+    def test_lost_reply_is_retried(self):
+        self.device.drop = 1
+        frames = self.device.frames
+        self.assertEqual(self.port.getData(0xE000, 4), b'\x01\x02\x03\x04')
+        self.assertEqual(self.device.frames - frames, 2)
+
+    def test_retries_exhausted(self):
+        # Un límite de espera breve (el mínimo configurado) acota la demora :
+        self.device.timeout = 0.05
+        self.port = FacadeWrapper(self.device, open = True)
+        self.device.drop = self.port.retries + 1
+        with self.assertRaises(FacadeWrapperError) :
+            self.port.getData(0xE000, 4)
+        # El enlace se recupera con la orden siguiente :
+        self.assertEqual(self.port.getData(0xE000, 4), b'\x01\x02\x03\x04')
+
+    def test_late_reply_is_discarded(self):
+        # La respuesta tardía del primer intento se descarta al resincronizar :
+        self.device.latency = 0.6
+        self.assertEqual(self.port.getData(0xE000, 4), b'\x01\x02\x03\x04')
+        self.device.latency = 0.0
+        self.device.memory[0xE000] = 9
+        self.assertEqual(self.port.getData(0xE000, 4), b'\x09\x02\x03\x04')
+
+
+class PacerTest(unittest.TestCase):
+
+    def test_rate_backs_off_and_recovers(self):
+        device = VirtualDevice()
+        device.timeout = 0.05
+        pacer = Pacer(frame_rate = 200, auto_tune = True, step = 0.25, max_scale = 2.0)
+        port = FacadeWrapper(device, open = True, pacer = pacer)
+        for _ in range(8) :
+            port.getData(0xE000, 4)
+        # El ritmo supera el configurado hasta max_scale :
+        self.assertEqual(pacer.scale, 2.0)
+        device.drop = 2
+        port.getData(0xE000, 4)
+        self.assertLess(pacer.scale, 1.0)
+        for _ in range(8) :
+            port.getData(0xE000, 4)
+        self.assertEqual(pacer.scale, 2.0)
+
+
+class ScatterProbeTest(unittest.TestCase):
+
+    RANGES = [(0xE000, 2), (0xE010, 2), (0xE020, 2)]
+
+    def read(self, device):
+        device.memory[0xE000:0xE030] = bytes(range(0x30))
+        port = FacadeWrapper(device, open = True)
+        self.assertEqual(port.getDataBatch(self.RANGES),
+                         [b'\x00\x01', b'\x10\x11', b'\x20\x21'])
+        return port
+
+    def test_lost_probe_reply_is_retried(self):
+        device = VirtualDevice()
+        device.drop = 1
+        self.assertIs(self.read(device).scatter, True)
+
+    def test_rejected_probe_disables_scatter(self):
+        device = VirtualDevice(scatter = False)
+        port = self.read(device)
+        self.assertIs(port.scatter, False)
+        # Una sola orden de negociación y una GET por rango :
+        self.assertEqual(device.frames, 1 + len(self.RANGES))
+
+    def test_silent_device_disables_scatter(self):
+        device = VirtualDevice()
+        device.drop = 3
+        device.timeout = 0.05
+        port = FacadeWrapper(device, open = True, retries = 2)
+        device.memory[0xE000:0xE030] = bytes(range(0x30))
+        self.assertEqual(port.getDataBatch(self.RANGES),
+                         [b'\x00\x01', b'\x10\x11', b'\x20\x21'])
+        self.assertIs(port.scatter, False)
+
+    def test_ignoring_device_falls_back(self):
+        # Un dispositivo que desconoce la orden no responde, cada intento de
+        # la negociación cuesta un límite de espera, una sola vez :
+        device = VirtualDevice(scatter = None)
+        device.timeout = 0.05
+        port = FacadeWrapper(device, open = True, retries = 2)
+        device.memory[0xE000:0xE030] = bytes(range(0x30))
+        self.assertEqual(port.getDataBatch(self.RANGES),
+                         [b'\x00\x01', b'\x10\x11', b'\x20\x21'])
+        self.assertIs(port.scatter, False)
+        self.assertEqual(device.frames, 3 + len(self.RANGES))
+        port.getDataBatch(self.RANGES)
+        self.assertEqual(device.frames, 3 + 2*len(self.RANGES))
+
+    def test_multi_char_escaped_until_unsupported(self):
+        for scatter, escaped in ((None, True), (True, True), (False, False)) :
+            device = VirtualDevice()
+            trace = WireTrace()
+            port = FacadeWrapper(device, open = True, trace = trace, scatter = scatter)
+            self.assertTrue(port.setData(0xE000, b'M'))
+            self.assertEqual(device.memory[0xE000], ord('M'))
+            frame = next(f for _, d, f in trace.frames() if d == TX)
+            self.assertEqual(b'M' not in frame, escaped)
+
+
+if __name__ == '__main__':
+    unittest.main()
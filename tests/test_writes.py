@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from CStruct import *
+from VirtualDevice import VirtualDevice
+
+
+class block_t(typedef):
+    __diff_write__ = True
+    a = uint8_t
+    pad = ArrayOf(uint8_t, 16)
+    b = uint16_t
+
+
+class DiffWriteTest(unittest.TestCase):
+
+    def setUp(self):
+        self.device = VirtualDevice()
+        self.port = FacadeWrapper(self.device, open = True)
+
+    def value(self, a, b):
+        return (a, tuple(range(16)), b)
+
+    def test_ram_changed_behind_cache(self):
+        var = block_t(memory = RAM_Memory(0x100, self.port))
+        var.__write__(self.value(1, 2))
+        var.__read__()
+        # El dispositivo modifica a después de la lectura :
+        ram = FacadeConfig.RAM_SPACE.offset
+        self.device.memory[ram + 0x100] = 99
+        var.__write__(self.value(1, 3))
+        self.assertEqual(self.device.memory[ram + 0x100], 1)
+        self.assertEqual(tuple(var.__read__()), self.value(1, 3))
+
+    def test_fresh_cache_writes_changes_only(self):
+        var = block_t(memory = EEPROM_Memory(0x10, self.port))
+        var.__write__(self.value(1, 2))
+        var.__read__()
+        rx_bytes = self.device.rx_bytes
+        var.__write__(self.value(1, 3))
+        # Solo se trasmite el byte modificado (SET, dirección, longitud y dato) :
+        self.assertEqual(self.device.rx_bytes - rx_bytes, 5)
+        self.assertEqual(tuple(var.__read__()), self.value(1, 3))
+
+    def test_written_value_is_fresh(self):
+        # El valor escrito es el resguardo vigente, sin necesidad de leerlo :
+        var = block_t(memory = EEPROM_Memory(0x10, self.port))
+        var.__write__(self.value(1, 2))
+        rx_bytes = self.device.rx_bytes
+        var.__write__(self.value(1, 3))
+        self.assertEqual(self.device.rx_bytes - rx_bytes, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()